@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+
+from session import ZONES, ZONE_NAMES, ZONE_COLORS
+
+# Definições de arena distribuídas com o aplicativo (JSON)
+ARENA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arena_definitions")
+
+# Resolução da grade de consulta (células por lado da arena)
+RASTER_SIZE = 512
+
+# Cores usadas quando a definição não especifica uma cor para a zona
+PALETTE = ("red", "skyblue", "forestgreen", "gold", "orchid", "orange", "turquoise", "salmon",
+           "yellowgreen", "plum", "khaki", "lightcoral", "steelblue", "peru", "palegreen", "tan")
+DARK_COLORS = {"red", "forestgreen", "orchid", "steelblue", "peru"}
+
+# Rótulos de tempo da arena padrão; as demais zonas usam "Tempo em <rótulo>"
+ZONE_TIME_LABELS = {
+    "corner": "Tempo no Canto",
+    "lateral": "Tempo na Lateral",
+    "center": "Tempo no Centro",
+}
+
+
+class ArenaDefinition:
+    # Zonas nomeadas de uma arena, com formas em coordenadas normalizadas
+    # (0 a 1, origem no canto superior esquerdo), cores, rótulos e teclas.
+    # Onde formas se sobrepõem, vale a zona listada primeiro.
+    def __init__(self, name, zones, columns=None, raster_size=RASTER_SIZE):
+        if not zones:
+            raise ValueError("a arena deve ter ao menos uma zona")
+        self.name = name
+        self.zones = tuple(zone["id"] for zone in zones)
+        if len(set(self.zones)) != len(self.zones):
+            raise ValueError("identificadores de zona repetidos")
+        self.labels = {zone["id"]: zone.get("label", zone["id"]) for zone in zones}
+        self.colors = {}
+        for index, zone in enumerate(zones):
+            background = zone.get("color", PALETTE[index % len(PALETTE)])
+            text = zone.get("text_color", "white" if background in DARK_COLORS else "black")
+            self.colors[zone["id"]] = (background, text)
+        self.keys = {zone["id"]: zone.get("key", "") for zone in zones}
+        self.shapes = {zone["id"]: zone.get("shapes", []) for zone in zones}
+        self.columns = columns or _default_columns(len(self.zones))
+        self.raster_size = raster_size
+        self._raster = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        try:
+            return cls(spec["name"], spec["zones"], spec.get("columns"))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"definição de arena inválida: {e}")
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "columns": self.columns,
+            "zones": [{"id": zone, "label": self.labels[zone], "color": self.colors[zone][0],
+                       "text_color": self.colors[zone][1], "key": self.keys[zone], "shapes": self.shapes[zone]}
+                      for zone in self.zones],
+        }
+
+    @property
+    def raster(self):
+        # Grade de inteiros (índice da zona, -1 fora de todas) compilada uma
+        # vez; a classificação de qualquer posição é uma única indexação
+        if self._raster is None:
+            self._raster = compile_raster(self, self.raster_size)
+        return self._raster
+
+    def classify(self, u, v):
+        # Zona de cada posição normalizada (vetorizado); NaN ou fora da arena: -1
+        import numpy as np
+        u = np.asarray(u, dtype=float)
+        v = np.asarray(v, dtype=float)
+        size = self.raster_size
+        missing = ~((u >= 0) & (u <= 1) & (v >= 0) & (v <= 1))
+        column = np.clip(np.nan_to_num(u) * size, 0, size - 1).astype(np.intp)
+        row = np.clip(np.nan_to_num(v) * size, 0, size - 1).astype(np.intp)
+        zone = self.raster[row, column]
+        zone[missing] = -1
+        return zone
+
+
+def zone_time_label(zone, label):
+    return ZONE_TIME_LABELS.get(zone, f"Tempo em {label}")
+
+
+def _default_columns(n_zones):
+    columns = 1
+    while columns * columns < n_zones:
+        columns += 1
+    return columns
+
+
+def compile_raster(arena, size):
+    # Pinta as formas de trás para frente: a zona listada primeiro fica por cima
+    import numpy as np
+    centers = (np.arange(size) + 0.5) / size
+    x, y = np.meshgrid(centers, centers)
+    raster = np.full((size, size), -1, dtype=np.int16)
+    for index in range(len(arena.zones) - 1, -1, -1):
+        for shape in arena.shapes[arena.zones[index]]:
+            raster[_shape_mask(shape, x, y)] = index
+    return raster
+
+
+def _shape_mask(shape, x, y):
+    import numpy as np
+    if "rect" in shape:
+        x0, y0, x1, y1 = shape["rect"]
+        return (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+    if "circle" in shape:
+        cx, cy, radius = shape["circle"]
+        return (x - cx) ** 2 + (y - cy) ** 2 <= radius ** 2
+    if "polygon" in shape:
+        # Regra par-ímpar: alterna a cada aresta cruzada por um raio horizontal
+        points = shape["polygon"]
+        inside = np.zeros(x.shape, dtype=bool)
+        for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+            if y0 == y1:
+                continue
+            crosses = (y0 > y) != (y1 > y)
+            x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            inside ^= crosses & (x < x_cross)
+        return inside
+    raise ValueError(f"forma de zona desconhecida: {shape}")
+
+
+def open_field_arena(border=0.25):
+    # Arena padrão: cantos, faixa lateral e centro (faixa de borda = border)
+    b, e = border, 1 - border
+    shapes = {
+        "corner": [{"rect": r} for r in ([0, 0, b, b], [e, 0, 1, b], [0, e, b, 1], [e, e, 1, 1])],
+        "lateral": [{"rect": r} for r in ([b, 0, e, b], [b, e, e, 1], [0, b, b, e], [e, b, 1, e])],
+        "center": [{"rect": [b, b, e, e]}],
+    }
+    return ArenaDefinition("Campo Aberto", [
+        {"id": zone, "label": ZONE_NAMES[zone], "color": ZONE_COLORS[zone][0], "text_color": ZONE_COLORS[zone][1],
+         "key": key, "shapes": shapes[zone]} for zone, key in zip(ZONES, "123")], columns=2)
+
+
+def grid_arena(name, rows, columns, keys=""):
+    # Arena dividida em rows x columns quadrados iguais (zonas L1C1, L1C2, ...)
+    zones = []
+    for row in range(rows):
+        for column in range(columns):
+            index = row * columns + column
+            zones.append({"id": f"r{row + 1}c{column + 1}", "label": f"L{row + 1}C{column + 1}",
+                          "key": keys[index] if index < len(keys) else "",
+                          "shapes": [{"rect": [column / columns, row / rows,
+                                               (column + 1) / columns, (row + 1) / rows]}]})
+    return ArenaDefinition(name, zones, columns=columns)
+
+
+def builtin_arenas():
+    # Arena padrão seguida das definições do diretório da aplicação
+    arenas = [open_field_arena()]
+    if os.path.isdir(ARENA_DIR):
+        for name in sorted(os.listdir(ARENA_DIR)):
+            if name.endswith(".json"):
+                try:
+                    arenas.append(ArenaDefinition.from_file(os.path.join(ARENA_DIR, name)))
+                except (OSError, ValueError) as e:
+                    print(f"Definição de arena ignorada ({name}): {e}", file=sys.stderr)
+    return arenas
+
+
+def find_arena(path_or_name, arenas):
+    # Nome de uma arena conhecida ou caminho de um arquivo de definição (que
+    # é acrescentado a arenas); sem nenhum dos dois, a primeira conhecida
+    for arena in arenas:
+        if arena.name == path_or_name:
+            return arena
+    if path_or_name and os.path.isfile(path_or_name):
+        try:
+            arena = ArenaDefinition.from_file(path_or_name)
+        except (OSError, ValueError) as e:
+            print(f"Definição de arena ilegível ({path_or_name}): {e}", file=sys.stderr)
+        else:
+            arenas.append(arena)
+            return arena
+    return arenas[0]
+
+
+def arena_for_zones(zones, candidates=(), name=""):
+    # Definição correspondente às zonas de um registro gravado: a de mesmo
+    # nome (gravado com a sessão), senão a primeira com as mesmas zonas; sem
+    # uma correspondente, rótulos são os próprios identificadores
+    zones = tuple(zones)
+    candidates = (*candidates, open_field_arena())
+    for arena in candidates:
+        if name and arena.name == name and arena.zones == zones:
+            return arena
+    for arena in candidates:
+        if arena.zones == zones:
+            return arena
+    return ArenaDefinition("/".join(zones), [{"id": zone} for zone in zones])
@@ -0,0 +1,100 @@
+import time
+
+from arena import arena_for_zones
+from session import ScoringSession, ZONES
+
+
+class ArenaGroup:
+    # Várias arenas marcadas no mesmo processo. Cada arena tem sua própria
+    # sessão (animal, duração, eventos), mas todas leem o mesmo relógio e
+    # iniciam no mesmo instante; o mapa de teclas leva a (arena, zona).
+    def __init__(self, n_arenas, zones=ZONES, clock=time.perf_counter_ns, arena_name=None):
+        self.zones = tuple(zones)
+        # Definição de arena gravada com as sessões
+        self.arena_name = arena_name or arena_for_zones(self.zones).name
+        self.clock = clock
+        self.sessions = [ScoringSession(self.zones, clock) for _ in range(n_arenas)]
+        self.key_map = {}
+        self._committed = set()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def bind_keys(self, arena, keys):
+        # keys: zona -> tecla (qualquer valor hashable, ex.: código de tecla Qt).
+        # Uma tecla já usada por outra arena (ou por outra zona desta) é
+        # recusada com ValueError e o mapa anterior da arena é mantido.
+        key_map = {key: target for key, target in self.key_map.items() if target[0] != arena}
+        for zone, key in keys.items():
+            if key is None:
+                continue
+            if key in key_map:
+                raise ValueError(f"tecla repetida, já usada pela arena {key_map[key][0] + 1}")
+            key_map[key] = (arena, zone)
+        self.key_map = key_map
+
+    @property
+    def running(self):
+        return any(session.running for session in self.sessions)
+
+    def start(self, assignments, t_ns=None):
+        # assignments: {arena: (animal_id, duration_s, experimenter, treatment_group)}
+        if t_ns is None:
+            t_ns = self.clock()
+        started = []
+        for arena, (animal_id, duration_s, experimenter, treatment_group) in assignments.items():
+            if self.sessions[arena].start(animal_id, duration_s, t_ns, experimenter=experimenter,
+                                          treatment_group=treatment_group):
+                self._committed.discard(arena)
+                started.append(arena)
+        return started
+
+    def press_key(self, key, t_ns=None):
+        target = self.key_map.get(key)
+        if target is None:
+            return None
+        arena, zone = target
+        self.sessions[arena].press(zone, t_ns)
+        return target
+
+    def release_key(self, key, t_ns=None):
+        target = self.key_map.get(key)
+        if target is None:
+            return None
+        arena, zone = target
+        self.sessions[arena].release(zone, t_ns)
+        return target
+
+    def tick(self, now_ns=None):
+        # Uma única leitura do relógio para todas as arenas; devolve as que encerraram
+        if now_ns is None:
+            now_ns = self.clock()
+        stopped = []
+        for arena, session in enumerate(self.sessions):
+            if session.running and now_ns >= session.deadline_ns:
+                session.tick(now_ns)
+                stopped.append(arena)
+        return stopped
+
+    def next_deadline_ns(self):
+        deadlines = [session.deadline_ns for session in self.sessions if session.running]
+        return min(deadlines) if deadlines else None
+
+    def stop_all(self, t_ns=None):
+        if t_ns is None:
+            t_ns = self.clock()
+        return [arena for arena, session in enumerate(self.sessions) if session.stop(t_ns)]
+
+    def pending(self):
+        # Arenas com teste concluído e ainda não gravado
+        return [arena for arena, session in enumerate(self.sessions)
+                if session.event_log is not None and not session.running and arena not in self._committed]
+
+    def commit(self, store):
+        # Grava juntas, numa única transação, todas as sessões concluídas
+        arenas = self.pending()
+        if not arenas:
+            return []
+        ids = store.save_many([self.sessions[arena] for arena in arenas], self.arena_name)
+        self._committed.update(arenas)
+        return ids
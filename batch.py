@@ -0,0 +1,229 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from arena import arena_for_zones, builtin_arenas
+from store import DEFAULT_DB_PATH, SessionStore
+
+# Sessões por tarefa enviada ao pool (amortiza a comunicação entre processos)
+CHUNK_SESSIONS = 100
+
+# Índice hash -> arquivos gerados, guardado no diretório de saída
+MANIFEST_NAME = ".openfield-batch.json"
+
+FORMATS = ("png", "pdf")
+
+# Código que define o resultado: mudar a análise invalida o cache. Inclui
+# todos os módulos do projeto importados pela renderização (session.py traz
+# os nomes e cores das zonas padrão; store.py decodifica os registros).
+_ANALYSIS_SOURCES = ("report.py", "metrics.py", "event_log.py", "arena.py", "session.py", "store.py", "batch.py")
+
+_store = None
+_arenas = None
+_fingerprint = None
+
+
+def analysis_fingerprint():
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in _ANALYSIS_SOURCES:
+        with open(os.path.join(directory, name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def content_hash(row, log, arena, formats, fingerprint):
+    # Hash de tudo o que entra no relatório e no gráfico de uma sessão
+    digest = hashlib.sha256(fingerprint.encode())
+    digest.update(json.dumps([row[1:7], list(log.zones), log.start_ns, log.end_ns, formats,
+                              [arena.name, [arena.labels[z] for z in arena.zones],
+                               [arena.colors[z][0] for z in arena.zones]]]).encode())
+    for buffer in log.buffers():
+        digest.update(buffer.tobytes())
+    return digest.hexdigest()
+
+
+def output_stem(out_dir, row):
+    animal = re.sub(r"[^\w.-]+", "_", row[1]) or "animal"
+    return os.path.join(out_dir, f"{row[0]:06d}-{animal}")
+
+
+def render_pie(figure, sizes, labels, colors, title):
+    # Mesmo desenho do gráfico da janela (fatias a partir de 90°, rótulos e porcentagens)
+    figure.clear()
+    ax = figure.add_subplot(111)
+    visible = [(size, label, color) for size, label, color in zip(sizes, labels, colors) if size > 0]
+    if visible:
+        sizes, labels, colors = zip(*visible)
+        _, texts, autotexts = ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90,
+                                     pctdistance=0.85, labeldistance=1.1)
+        for text in (*texts, *autotexts):
+            text.set_fontsize(10)
+    ax.axis('equal')
+    ax.set_title(title)
+
+
+def _init_worker(db_path):
+    # Cada processo abre sua própria conexão e uma única figura Agg (sem Qt)
+    global _store, _arenas, _fingerprint, _figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    _store = SessionStore(db_path)
+    _arenas = builtin_arenas()
+    _fingerprint = analysis_fingerprint()
+    _figure = Figure(figsize=(5, 4), dpi=100)
+    FigureCanvasAgg(_figure)
+
+
+def render_sessions(session_ids, known, out_dir, formats, force=False):
+    # Relatório (TXT) e gráfico de cada sessão; sessões cujo hash não mudou
+    # e cujos arquivos existem são puladas. Devolve [(id, hash, renderizada?,
+    # erro)]; uma sessão que falha não interrompe as demais.
+    results = []
+    for session_id in session_ids:
+        try:
+            result = render_session(session_id, known.get(str(session_id)), out_dir, formats, force)
+        except Exception as e:
+            results.append((session_id, None, False, f"{type(e).__name__}: {e}"))
+            continue
+        if result is not None:
+            results.append((session_id, *result, None))
+    return results
+
+
+def render_session(session_id, known_digest, out_dir, formats, force=False):
+    # (hash, renderizada?) de uma sessão, ou None se ela não existe mais
+    from report import build_report
+    row = _store.get(session_id)
+    if row is None:
+        return None
+    log = _store.load_log(session_id)
+    arena = arena_for_zones(log.zones, _arenas, row[10])
+    digest = content_hash(row, log, arena, formats, _fingerprint)
+    stem = output_stem(out_dir, row)
+    files = [stem + ".txt"] + [f"{stem}.{fmt}" for fmt in formats]
+    if not force and known_digest == digest and all(map(os.path.exists, files)):
+        return digest, False
+    text, _, totals = build_report(row[1], row[2], row[5], log, arena,
+                                   experimenter=row[3], treatment_group=row[4])
+    with open(stem + ".txt", "w", encoding="utf-8") as file:
+        file.write(text)
+    render_pie(_figure, totals, [arena.labels[z] for z in arena.zones],
+               [arena.colors[z][0] for z in arena.zones], f"Distribuição de Tempo por Área - {row[1]}")
+    for fmt in formats:
+        _figure.savefig(f"{stem}.{fmt}", format=fmt)
+    return digest, True
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(path + ".tmp", path)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run(db_path, out_dir, formats=("png",), session_ids=None, filters=None, workers=None,
+        chunk_size=CHUNK_SESSIONS, force=False, progress=None):
+    # Reprocessa as sessões escolhidas num pool de processos; devolve
+    # (renderizadas, em cache, [(id, erro)] das que falharam). O manifesto é
+    # gravado mesmo se algo falhar, preservando o progresso das demais.
+    os.makedirs(out_dir, exist_ok=True)
+    if session_ids is None:
+        store = SessionStore(db_path)
+        try:
+            session_ids = list(store.iter_ids(**(filters or {})))
+        finally:
+            store.close()
+    manifest = load_manifest(out_dir)
+    rendered = cached = 0
+    failed = []
+    workers = workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+            futures = {}
+            for chunk in _chunks(session_ids, chunk_size):
+                known = {str(i): manifest[str(i)] for i in chunk if str(i) in manifest}
+                futures[pool.submit(render_sessions, chunk, known, out_dir, tuple(formats), force)] = chunk
+            done = 0
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # Processo perdido (ex.: falta de memória): o bloco inteiro falha
+                    results = [(session_id, None, False, f"{type(e).__name__}: {e}")
+                               for session_id in futures[future]]
+                for session_id, digest, was_rendered, error in results:
+                    done += 1
+                    if error is not None:
+                        # Sem hash, a sessão é refeita na próxima execução
+                        manifest.pop(str(session_id), None)
+                        failed.append((session_id, error))
+                        continue
+                    manifest[str(session_id)] = digest
+                    rendered += was_rendered
+                    cached += not was_rendered
+                if progress is not None:
+                    progress(done, len(session_ids))
+    finally:
+        save_manifest(out_dir, manifest)
+    return rendered, cached, sorted(failed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="openfield.py batch",
+        description="Recalcula relatórios e gráficos de sessões gravadas, sem interface gráfica")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="banco de sessões")
+    parser.add_argument("--out", default="relatorios", help="diretório de saída")
+    parser.add_argument("--format", dest="formats", action="append", choices=FORMATS,
+                        help="formato do gráfico (repetível; padrão: png)")
+    parser.add_argument("--ids", type=int, nargs="+", help="ids das sessões (padrão: todas as filtradas)")
+    parser.add_argument("--animal", dest="animal_id")
+    parser.add_argument("--experimenter")
+    parser.add_argument("--group", dest="treatment_group")
+    parser.add_argument("--from", dest="date_from", metavar="AAAA-MM-DD")
+    parser.add_argument("--to", dest="date_to", metavar="AAAA-MM-DD")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--force", action="store_true", help="ignora o cache e refaz tudo")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Banco de sessões não encontrado: {args.db}", file=sys.stderr)
+        return 1
+    filters = {key: getattr(args, key) for key in ("animal_id", "experimenter", "treatment_group",
+                                                   "date_from", "date_to") if getattr(args, key)}
+
+    def progress(done, total):
+        print(f"\r{done}/{total} sessões", end="", file=sys.stderr, flush=True)
+
+    t0 = time.perf_counter()
+    rendered, cached, failed = run(args.db, args.out, args.formats or ["png"], args.ids, filters, args.workers,
+                                   force=args.force, progress=progress)
+    elapsed = time.perf_counter() - t0
+    print(file=sys.stderr)
+    print(f"{rendered + cached} sessões em {elapsed:.1f} s: {rendered} renderizadas, "
+          f"{cached} sem alteração (cache) -> {os.path.abspath(args.out)}")
+    if failed:
+        print(f"{len(failed)} sessões com erro:", file=sys.stderr)
+        for session_id, error in failed:
+            print(f"  sessão {session_id}: {error}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,85 @@
+# Benchmark de escala do modo multiarena (1 a 32 arenas).
+#
+#     python -m benchmarks.bench_arenas
+#
+# Simula um teste completo em todas as arenas: eventos de teclado
+# sintéticos e o timer único de atualização da interface (5 Hz). Mede o
+# tempo de CPU e a memória alocada em função do número de arenas.
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from arenas import ArenaGroup
+from session import ZONES
+
+NS_PER_S = 1_000_000_000
+REFRESH_NS = 200_000_000
+
+
+def synthetic_keys(n_arenas, duration_s, events_per_s, seed=0):
+    # (t_ns, tecla, pressão?) de todas as arenas, em ordem de tempo
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * events_per_s)
+    stream = []
+    for arena in range(n_arenas):
+        t = np.sort(rng.integers(1, duration_s * NS_PER_S, size=2 * n))
+        zones = rng.integers(0, len(ZONES), size=n)
+        for i, zone in enumerate(zones.tolist()):
+            key = (arena, zone)
+            stream.append((int(t[2 * i]), key, True))
+            stream.append((int(t[2 * i + 1]), key, False))
+    stream.sort(key=lambda event: event[0])
+    return stream
+
+
+def run(n_arenas, duration_s, events_per_s):
+    stream = synthetic_keys(n_arenas, duration_s, events_per_s)
+    now = [0]
+    tracemalloc.start()
+    group = ArenaGroup(n_arenas, clock=lambda: now[0])
+    for arena in range(n_arenas):
+        group.bind_keys(arena, {zone: (arena, i) for i, zone in enumerate(ZONES)})
+    group.start({arena: (f"A{arena}", duration_s, "", "") for arena in range(n_arenas)}, t_ns=0)
+
+    cpu0 = time.process_time_ns()
+    next_refresh = REFRESH_NS
+    for t_ns, key, is_press in stream:
+        # Timer único de atualização: uma leitura de relógio para todas as arenas
+        while next_refresh <= t_ns:
+            now[0] = next_refresh
+            for session in group.sessions:
+                session.remaining_ns(next_refresh)
+                session.totals_s(next_refresh)
+            next_refresh += REFRESH_NS
+        now[0] = t_ns
+        if is_press:
+            group.press_key(key, t_ns)
+        else:
+            group.release_key(key, t_ns)
+    group.tick(duration_s * NS_PER_S)
+    cpu_ns = time.process_time_ns() - cpu0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert not group.running
+    return cpu_ns, peak, len(stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de escala do modo multiarena")
+    parser.add_argument("--duration", type=int, default=300, help="duração do teste simulado (s)")
+    parser.add_argument("--events-per-s", type=float, default=2.0, help="pressões por segundo por arena")
+    args = parser.parse_args(argv)
+
+    print(f"{'arenas':>6} {'eventos':>8} {'CPU (ms)':>9} {'CPU/arena (ms)':>15} {'memória (KiB)':>14} {'KiB/arena':>10}")
+    for n_arenas in (1, 2, 4, 8, 16, 32):
+        cpu_ns, peak, n_events = run(n_arenas, args.duration, args.events_per_s)
+        print(f"{n_arenas:6d} {n_events:8d} {cpu_ns / 1e6:9.1f} {cpu_ns / 1e6 / n_arenas:15.2f} "
+              f"{peak / 1024:14.1f} {peak / 1024 / n_arenas:10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Benchmark dos agregados da coorte.
+#
+#     python -m benchmarks.bench_cohort --sessions 50000
+#
+# Acumula os resultados de dezenas de milhares de testes sintéticos por
+# grupo (como a cada sessão gravada), mede o custo por sessão e o da
+# gravação incremental, e confere média, EPM e quantis com o cálculo direto.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from cohort import SKETCH_ACCURACY, CohortAggregates
+from store import SessionStore
+
+GROUPS = ("Controle", "Diazepam", "Cafeína", "Veículo")
+ARENA = "Campo Aberto"
+
+
+def synthetic_values(n_sessions, n_metrics, seed=0):
+    # Tempos (s) com distribuição assimétrica, deslocada por grupo
+    rng = np.random.default_rng(seed)
+    groups = rng.integers(0, len(GROUPS), size=n_sessions)
+    values = rng.gamma(2.0, 20.0, size=(n_sessions, n_metrics)) * (1 + 0.2 * groups[:, None])
+    return groups, values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos agregados da coorte")
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--metrics", type=int, default=40, help="métricas por sessão")
+    args = parser.parse_args(argv)
+
+    groups, values = synthetic_values(args.sessions, args.metrics)
+    names = [f"Métrica {i}" for i in range(args.metrics)]
+    rows = [dict(zip(names, row)) for row in values.tolist()]
+
+    store = SessionStore(":memory:")
+    aggregates = CohortAggregates()
+    add_ns, save_ns = [], []
+    for session_id, (group, row) in enumerate(zip(groups.tolist(), rows), start=1):
+        t0 = time.perf_counter_ns()
+        aggregates.add(session_id, ARENA, GROUPS[group], row)
+        t1 = time.perf_counter_ns()
+        # Gravação como após cada teste; amostrada para o benchmark não demorar
+        if session_id % 100 == 0:
+            aggregates.save(store)
+            save_ns.append(time.perf_counter_ns() - t1)
+        else:
+            aggregates._dirty.clear()
+        add_ns.append(t1 - t0)
+    t0 = time.perf_counter()
+    reloaded = CohortAggregates.load(store)
+    load_s = time.perf_counter() - t0
+
+    errors = []
+    ok = True
+    for index, group in enumerate(GROUPS):
+        expected = values[groups == index]
+        for column, name in enumerate(names):
+            stats = aggregates.get(ARENA, group, name)
+            ok &= np.isclose(stats.mean, expected[:, column].mean())
+            ok &= np.isclose(stats.sem, expected[:, column].std(ddof=1) / np.sqrt(len(expected)))
+            for q in (0.25, 0.5, 0.75, 0.95):
+                # Mesmo critério do esboço: o valor de posição int(q * (n - 1))
+                exact = np.sort(expected[:, column])[int(q * (len(expected) - 1))]
+                errors.append(abs(stats.sketch.quantile(q) - exact) / exact)
+    ok &= reloaded.last_session_id == args.sessions
+
+    print(f"{args.sessions} sessões x {args.metrics} métricas em {len(GROUPS)} grupos:")
+    print(f"  atualização por sessão: mediana {np.median(add_ns) / 1000:.0f} µs, "
+          f"p99 {np.percentile(add_ns, 99) / 1000:.0f} µs (primeiras 1000 {np.median(add_ns[:1000]) / 1000:.0f} µs, últimas 1000 {np.median(add_ns[-1000:]) / 1000:.0f} µs)")
+    print(f"  gravação incremental (após cada teste): mediana {np.median(save_ns) / 1e6:.2f} ms")
+    print(f"  carga dos agregados do banco: {load_s * 1000:.0f} ms")
+    print(f"  erro relativo dos quantis: máximo {max(errors) * 100:.2f}% (garantido: {SKETCH_ACCURACY * 100:.0f}%)")
+    ok &= max(errors) <= SKETCH_ACCURACY + 1e-9
+    print("média, EPM e quantis conferem" if ok else "DIVERGÊNCIA em relação ao cálculo direto")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# Teste de carga do servidor de eventos.
+#
+#     python -m benchmarks.bench_event_server --subscribers 100
+#
+# Publica eventos de marcação a uma taxa fixa (como a thread da interface)
+# para N assinantes num processo separado e mede a latência de ponta a ponta
+# (publicação -> linha recebida pelo cliente, no mesmo relógio monotônico),
+# o custo de publish() para quem publica e o comportamento com um assinante
+# que nunca lê (deve ser desconectado sem atrasar os demais).
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import sys
+import time
+
+import numpy as np
+
+from event_server import EventServer
+
+
+async def _subscribers(port, n, slow, results):
+    async def reader(index):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        latencies = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            received_ns = time.perf_counter_ns()
+            event = json.loads(line)
+            if event["type"] == "press":
+                latencies.append(received_ns - event["t_ns"])
+            elif event["type"] == "stop":
+                break
+        writer.close()
+        return latencies
+
+    # Assinante lento: buffer de recepção mínimo e nenhuma leitura
+    slow_sockets = []
+    for _ in range(slow):
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(("127.0.0.1", port))
+        slow_sockets.append(sock)
+    tasks = [asyncio.ensure_future(reader(i)) for i in range(n)]
+    results.put("ready")
+    latencies = await asyncio.gather(*tasks)
+    results.put([value for values in latencies for value in values])
+    results.put(len(latencies))
+
+
+def run_subscribers(port, n, slow, results):
+    asyncio.run(_subscribers(port, n, slow, results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de eventos")
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200.0, help="eventos por segundo")
+    parser.add_argument("--slow", type=int, default=1, help="assinantes que nunca leem")
+    parser.add_argument("--payload", type=int, default=200, help="bytes extras por evento")
+    args = parser.parse_args(argv)
+
+    server = EventServer(port=0).start()
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_subscribers,
+                                      args=(server.port, args.subscribers, args.slow, results))
+    process.start()
+    results.get(timeout=30)
+    while len(server.subscribers) < args.subscribers + args.slow:
+        time.sleep(0.01)
+
+    padding = "x" * args.payload
+    publish_ns = []
+    interval_ns = int(1e9 / args.rate)
+    next_ns = time.perf_counter_ns()
+    for i in range(args.events):
+        # Espera dormindo, como a thread da interface entre eventos
+        next_ns += interval_ns
+        delay_ns = next_ns - time.perf_counter_ns()
+        if delay_ns > 0:
+            time.sleep(delay_ns / 1e9)
+        t0 = time.perf_counter_ns()
+        server.publish({"type": "press", "zone": "center", "t_ns": t0, "i": i, "padding": padding})
+        publish_ns.append(time.perf_counter_ns() - t0)
+    server.publish({"type": "stop", "t_ns": time.perf_counter_ns()})
+
+    latencies = np.array(results.get(timeout=60)) / 1e6
+    completed = results.get(timeout=10)
+    process.join(timeout=10)
+    slow_dropped = server.disconnected_slow
+    server.close()
+
+    expected = args.events * args.subscribers
+    publish_us = np.array(publish_ns) / 1e3
+    print(f"{args.subscribers} assinantes (+{args.slow} lento), {args.events} eventos a {args.rate:g}/s:")
+    print(f"  entregues: {len(latencies)}/{expected} ({completed} assinantes completos)")
+    print(f"  latência de ponta a ponta: p50 {np.percentile(latencies, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies, 99):.2f} ms, máx. {latencies.max():.2f} ms")
+    print(f"  publish() (thread de quem publica): p50 {np.percentile(publish_us, 50):.1f} µs, "
+          f"p99 {np.percentile(publish_us, 99):.1f} µs, máx. {publish_us.max():.0f} µs")
+    print(f"  assinantes lentos desconectados: {slow_dropped}/{args.slow}")
+    ok = len(latencies) == expected and slow_dropped == args.slow
+    print("todos os eventos entregues" if ok else "FALHA na entrega ou na desconexão do assinante lento")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Benchmark do diário de escrita antecipada.
+#
+#     python -m benchmarks.bench_journal --events 200000
+#
+# Mede o custo de append no caminho de entrada, a vazão e o custo de fsync
+# por evento com a política em lotes, comparado a um fsync por evento.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from journal import JournalWriter, read_journal, RECORD
+
+META = {"animal_id": "bench", "experimenter": "", "treatment_group": "", "started_at": "",
+        "duration_s": 10**6, "zones": ["corner", "lateral", "center"], "start_ns": 0}
+
+
+def run(directory, n_events, rate_hz, **kwargs):
+    # rate_hz=0: eventos o mais rápido possível; senão, ritmo aproximado de marcação real
+    path = os.path.join(directory, f"bench-{kwargs.get('sync_events', 'default')}.journal")
+    journal = JournalWriter(path, META, **kwargs)
+    sync_count0, sync_ns0 = journal.sync_count, journal.sync_ns
+    perf = time.perf_counter_ns
+    append_ns = np.empty(n_events, dtype=np.int64)
+    interval = 1 / rate_hz if rate_hz else 0
+    t0 = perf()
+    for i in range(n_events):
+        start = perf()
+        journal.append(i % 3, start, 1 - i % 2)
+        append_ns[i] = perf() - start
+        if interval:
+            time.sleep(interval)
+    journal.close()
+    elapsed = perf() - t0
+    syncs = journal.sync_count - sync_count0
+    sync_ns = journal.sync_ns - sync_ns0
+    _, log, _ = read_journal(path)
+    os.remove(path)
+    return elapsed, append_ns, syncs, sync_ns, len(log)
+
+
+def run_unbatched(directory, n_events):
+    # Referência: escrita e fsync síncronos de cada evento no caminho de entrada
+    path = os.path.join(directory, "unbatched.journal")
+    perf = time.perf_counter_ns
+    append_ns = np.empty(n_events, dtype=np.int64)
+    with open(path, "wb") as file:
+        t0 = perf()
+        for i in range(n_events):
+            start = perf()
+            file.write(RECORD.pack(i % 3, start, 1 - i % 2))
+            file.flush()
+            os.fsync(file.fileno())
+            append_ns[i] = perf() - start
+        elapsed = perf() - t0
+    os.remove(path)
+    return elapsed, append_ns, n_events, int(append_ns.sum()), None
+
+
+def report(name, n_events, elapsed, append_ns, syncs, sync_ns, recovered):
+    p50, p99 = np.percentile(append_ns, [50, 99])
+    print(f"{name}:")
+    recovered = "" if recovered is None else f", {recovered} recuperados"
+    print(f"  {n_events} eventos em {elapsed / 1e9:.3f} s ({n_events / (elapsed / 1e9):,.0f} eventos/s){recovered}")
+    print(f"  append no caminho de entrada: p50 {p50:.0f} ns, p99 {p99:.0f} ns")
+    if syncs:
+        print(f"  {syncs} fsyncs, {sync_ns / syncs / 1e6:.3f} ms por fsync, "
+              f"{sync_ns / n_events / 1e3:.2f} µs de fsync por evento")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do diário de sessão")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--unbatched-events", type=int, default=2_000)
+    parser.add_argument("--dir", default=None, help="diretório no disco a testar (padrão: temporário)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        report("fsync em lotes (250 ms / 64 eventos), vazão máxima", args.events,
+               *run(directory, args.events, 0))
+        report("fsync em lotes, ritmo de marcação (20 eventos/s, 5 s)", 100,
+               *run(directory, 100, 20))
+        report("fsync a cada evento (referência)", args.unbatched_events,
+               *run_unbatched(directory, args.unbatched_events))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
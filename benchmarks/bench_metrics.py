@@ -0,0 +1,54 @@
+# Benchmark das métricas comportamentais em lote.
+#
+#     python -m benchmarks.bench_metrics --sessions 5000
+#
+# Calcula todas as métricas (ocupação por minuto, latências, entradas,
+# transições e episódios) de milhares de sessões sintéticas numa só chamada.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from event_log import EventLog, NS_PER_S
+from metrics import compute_metrics
+from session import ZONES
+
+
+def synthetic_logs(n_sessions, duration_s, events_per_s, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * events_per_s)
+    logs = []
+    for _ in range(n_sessions):
+        log = EventLog(ZONES, 0)
+        times = np.sort(rng.integers(0, duration_s * NS_PER_S, size=n)).tolist()
+        for zone, t_ns in zip(rng.integers(0, len(ZONES), size=n).tolist(), times):
+            log.press(zone, t_ns)
+        log.close(duration_s * NS_PER_S)
+        logs.append(log)
+    return logs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das métricas em lote")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--duration", type=int, default=300)
+    parser.add_argument("--events-per-s", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    logs = synthetic_logs(args.sessions, args.duration, args.events_per_s)
+    n_events = sum(len(log) for log in logs)
+    t0 = time.perf_counter()
+    metrics = compute_metrics(logs)
+    elapsed = time.perf_counter() - t0
+
+    expected = np.array([log.totals_ns() for log in logs]) / NS_PER_S
+    ok = np.allclose(metrics["totals_s"], expected) and np.allclose(metrics["binned_s"].sum(axis=2), expected)
+    print(f"{args.sessions} sessões, {n_events} eventos: {elapsed * 1000:.0f} ms "
+          f"({elapsed / args.sessions * 1e6:.0f} µs/sessão)")
+    print("totais conferem" if ok else "DIVERGÊNCIA nos totais")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# Benchmark da concordância entre avaliadores.
+#
+#     python -m benchmarks.bench_reliability --tests 200 --duration 600
+#
+# Cada teste sintético tem uma sequência verdadeira de permanências; cada
+# avaliador a marca com atraso de reação aleatório e, ocasionalmente, erra
+# a área de uma permanência. Mede o tempo de uma chamada em lote e confere
+# concordância e kappa com um cálculo direto, intervalo a intervalo.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from event_log import EventLog, NS_PER_S
+from reliability import DEFAULT_BIN_S, compare_many
+from session import ZONES
+
+
+def observer_log(starts_s, zones, duration_s, rng, error_rate):
+    # Atraso de reação de 0 a 0,5 s; com probabilidade error_rate, outra área
+    delay = rng.uniform(0, 0.5, size=len(starts_s))
+    wrong = rng.random(len(zones)) < error_rate
+    observed = np.where(wrong, (zones + rng.integers(1, len(ZONES), size=len(zones))) % len(ZONES), zones)
+    log = EventLog(ZONES, 0)
+    for t_s, zone in zip(np.maximum.accumulate(starts_s + delay).tolist(), observed.tolist()):
+        if t_s < duration_s:
+            log.press(zone, round(t_s * NS_PER_S))
+    log.close(duration_s * NS_PER_S)
+    return log
+
+
+def synthetic_groups(n_tests, raters, duration_s, error_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = []
+    for _ in range(n_tests):
+        bouts = rng.exponential(4.0, size=int(duration_s))
+        starts_s = np.concatenate(([0.0], np.cumsum(bouts)[:-1]))
+        starts_s = starts_s[starts_s < duration_s]
+        zones = rng.integers(0, len(ZONES), size=len(starts_s))
+        zones[1:] = np.where(zones[1:] == zones[:-1], (zones[1:] + 1) % len(ZONES), zones[1:])
+        groups.append([observer_log(starts_s, zones, duration_s, rng, error_rate) for _ in range(raters)])
+    return groups
+
+
+def reference(logs, bin_s):
+    # Zona de cada intervalo percorrendo os eventos um a um (sem NumPy)
+    bin_ns = int(bin_s * NS_PER_S)
+    n_bins = min(log.elapsed_ns() for log in logs) // bin_ns
+    grids = []
+    for log in logs:
+        grid, events, current = [], list(log), len(ZONES)
+        position = 0
+        for b in range(n_bins):
+            center = b * bin_ns + bin_ns // 2
+            while position < len(events) and events[position].t_ns <= center:
+                event = events[position]
+                current = event.zone if event.kind else len(ZONES)
+                position += 1
+            grid.append(current)
+        grids.append(grid)
+    a, b = grids[0], grids[1]
+    n = len(a)
+    observed = sum(x == y for x, y in zip(a, b)) / n
+    expected = sum((a.count(c) / n) * (b.count(c) / n) for c in range(len(ZONES) + 1))
+    return observed, (observed - expected) / (1 - expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da concordância entre avaliadores")
+    parser.add_argument("--tests", type=int, default=200)
+    parser.add_argument("--raters", type=int, default=2)
+    parser.add_argument("--duration", type=int, default=600, help="segundos por teste")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    groups = synthetic_groups(args.tests, args.raters, args.duration, args.error_rate)
+    n_events = sum(len(log) for logs in groups for log in logs)
+    t0 = time.perf_counter()
+    results, icc = compare_many(groups)
+    elapsed = time.perf_counter() - t0
+
+    agreement = np.array([result["agreement"] for result in results])
+    kappa = np.array([result["cohen_kappa"][0, 1] for result in results])
+    checked = [reference(logs[:2], DEFAULT_BIN_S) for logs in groups[:3]]
+    # Com dois avaliadores, a concordância de todos é a do par conferido
+    ok = all(np.isclose(cohen, kappa[i]) and (args.raters > 2 or np.isclose(observed, agreement[i]))
+             for i, (observed, cohen) in enumerate(checked))
+    print(f"{args.tests} testes x {args.raters} avaliadores de {args.duration} s ({n_events} eventos): "
+          f"{elapsed * 1000:.0f} ms ({elapsed / args.tests * 1000:.2f} ms/teste)")
+    print(f"  concordância por intervalo: média {agreement.mean() * 100:.1f}%; "
+          f"kappa de Cohen: média {kappa.mean():.3f}; "
+          f"kappa de Fleiss: média {np.mean([result['fleiss_kappa'] for result in results]):.3f}")
+    print("  ICC(2,1) dos tempos por área: " + ", ".join(f"{zone} {value:.3f}" for zone, value in zip(ZONES, icc[ZONES])))
+    print("cálculo direto confere" if ok else "DIVERGÊNCIA em relação ao cálculo direto")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
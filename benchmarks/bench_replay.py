@@ -0,0 +1,83 @@
+# Benchmark da revisão de sessões.
+#
+#     python -m benchmarks.bench_replay --presses 150000
+#
+# Monta o registro sintético de um teste longo (24 h por padrão), mede a
+# preparação do cursor, o custo de cada busca (área ativa e tempos
+# acumulados) e o das faixas da linha do tempo, e confere os tempos contra
+# o cálculo direto sobre todas as permanências.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_session import synthetic_stream
+from event_log import NS_PER_S, EventLog
+from replay import ReplayCursor
+from session import ZONES
+
+
+def synthetic_log(n_presses, hours, seed=0):
+    ev_zone, ev_t, ev_press, _, end_ns = synthetic_stream(n_presses, seed=seed)
+    scale = hours * 3600 * NS_PER_S / end_ns
+    t_ns = (ev_t * scale).astype(np.int64)
+    log = EventLog(ZONES, 0)
+    for zone, t, press in zip(ev_zone.tolist(), t_ns.tolist(), ev_press.tolist()):
+        (log.press if press else log.release)(zone, t)
+    log.close(hours * 3600 * NS_PER_S)
+    return log
+
+
+def timed_ms(function, repeat):
+    t0 = time.perf_counter_ns()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter_ns() - t0) / repeat / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da revisão de sessões")
+    parser.add_argument("--presses", type=int, default=150000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--width", type=int, default=1400, help="largura da linha do tempo (pixels)")
+    parser.add_argument("--seeks", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    log = synthetic_log(args.presses, args.hours)
+    t0 = time.perf_counter_ns()
+    cursor = ReplayCursor(log)
+    build_ms = (time.perf_counter_ns() - t0) / 1e6
+
+    rng = np.random.default_rng(1)
+    positions = rng.integers(0, cursor.duration_ns, size=args.seeks).tolist()
+    it = iter(positions * 2)
+    seek_ms = timed_ms(lambda: (cursor.active_at(next(it)), cursor.totals_ns_at(next(it))), args.seeks)
+    overview_ms = timed_ms(lambda: cursor.occupancy(args.width), 20)
+    detail_ms = timed_ms(lambda: cursor.occupancy(args.width, cursor.duration_ns // 2,
+                                                  cursor.duration_ns // 2 + 120 * NS_PER_S), 200)
+
+    # Conferência: tempos acumulados e área ativa contra todas as permanências
+    ok = True
+    for t_ns in positions[:50]:
+        clipped = np.clip(np.minimum(cursor.ends, t_ns) - cursor.starts, 0, None)
+        expected = np.bincount(cursor.zone, weights=clipped, minlength=len(ZONES)).astype(np.int64)
+        inside = np.flatnonzero((cursor.starts <= t_ns) & (t_ns < cursor.ends))
+        active = int(cursor.zone[inside[0]]) if len(inside) else -1
+        ok &= np.array_equal(cursor.totals_ns_at(t_ns), expected) and cursor.active_at(t_ns) == active
+    totals = np.array(log.totals_ns())
+    ok &= np.array_equal(cursor.totals_ns_at(cursor.duration_ns), totals)
+    fractions = cursor.occupancy(args.width)
+    span_ns = cursor.duration_ns / args.width
+    ok &= bool(np.all(np.abs(fractions.sum(axis=0) * span_ns - totals) <= args.width))
+
+    print(f"Registro: {len(log)} eventos, {args.hours:g} h")
+    print(f"Preparação do cursor: {build_ms:.1f} ms")
+    print(f"Busca (área ativa + tempos acumulados): {seek_ms * 1000:.1f} µs")
+    print(f"Linha do tempo ({args.width} px): sessão inteira {overview_ms:.2f} ms, detalhe de 2 min {detail_ms:.2f} ms")
+    print(f"Conferência dos tempos: {'OK' if ok else 'FALHOU'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# Benchmark do motor de marcação com fluxos sintéticos de pressão/soltura.
+#
+#     python -m benchmarks.bench_session --events 2000000
+#
+# Confere os totais acumulados por zona contra a verdade de referência
+# (precisão de ns) e mede eventos por segundo e latência por evento.
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from session import ScoringSession, ZONES
+
+NS_PER_MS = 1_000_000
+
+
+def synthetic_stream(n_presses, n_zones=len(ZONES), seed=0):
+    # Gera pressões em zonas sempre diferentes da anterior; parte delas é
+    # solta explicitamente (com intervalo), o resto troca direto de zona.
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(1, n_zones, size=n_presses)
+    zones = np.cumsum(steps) % n_zones
+    holds = rng.integers(1, 5_000 * NS_PER_MS, size=n_presses)
+    explicit = rng.random(n_presses) < 0.5
+    explicit[-1] = True
+    gaps = np.where(explicit, rng.integers(1, 500 * NS_PER_MS, size=n_presses), 0)
+    press_t = np.concatenate(([0], np.cumsum(holds + gaps)[:-1])) + 1
+    release_t = press_t + holds
+
+    # Intercala os eventos: pressão sempre, soltura apenas quando explícita
+    n_events = n_presses + int(explicit.sum())
+    ev_zone = np.empty(n_events, dtype=np.int64)
+    ev_t = np.empty(n_events, dtype=np.int64)
+    ev_press = np.empty(n_events, dtype=bool)
+    slots = np.arange(n_presses) + np.concatenate(([0], np.cumsum(explicit)[:-1]))
+    ev_zone[slots], ev_t[slots], ev_press[slots] = zones, press_t, True
+    rel_slots = slots[explicit] + 1
+    ev_zone[rel_slots], ev_t[rel_slots], ev_press[rel_slots] = zones[explicit], release_t[explicit], False
+
+    # Verdade de referência em inteiros (sem perda de precisão em float)
+    truth = np.array([int(holds[zones == z].sum()) for z in range(n_zones)], dtype=np.int64)
+    return ev_zone, ev_t, ev_press, truth, int(release_t[-1])
+
+
+def run_throughput(ev_zone, ev_t, ev_press, end_ns):
+    # O relógio injetado devolve o timestamp sintético de cada evento
+    clock = iter(ev_t.tolist()).__next__
+    session = ScoringSession(clock=clock)
+    session.start("bench", duration_s=10**9, t_ns=0)
+    names = [ZONES[z] for z in ev_zone.tolist()]
+    press, release = session.press, session.release
+    t0 = time.perf_counter_ns()
+    for name, is_press in zip(names, ev_press.tolist()):
+        if is_press:
+            press(name)
+        else:
+            release(name)
+    elapsed = time.perf_counter_ns() - t0
+    session.stop(end_ns)
+    return session, elapsed
+
+
+def run_latency(ev_zone, ev_t, ev_press, sample):
+    # Mede cada chamada individualmente numa amostra do fluxo
+    session = ScoringSession()
+    session.start("bench", duration_s=10**9, t_ns=0)
+    perf = time.perf_counter_ns
+    latencies = np.empty(sample, dtype=np.int64)
+    for i, (zone, t_ns, is_press) in enumerate(zip(ev_zone[:sample].tolist(), ev_t[:sample].tolist(),
+                                                   ev_press[:sample].tolist())):
+        name = ZONES[zone]
+        t0 = perf()
+        if is_press:
+            session.press(name, t_ns)
+        else:
+            session.release(name, t_ns)
+        latencies[i] = perf() - t0
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do motor de marcação")
+    parser.add_argument("--events", type=int, default=2_000_000, help="número de pressões sintéticas")
+    parser.add_argument("--latency-sample", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    ev_zone, ev_t, ev_press, truth, end_ns = synthetic_stream(args.events, seed=args.seed)
+    session, elapsed = run_throughput(ev_zone, ev_t, ev_press, end_ns)
+
+    log = session.event_log
+    totals = np.array(log.totals_ns(), dtype=np.int64)
+    replayed = np.array(log.replay_totals_ns(), dtype=np.int64)
+    ok = np.array_equal(totals, truth) and np.array_equal(replayed, truth)
+
+    n = len(ev_t)
+    print(f"eventos de entrada: {n}  eventos no registro: {len(log)}")
+    print(f"vazão: {n / (elapsed / 1e9):,.0f} eventos/s ({elapsed / n:.0f} ns/evento)")
+    latencies = run_latency(ev_zone, ev_t, ev_press, min(args.latency_sample, n))
+    p50, p99, pmax = np.percentile(latencies, [50, 99, 100])
+    print(f"latência por evento: p50={p50:.0f} ns  p99={p99:.0f} ns  max={pmax:.0f} ns")
+    for zone, got, expected in zip(ZONES, totals, truth):
+        print(f"  {zone:8s} total={got} ns  esperado={expected} ns")
+    print("totais conferem" if ok else "DIVERGÊNCIA nos totais")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Benchmark do banco de sessões: listagem e filtragem paginadas.
+#
+#     python -m benchmarks.bench_store --sessions 100000
+#
+# Popula um banco temporário com sessões sintéticas e mede o tempo da
+# primeira página, de páginas seguintes e da contagem para cada filtro.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from event_log import EventLog
+from session import ZONES
+from store import SessionStore
+
+BUDGET_MS = 100.0
+
+
+def synthetic_log(rng, n_events=60):
+    log = EventLog(ZONES, 0)
+    t_ns = 0
+    for zone in rng.integers(0, len(ZONES), size=n_events).tolist():
+        t_ns += int(rng.integers(1, 10**10))
+        log.press(zone, t_ns)
+    log.close(t_ns + 10**9)
+    return log
+
+
+def populate(store, n_sessions, seed=0):
+    rng = np.random.default_rng(seed)
+    # Poucos registros distintos bastam: o conteúdo dos blobs não afeta as listagens
+    logs = [synthetic_log(rng) for _ in range(32)]
+    day0 = time.mktime((2024, 1, 1, 8, 0, 0, 0, 0, -1))
+    with store.conn:
+        for i in range(n_sessions):
+            started_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(day0 + i * 600))
+            store._insert(f"R{i % 5000:05d}", started_at, 300, logs[i % len(logs)],
+                          f"exp{i % 12}", f"G{i % 8}")
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do banco de sessões")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "bench.sqlite3"))
+        _, populate_ms = timed(lambda: populate(store, args.sessions))
+        print(f"{args.sessions} sessões gravadas em {populate_ms / 1000:.1f} s")
+
+        cases = {
+            "sem filtro": {},
+            "animal": {"animal_id": "R01234"},
+            "prefixo de animal": {"animal_id": "R012"},
+            "experimentador": {"experimenter": "exp7"},
+            "grupo": {"treatment_group": "G3"},
+            "intervalo de datas": {"date_from": "2024-06-01", "date_to": "2024-06-30"},
+            "grupo + datas": {"treatment_group": "G3", "date_from": "2024-06-01", "date_to": "2024-06-30"},
+        }
+        worst = 0.0
+        for name, filters in cases.items():
+            page, first_ms = timed(lambda: store.query(**filters))
+            before_id = page[-1][0] if page else None
+            _, next_ms = timed(lambda: store.query(before_id=before_id, **filters))
+            count, count_ms = timed(lambda: store.count(**filters))
+            worst = max(worst, first_ms, next_ms, count_ms)
+            print(f"  {name:20s} {count:7d} sessões  1ª página {first_ms:6.2f} ms  "
+                  f"página seguinte {next_ms:6.2f} ms  contagem {count_ms:6.2f} ms")
+        _, load_ms = timed(lambda: store.load_log(args.sessions // 2))
+        print(f"  carregar registro de eventos: {load_ms:.2f} ms")
+        store.close()
+
+    ok = worst < BUDGET_MS
+    print(f"pior consulta: {worst:.2f} ms ({'dentro' if ok else 'FORA'} do limite de {BUDGET_MS:.0f} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# Benchmark da marcação automática por vídeo.
+#
+#     python -m benchmarks.bench_tracking --videos 8 --duration 60
+#
+# Gera vídeos sintéticos (fundo com ruído e um "animal" escuro que percorre
+# a arena numa trajetória conhecida), marca-os automaticamente e compara a
+# zona de cada quadro e os tempos por zona com a verdade. Mede quadros por
+# segundo com um processo e com o pool de processos.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from arena import builtin_arenas
+from event_log import NS_PER_S
+from tracking import ArenaGeometry, score_video, score_videos, default_workers, zones_to_log
+
+WIDTH, HEIGHT = 320, 240
+RADIUS = 8
+
+
+def trajectory(n_frames, seed):
+    # Passeio aleatório suave (velocidade com inércia) refletido nas paredes
+    rng = np.random.default_rng(seed)
+    kicks = rng.normal(0, 0.8, size=(n_frames, 2))
+    low, high = np.array([RADIUS, RADIUS]), np.array([WIDTH - RADIUS, HEIGHT - RADIUS])
+    position = np.empty((n_frames, 2))
+    position[0] = (WIDTH / 2, HEIGHT / 2)
+    velocity = np.zeros(2)
+    for i in range(1, n_frames):
+        velocity = np.clip(0.9 * velocity + kicks[i], -6, 6)
+        p = position[i - 1] + velocity
+        bounced = (p < low) | (p > high)
+        p = np.where(p < low, 2 * low - p, p)
+        p = np.where(p > high, 2 * high - p, p)
+        velocity[bounced] *= -1
+        position[i] = p
+    return position
+
+
+def write_video(path, n_frames, fps, seed):
+    import cv2
+    rng = np.random.default_rng(seed)
+    position = trajectory(n_frames, seed)
+    background = (180 + rng.normal(0, 6, size=(HEIGHT, WIDTH))).clip(0, 255).astype(np.uint8)
+    yy, xx = np.mgrid[:HEIGHT, :WIDTH]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (WIDTH, HEIGHT))
+    for x, y in position:
+        frame = background.copy()
+        frame[(xx - x) ** 2 + (yy - y) ** 2 <= RADIUS ** 2] = 40
+        noise = rng.normal(0, 3, size=frame.shape)
+        frame = (frame + noise).clip(0, 255).astype(np.uint8)
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    writer.release()
+    return position
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da marcação automática por vídeo")
+    parser.add_argument("--videos", type=int, default=8)
+    parser.add_argument("--duration", type=int, default=60, help="segundos de vídeo por arquivo")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        print("requer o pacote opencv-python", file=sys.stderr)
+        return 1
+
+    geometry = ArenaGeometry()
+    n_frames = int(args.duration * args.fps)
+    with tempfile.TemporaryDirectory() as directory:
+        paths, truths = [], {}
+        for i in range(args.videos):
+            path = os.path.join(directory, f"synthetic-{i}.avi")
+            truths[path] = write_video(path, n_frames, args.fps, seed=i)
+            paths.append(path)
+        total_frames = n_frames * args.videos
+
+        # Acurácia por quadro e erro nos tempos por zona
+        agreement, time_error = [], []
+        t0 = time.perf_counter()
+        results = [score_video(path, geometry) for path in paths]
+        serial_s = time.perf_counter() - t0
+        for result in results:
+            position = truths[result["path"]]
+            true_zone = geometry.classify(position[:, 0], position[:, 1], (HEIGHT, WIDTH))
+            agreement.append(np.mean(result["zone"] == true_zone))
+            true_totals = np.array(zones_to_log(true_zone, args.fps, min_bout_frames=1).totals_ns()) / NS_PER_S
+            totals = np.array(result["log"].totals_ns()) / NS_PER_S
+            time_error.append(np.abs(totals - true_totals).max())
+
+        t0 = time.perf_counter()
+        failures = [error for _, _, error in score_videos(paths, geometry, workers=args.workers) if error]
+        pool_s = time.perf_counter() - t0
+
+    print(f"{args.videos} vídeos de {args.duration} s ({total_frames} quadros, {WIDTH}x{HEIGHT}):")
+    print(f"  acurácia por quadro: média {np.mean(agreement) * 100:.2f}%, mínima {np.min(agreement) * 100:.2f}%")
+    print(f"  erro máximo no tempo por zona: {np.max(time_error):.2f} s de {args.duration} s")
+    print(f"  1 processo: {serial_s:.2f} s ({total_frames / serial_s:,.0f} quadros/s)")
+    print(f"  {args.workers} processos: {pool_s:.2f} s ({total_frames / pool_s:,.0f} quadros/s, "
+          f"{serial_s / pool_s:.1f}x)")
+    # Classificação pela grade pré-calculada: custo por ponto independe do número de zonas
+    for arena in builtin_arenas():
+        arena.raster
+        u, v = np.random.default_rng(0).random((2, 1_000_000))
+        t0 = time.perf_counter()
+        arena.classify(u, v)
+        elapsed = time.perf_counter() - t0
+        print(f"  classificação ({arena.name}, {len(arena.zones)} áreas): {elapsed / 1e6 * 1e9:.1f} ns/ponto")
+    ok = not failures and np.mean(agreement) > 0.97
+    print("acurácia dentro do esperado" if ok else "ACURÁCIA ABAIXO DO ESPERADO")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
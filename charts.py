@@ -0,0 +1,161 @@
+import math
+
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.85
+START_ANGLE = 90
+
+
+class ZonePieChart:
+    # Gráfico de pizza construído uma única vez; cada atualização apenas
+    # reposiciona as fatias e textos existentes. No modo ao vivo o fundo é
+    # guardado e só as fatias/textos são redesenhados (blitting).
+    def __init__(self, labels, colors, parent=None):
+        self.figure = Figure(figsize=(5, 4), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+
+        wedges, texts, autotexts = self.ax.pie([1] * len(labels), labels=labels, colors=colors,
+                                               autopct='%1.1f%%', startangle=START_ANGLE,
+                                               pctdistance=PCT_DISTANCE, labeldistance=LABEL_DISTANCE)
+
+        # Ajustar texto
+        for autotext in autotexts:
+            autotext.set_color('black')
+            autotext.set_fontsize(10)
+        for text in texts:
+            text.set_fontsize(10)
+
+        self.ax.axis('equal')
+        self.ax.set_title("Distribuição de Tempo por Área")
+
+        self.wedges = wedges
+        self.texts = texts
+        self.autotexts = autotexts
+        self.sizes = None
+        self.live = False
+        self._background = None
+
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar(self.canvas, parent)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def artists(self):
+        return [*self.wedges, *self.texts, *self.autotexts]
+
+    def update(self, sizes):
+        # Redesenha apenas quando os números mudam; devolve se houve mudança
+        sizes = tuple(sizes)
+        if sizes == self.sizes:
+            return False
+        self.sizes = sizes
+        self._apply(sizes)
+        if self.live and self._background is not None:
+            self._blit()
+        else:
+            self.canvas.draw_idle()
+        return True
+
+    def reset(self):
+        self.sizes = None
+
+    def set_live(self, live):
+        if live == self.live:
+            return
+        self.live = live
+        self._background = None
+        for artist in self.artists():
+            artist.set_animated(live)
+        self.canvas.draw_idle()
+
+    def _apply(self, sizes):
+        # Mesma geometria de Axes.pie (sentido anti-horário a partir de 90°)
+        total = float(sum(sizes))
+        theta1 = START_ANGLE / 360.0
+        for wedge, text, autotext, size in zip(self.wedges, self.texts, self.autotexts, sizes):
+            visible = total > 0 and size > 0
+            wedge.set_visible(visible)
+            text.set_visible(visible)
+            autotext.set_visible(visible)
+            if not visible:
+                continue
+            frac = size / total
+            theta2 = theta1 + frac
+            wedge.set_theta1(360 * theta1)
+            wedge.set_theta2(360 * theta2)
+            angle = math.pi * (theta1 + theta2)
+            x, y = math.cos(angle), math.sin(angle)
+            text.set_position((LABEL_DISTANCE * x, LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((PCT_DISTANCE * x, PCT_DISTANCE * y))
+            autotext.set_text(f"{100 * frac:.1f}%")
+            theta1 = theta2
+
+    def _on_draw(self, event):
+        # Após cada desenho completo, guarda o fundo sem as fatias animadas
+        if not self.live:
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists():
+            if artist.get_visible():
+                self.figure.draw_artist(artist)
+
+    def _blit(self):
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.figure.bbox)
+
+
+class GroupBarChart:
+    # Barras de média ± EPM por grupo. Com os mesmos grupos, a atualização
+    # só muda alturas e segmentos existentes; a figura é refeita apenas
+    # quando o conjunto de grupos muda.
+    def __init__(self, parent=None):
+        self.figure = Figure(figsize=(5, 3), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.groups = None
+        self.bars = None
+        self.errors = None
+        self.marker = None
+        self.canvas = FigureCanvas(self.figure)
+
+    def update(self, groups, means, sems, title="", highlight=None):
+        # highlight: (índice do grupo, valor) do animal do último teste
+        groups = tuple(groups)
+        means = [0.0 if mean != mean else mean for mean in means]
+        sems = [0.0 if sem != sem else sem for sem in sems]
+        if groups != self.groups:
+            self._build(groups)
+        for bar, mean in zip(self.bars, means):
+            bar.set_height(mean)
+        segments = [[(i, mean - sem), (i, mean + sem)] for i, (mean, sem) in enumerate(zip(means, sems))]
+        self.errors.set_segments(segments)
+        if highlight is None:
+            self.marker.set_data([], [])
+        else:
+            self.marker.set_data([highlight[0]], [highlight[1]])
+        self.ax.set_title(title, fontsize=10)
+        # relim() não considera coleções (as barras de erro); os extremos
+        # média ± EPM entram nos limites à parte
+        self.ax.relim()
+        if segments:
+            self.ax.update_datalim([point for segment in segments for point in segment])
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def _build(self, groups):
+        self.ax.clear()
+        positions = range(len(groups))
+        self.bars = self.ax.bar(positions, [0] * len(groups), color="skyblue", edgecolor="steelblue")
+        self.errors = self.ax.vlines(positions, 0, 0, colors="black", linewidth=1.5)
+        self.marker, = self.ax.plot([], [], "o", color="red", label="Último teste")
+        self.ax.set_xticks(list(positions))
+        self.ax.set_xticklabels(groups, rotation=20, ha="right", fontsize=9)
+        self.ax.legend(loc="upper right", fontsize=8)
+        self.figure.subplots_adjust(bottom=0.25)
+        self.groups = groups
@@ -0,0 +1,241 @@
+import json
+import math
+
+from arena import arena_for_zones
+
+# Erro relativo máximo dos quantis estimados
+SKETCH_ACCURACY = 0.01
+# Valores até este limite contam como zero no esboço de quantis
+SKETCH_MIN_VALUE = 1e-6
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+# Dados do teste que não são resultados (configuração)
+EXCLUDED_METRICS = {"Duração Programada (s)"}
+
+
+class QuantileSketch:
+    # Esboço de quantis com erro relativo garantido: cada valor cai numa
+    # faixa logarítmica de razão _GAMMA (inserção O(1), combinável e com
+    # tamanho limitado pela faixa de valores, não pelo número de sessões).
+    # Os resultados do teste não são negativos; valores <= SKETCH_MIN_VALUE
+    # vão para a faixa do zero.
+    __slots__ = ("bins", "zero", "count")
+
+    def __init__(self):
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value):
+        if value <= SKETCH_MIN_VALUE:
+            self.zero += 1
+        else:
+            key = math.ceil(math.log(value) / _LOG_GAMMA)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+
+    def quantile(self, q):
+        # Valor no quantil q (0 a 1); None sem dados
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * _GAMMA ** key / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.bins) / (_GAMMA + 1)
+
+    def rank(self, value):
+        # Fração aproximada dos valores menores ou iguais a value
+        if self.count == 0:
+            return None
+        if value <= SKETCH_MIN_VALUE:
+            return self.zero / self.count
+        limit = math.ceil(math.log(value) / _LOG_GAMMA)
+        return (self.zero + sum(count for key, count in self.bins.items() if key <= limit)) / self.count
+
+    def to_dict(self):
+        keys = sorted(self.bins)
+        return {"zero": self.zero, "keys": keys, "counts": [self.bins[key] for key in keys]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.zero = data["zero"]
+        sketch.bins = dict(zip(data["keys"], data["counts"]))
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
+
+
+class RunningStats:
+    # Contagem, média e variância (algoritmo de Welford), mínimo, máximo e
+    # quantis de uma métrica, atualizados a cada valor em tempo constante
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.sketch.add(value)
+
+    @property
+    def variance(self):
+        # Variância amostral (n - 1)
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def sem(self):
+        # Erro padrão da média
+        return math.sqrt(self.variance / self.count) if self.count > 1 else math.nan
+
+    def to_json(self):
+        return json.dumps({"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.minimum,
+                           "max": self.maximum, "sketch": self.sketch.to_dict()})
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        stats.minimum, stats.maximum = data["min"], data["max"]
+        stats.sketch = QuantileSketch.from_dict(data["sketch"])
+        return stats
+
+
+def session_values(test_data):
+    # Resultados numéricos de um teste (test_data de build_report); valores
+    # por área viram "<nome> [<área>]". Latências de áreas nunca visitadas
+    # (NaN) ficam de fora.
+    values = {}
+    for key, value in test_data.items():
+        if key in EXCLUDED_METRICS or isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            values[key] = float(value)
+        elif isinstance(value, dict) and value and all(isinstance(v, (int, float)) for v in value.values()):
+            for zone, zone_value in value.items():
+                values[f"{key} [{zone}]"] = float(zone_value)
+    return {key: value for key, value in values.items() if math.isfinite(value)}
+
+
+def metric_label(metric, arena):
+    # Troca o identificador da área pelo rótulo da arena
+    name, bracket, zone = metric.partition(" [")
+    if not bracket:
+        return metric
+    zone = zone.rstrip("]")
+    return f"{name} - {arena.labels.get(zone, zone)}"
+
+
+class CohortAggregates:
+    # Estatísticas de cada métrica por (arena, grupo de tratamento). Uma sessão
+    # gravada atualiza apenas os agregados do seu grupo; nada é recalculado a
+    # partir do histórico.
+    def __init__(self):
+        self.stats = {}
+        self.last_session_id = 0
+        # Incrementada a cada alteração (a visualização só redesenha se mudou)
+        self.version = 0
+        self._dirty = set()
+        # Progresso lido do banco ou gravado por último, e as sessões
+        # incluídas desde então (reaplicadas se outro processo gravar antes)
+        self.saved_session_id = 0
+        self._pending = []
+
+    @classmethod
+    def load(cls, store):
+        aggregates = cls()
+        rows, aggregates.last_session_id = store.load_cohort()
+        aggregates.saved_session_id = aggregates.last_session_id
+        for arena, group, metric, state in rows:
+            aggregates.stats.setdefault((arena, group), {})[metric] = RunningStats.from_json(state)
+        return aggregates
+
+    def add(self, session_id, arena_name, group, values):
+        group_stats = self.stats.setdefault((arena_name, group), {})
+        for metric, value in values.items():
+            stats = group_stats.get(metric)
+            if stats is None:
+                stats = group_stats[metric] = RunningStats()
+            stats.add(value)
+            self._dirty.add((arena_name, group, metric))
+        self._pending.append((session_id, arena_name, group, values))
+        self.last_session_id = max(self.last_session_id, session_id)
+        self.version += 1
+
+    def save(self, store):
+        # Se outro processo (outra janela, o lote, a marcação automática)
+        # gravou os agregados depois da última leitura, relê o banco e
+        # reaplica só as sessões que ele ainda não incluiu: o progresso
+        # garante que todas as sessões até last_session_id já estão nele
+        while True:
+            rows = [(arena, group, metric, self.stats[arena, group][metric].to_json())
+                    for arena, group, metric in self._dirty]
+            if store.save_cohort(rows, self.last_session_id, self.saved_session_id):
+                self.saved_session_id = self.last_session_id
+                self._dirty.clear()
+                self._pending.clear()
+                return
+            merged = CohortAggregates.load(store)
+            for session_id, arena_name, group, values in self._pending:
+                if session_id > merged.last_session_id:
+                    merged.add(session_id, arena_name, group, values)
+            self.stats = merged.stats
+            self.last_session_id = merged.last_session_id
+            self.saved_session_id = merged.saved_session_id
+            self._dirty = merged._dirty
+            self._pending = merged._pending
+            self.version += 1
+
+    def groups(self, arena_name):
+        return sorted(group for arena, group in self.stats if arena == arena_name)
+
+    def metrics(self, arena_name):
+        names = set()
+        for (arena, _), group_stats in self.stats.items():
+            if arena == arena_name:
+                names.update(group_stats)
+        return sorted(names)
+
+    def get(self, arena_name, group, metric):
+        return self.stats.get((arena_name, group), {}).get(metric)
+
+
+def catch_up(aggregates, store, arenas=(), progress=None, is_cancelled=None):
+    # Inclui as sessões gravadas depois da última já agregada (por outros
+    # modos, pela marcação automática ou antes da existência dos agregados),
+    # em ordem de id, gravando o progresso a cada página
+    from report import build_report
+    done = 0
+    total = store.last_id() - aggregates.last_session_id
+    while not (is_cancelled and is_cancelled()):
+        ids = store.ids_after(aggregates.last_session_id)
+        if not ids:
+            break
+        for session_id in ids:
+            row = store.get(session_id)
+            log = store.load_log(session_id)
+            arena = arena_for_zones(log.zones, arenas, row[10])
+            _, test_data, _ = build_report(row[1], row[2], row[5], log, arena,
+                                           experimenter=row[3], treatment_group=row[4])
+            aggregates.add(session_id, arena.name, row[4], session_values(test_data))
+        aggregates.save(store)
+        done += len(ids)
+        if progress is not None:
+            progress(done, max(total, done))
+    return done
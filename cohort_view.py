@@ -0,0 +1,145 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableWidget,
+                               QTableWidgetItem, QAbstractItemView, QHeaderView)
+from PySide6.QtCore import Qt
+
+from cohort import metric_label
+
+# Rótulo de sessões sem grupo de tratamento
+NO_GROUP = "(sem grupo)"
+# Métrica exibida inicialmente, se existir
+DEFAULT_METRIC = "Tempo no Centro (s)"
+
+
+class CohortView(QWidget):
+    # Comparação com a coorte: média ± EPM de uma métrica por grupo de
+    # tratamento (arena atual), com o valor do último teste destacado. Lê
+    # apenas os agregados em memória; nunca percorre as sessões gravadas.
+    HEADERS = ("Grupo", "N", "Média", "EPM", "Mediana", "P25–P75")
+
+    def __init__(self, aggregates, arena, parent=None):
+        super().__init__(parent)
+        self.aggregates = aggregates
+        self.arena = arena
+        self.last_test = None
+        self.chart = None
+        self._shown = None
+        layout = QVBoxLayout(self)
+
+        metric_layout = QHBoxLayout()
+        metric_layout.addWidget(QLabel("Métrica:"))
+        self.metric_combo = QComboBox()
+        self.metric_combo.currentIndexChanged.connect(lambda _: self.refresh(force=True))
+        metric_layout.addWidget(self.metric_combo, 1)
+        layout.addLayout(metric_layout)
+
+        self.comparison_label = QLabel("Nenhum teste concluído nesta execução.")
+        self.comparison_label.setWordWrap(True)
+        layout.addWidget(self.comparison_label)
+
+        self.chart_layout = QVBoxLayout()
+        layout.addLayout(self.chart_layout, 1)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+    def set_aggregates(self, aggregates):
+        self.aggregates = aggregates
+        self._shown = None
+        self.refresh()
+
+    def set_arena(self, arena):
+        self.arena = arena
+        self.last_test = None
+        self._shown = None
+        self.refresh()
+
+    def set_last_test(self, animal_id, group, values):
+        self.last_test = (animal_id, group, values)
+        self._shown = None
+        self.refresh()
+
+    def update_metrics(self):
+        # Lista de métricas da arena atual (mantém a escolhida)
+        metrics = self.aggregates.metrics(self.arena.name) if self.aggregates is not None else []
+        current = self.metric_combo.currentData() or DEFAULT_METRIC
+        if metrics == [self.metric_combo.itemData(i) for i in range(self.metric_combo.count())]:
+            return
+        self.metric_combo.blockSignals(True)
+        self.metric_combo.clear()
+        for metric in metrics:
+            self.metric_combo.addItem(metric_label(metric, self.arena), metric)
+        index = self.metric_combo.findData(current)
+        self.metric_combo.setCurrentIndex(max(index, 0))
+        self.metric_combo.blockSignals(False)
+
+    def refresh(self, force=False):
+        # Redesenha apenas se os agregados mudaram (ou force)
+        if self.aggregates is None:
+            return
+        state = (self.aggregates.version, self.arena.name)
+        if not force and state == self._shown:
+            return
+        self.update_metrics()
+        metric = self.metric_combo.currentData()
+        # Escondida (aba não selecionada): desenha ao ser exibida
+        if metric is None or not self.isVisible():
+            return
+        self._shown = state
+        groups = self.aggregates.groups(self.arena.name)
+        stats = [self.aggregates.get(self.arena.name, group, metric) for group in groups]
+        rows = [(group, s) for group, s in zip(groups, stats) if s is not None and s.count]
+
+        self.table.setRowCount(len(rows))
+        for row, (group, s) in enumerate(rows):
+            p25, p50, p75 = (s.sketch.quantile(q) for q in (0.25, 0.5, 0.75))
+            values = (group or NO_GROUP, str(s.count), f"{s.mean:.2f}", _number(s.sem), f"{p50:.2f}",
+                      f"{p25:.2f}–{p75:.2f}")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        highlight = None
+        if self.last_test is not None:
+            animal_id, group, values = self.last_test
+            value = values.get(metric)
+            group_stats = self.aggregates.get(self.arena.name, group, metric)
+            if value is None or group_stats is None:
+                self.comparison_label.setText(f"Último teste ({animal_id}): sem valor para esta métrica.")
+            else:
+                text = (f"Último teste ({animal_id}): {value:.2f} — grupo {group or NO_GROUP}: "
+                        f"média {group_stats.mean:.2f} ± {_number(group_stats.sem)} (EPM), n = {group_stats.count}")
+                rank = group_stats.sketch.rank(value)
+                if group_stats.count > 1 and rank is not None:
+                    text += f", percentil ~{rank * 100:.0f}"
+                if group_stats.variance == group_stats.variance and group_stats.variance > 0:
+                    text += f", z = {(value - group_stats.mean) / group_stats.variance ** 0.5:+.2f}"
+                self.comparison_label.setText(text)
+                names = [name for name, _ in rows]
+                if group in names:
+                    highlight = (names.index(group), value)
+
+        if rows:
+            chart = self.ensure_chart()
+            chart.update([name or NO_GROUP for name, _ in rows], [s.mean for _, s in rows],
+                         [s.sem for _, s in rows], metric_label(metric, self.arena), highlight)
+
+    def ensure_chart(self):
+        if self.chart is None:
+            from charts import GroupBarChart
+            self.chart = GroupBarChart(self)
+            self.chart_layout.addWidget(self.chart.canvas)
+        return self.chart
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+
+def _number(value):
+    return "-" if value != value else f"{value:.2f}"
@@ -0,0 +1,271 @@
+import json
+import os
+import platform
+import re
+import sys
+import time
+from array import array
+
+from store import DEFAULT_DB_PATH
+
+# Medições gravadas ao fim de cada teste quando o diagnóstico está ativo
+DEFAULT_DIAGNOSTICS_DIR = os.environ.get(
+    "OPENFIELD_DIAGNOSTICS", os.path.join(os.path.dirname(DEFAULT_DB_PATH), "diagnostics"))
+
+NS_PER_US = 1_000
+# Histogramas log-lineares: 2**SUB_BITS faixas por potência de 2 (erro
+# relativo máximo de 1/16), valores em µs até ~2**(N_BUCKETS/16) µs
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+N_BUCKETS = 28 * SUB_BUCKETS
+# Janelas guardadas no buffer circular (10 min em janelas de 20 s)
+WINDOW_S = 20
+WINDOWS = 30
+# Amostras de memória guardadas (uma por segundo)
+GAUGE_SAMPLES = 600
+
+# Nomes exibidos no painel
+METRIC_LABELS = {
+    "timer_jitter": "Atraso do timer da contagem",
+    "deadline_lateness": "Atraso do timer de prazo",
+    "input_latency": "Atraso relativo entrada → registro",
+    "slot.on_button_press": "on_button_press",
+    "slot.on_button_release": "on_button_release",
+    "slot.generate_report": "generate_report",
+    "slot.show_pie_chart": "show_pie_chart",
+    "chart_draw": "Desenho completo do gráfico",
+    "chart_blit": "Atualização do gráfico (blit)",
+}
+
+
+def bucket_index(value_us):
+    # Faixas lineares até SUB_BUCKETS; depois SUB_BUCKETS faixas por potência de 2
+    if value_us < SUB_BUCKETS:
+        return max(value_us, 0)
+    shift = value_us.bit_length() - SUB_BITS - 1
+    return min(shift * SUB_BUCKETS + (value_us >> shift), N_BUCKETS - 1)
+
+
+def bucket_bounds_us(index):
+    # [início, fim) da faixa em µs
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    low = (index - shift * SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class Histogram:
+    # Contagens por faixa num array compacto; registrar é O(1), sem alocação
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts = array("q", bytes(8 * N_BUCKETS))
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def add(self, value_us):
+        self.counts[bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile_ms(self, q):
+        # Ponto médio da faixa que contém o percentil q (0 a 100)
+        if self.count == 0:
+            return None
+        rank = max(int(q / 100 * self.count + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                low, high = bucket_bounds_us(index)
+                return min((low + high) / 2, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_us / self.count / 1000 if self.count else None,
+            "p50_ms": self.percentile_ms(50),
+            "p95_ms": self.percentile_ms(95),
+            "p99_ms": self.percentile_ms(99),
+            "max_ms": self.max_us / 1000 if self.count else None,
+        }
+
+    def to_dict(self):
+        # Apenas as faixas ocupadas: {início em µs: contagem}
+        data = self.summary()
+        data["buckets_us"] = {bucket_bounds_us(index)[0]: count for index, count in enumerate(self.counts) if count}
+        return data
+
+
+class MetricSeries:
+    # Histograma acumulado do teste e um buffer circular de histogramas por
+    # janela de tempo (as janelas mais antigas são reaproveitadas)
+    def __init__(self, window_ns, windows, origin_ns=0):
+        self.window_ns = window_ns
+        self.origin_ns = origin_ns
+        self.session = Histogram()
+        self.windows = [Histogram() for _ in range(windows)]
+        self.window_ids = array("q", [-1] * windows)
+
+    def add(self, value_us, now_ns):
+        window_id = (now_ns - self.origin_ns) // self.window_ns
+        slot = window_id % len(self.windows)
+        if self.window_ids[slot] != window_id:
+            self.window_ids[slot] = window_id
+            self.windows[slot].clear()
+        self.windows[slot].add(value_us)
+        self.session.add(value_us)
+
+    def recent(self, now_ns, n_windows=1):
+        # Histograma das últimas n_windows janelas (incluindo a atual)
+        merged = Histogram()
+        current = (now_ns - self.origin_ns) // self.window_ns
+        for window_id, histogram in zip(self.window_ids, self.windows):
+            if current - n_windows < window_id <= current:
+                merged.merge(histogram)
+        return merged
+
+    def window_dicts(self):
+        # Janelas em ordem cronológica; início em s desde a criação do coletor
+        order = sorted(range(len(self.windows)), key=lambda slot: self.window_ids[slot])
+        return [dict(self.windows[slot].summary(), window_start_s=self.window_ids[slot] * self.window_ns / 1e9)
+                for slot in order if self.window_ids[slot] >= 0]
+
+
+class GaugeSeries:
+    # Últimas amostras (instante, valor) de uma grandeza, em buffer circular
+    def __init__(self, capacity=GAUGE_SAMPLES):
+        self.t_ns = array("q", [0] * capacity)
+        self.values = array("q", [0] * capacity)
+        self.count = 0
+        self.peak = 0
+
+    def add(self, value, now_ns):
+        slot = self.count % len(self.values)
+        self.t_ns[slot] = now_ns
+        self.values[slot] = value
+        self.count += 1
+        self.peak = max(self.peak, value)
+
+    def last(self):
+        return self.values[(self.count - 1) % len(self.values)] if self.count else None
+
+    def samples(self):
+        n = min(self.count, len(self.values))
+        first = self.count - n
+        return [(self.t_ns[i % len(self.values)], self.values[i % len(self.values)]) for i in range(first, self.count)]
+
+
+def session_dump_path(animal_id, directory=DEFAULT_DIAGNOSTICS_DIR):
+    animal = re.sub(r"[^\w.-]+", "_", animal_id) or "animal"
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{animal}.json")
+
+
+def rss_bytes():
+    # Memória residente do processo: /proc no Linux; nos demais sistemas,
+    # o pico informado por getrusage (None se indisponível)
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Diagnostics:
+    # Coletor de medições de desempenho da interface. Tempos são registrados
+    # em histogramas (custo constante por medição); nada é medido quando o
+    # diagnóstico não foi ativado, pois a janela só instrumenta seus métodos
+    # se houver um coletor.
+    def __init__(self, clock=time.perf_counter_ns, window_s=WINDOW_S, windows=WINDOWS):
+        self.clock = clock
+        self.window_ns = int(window_s * 1e9)
+        self.n_windows = windows
+        self.metrics = {}
+        self.gauges = {"rss_bytes": GaugeSeries()}
+        self.started_ns = clock()
+        self.session_started_ns = self.started_ns
+
+    def record(self, name, value_ns, now_ns=None):
+        series = self.metrics.get(name)
+        if series is None:
+            series = self.metrics[name] = MetricSeries(self.window_ns, self.n_windows, self.started_ns)
+        series.add(max(value_ns, 0) // NS_PER_US, self.clock() if now_ns is None else now_ns)
+
+    def timed(self, name, function):
+        # Envolve function, registrando a duração de cada chamada
+        clock = self.clock
+        record = self.record
+
+        def wrapper(*args, **kwargs):
+            t0 = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                t1 = clock()
+                record(name, t1 - t0, t1)
+        wrapper.__name__ = getattr(function, "__name__", name)
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def instrument(self, obj, names, prefix="slot."):
+        # Substitui os métodos de obj pelas versões medidas (apenas nesta instância)
+        for name in names:
+            setattr(obj, name, self.timed(prefix + name, getattr(obj, name)))
+
+    def sample_memory(self, now_ns=None):
+        rss = rss_bytes()
+        if rss is not None:
+            self.gauges["rss_bytes"].add(rss, self.clock() if now_ns is None else now_ns)
+        return rss
+
+    def reset_session(self):
+        # Histogramas acumulados recomeçam a cada teste; as janelas continuam
+        self.session_started_ns = self.clock()
+        for series in self.metrics.values():
+            series.session.clear()
+
+    def snapshot(self, meta=None):
+        now_ns = self.clock()
+        rss = self.gauges["rss_bytes"]
+        return {
+            "meta": meta or {},
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "system": {"platform": platform.platform(), "python": platform.python_version(),
+                       "processor": platform.processor() or platform.machine()},
+            "session_s": (now_ns - self.session_started_ns) / 1e9,
+            "window_s": self.window_ns / 1e9,
+            "metrics": {name: dict(series.session.to_dict(), windows=series.window_dicts())
+                        for name, series in sorted(self.metrics.items())},
+            "rss": {"last_bytes": rss.last(), "peak_bytes": rss.peak,
+                    "samples": [((t_ns - self.started_ns) / 1e9, value) for t_ns, value in rss.samples()]},
+        }
+
+    def dump(self, path, meta=None):
+        # Gravação atômica (arquivo temporário + rename)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(meta), file, indent=1)
+        os.replace(path + ".tmp", path)
+        return path
@@ -0,0 +1,84 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                               QTableWidgetItem, QAbstractItemView, QHeaderView, QFileDialog, QMessageBox)
+from PySide6.QtCore import Qt
+
+from diagnostics import METRIC_LABELS
+
+
+class DiagnosticsPanel(QWidget):
+    # Resumo das medições do coletor: percentis do teste atual e da última
+    # janela, e memória do processo. Atualizado pela janela (refresh), não
+    # por um timer próprio.
+    HEADERS = ("Medição", "N", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Máx. (ms)", "p99 recente (ms)")
+
+    def __init__(self, diagnostics, parent=None):
+        super().__init__(parent)
+        self.diagnostics = diagnostics
+        layout = QVBoxLayout(self)
+
+        self.memory_label = QLabel("Memória: -")
+        layout.addWidget(self.memory_label)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch(1)
+        reset_button = QPushButton("Zerar")
+        reset_button.clicked.connect(self.reset)
+        buttons_layout.addWidget(reset_button)
+        save_button = QPushButton("Salvar JSON...")
+        save_button.clicked.connect(self.save)
+        buttons_layout.addWidget(save_button)
+        layout.addLayout(buttons_layout)
+
+    def refresh(self):
+        diagnostics = self.diagnostics
+        now_ns = diagnostics.clock()
+        rss = diagnostics.gauges["rss_bytes"]
+        if rss.count:
+            self.memory_label.setText(f"Memória (RSS): {rss.last() / 2**20:.1f} MB (pico {rss.peak / 2**20:.1f} MB)")
+
+        # Medições conhecidas na ordem de METRIC_LABELS, as demais em seguida
+        order = {name: index for index, name in enumerate(METRIC_LABELS)}
+        names = sorted(diagnostics.metrics, key=lambda name: (order.get(name, len(order)), name))
+        if self.table.rowCount() != len(names):
+            self.table.setRowCount(len(names))
+        for row, name in enumerate(names):
+            series = diagnostics.metrics[name]
+            summary = series.session.summary()
+            values = (METRIC_LABELS.get(name, name), str(summary["count"]),
+                      *(_ms(summary[key]) for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")),
+                      _ms(series.recent(now_ns).percentile_ms(99)))
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if column > 0:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.table.setItem(row, column, item)
+                if item.text() != value:
+                    item.setText(value)
+
+    def reset(self):
+        self.diagnostics.reset_session()
+        self.refresh()
+
+    def save(self):
+        filepath, _ = QFileDialog.getSaveFileName(self, "Salvar Diagnóstico", "diagnostico.json",
+                                                  "JSON (*.json);;Todos os Arquivos (*)")
+        if not filepath:
+            return
+        try:
+            self.diagnostics.dump(filepath)
+        except OSError as e:
+            QMessageBox.critical(self, "Erro ao Salvar", f"Não foi possível salvar o diagnóstico: {e}")
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.2f}"
@@ -0,0 +1,160 @@
+from array import array
+
+# Tipos de evento gravados no registro
+RELEASE = 0
+PRESS = 1
+
+NS_PER_S = 1_000_000_000
+
+
+class ZoneEvent:
+    __slots__ = ("zone", "t_ns", "kind")
+
+    def __init__(self, zone, t_ns, kind):
+        self.zone = zone
+        self.t_ns = t_ns
+        self.kind = kind
+
+    def __repr__(self):
+        kind = "press" if self.kind == PRESS else "release"
+        return f"ZoneEvent(zone={self.zone}, t_ns={self.t_ns}, kind={kind})"
+
+
+class EventLog:
+    # Registro append-only de eventos de zona. Cada evento ocupa uma posição
+    # em três buffers compactos (zona, timestamp monotônico em ns, tipo); os
+    # tempos acumulados são derivados do registro, nunca guardados à parte.
+    __slots__ = ("zones", "start_ns", "end_ns", "on_append", "_zone", "_t_ns", "_kind",
+                 "_active", "_active_since", "_totals_ns")
+
+    def __init__(self, zones, start_ns=0):
+        self.zones = tuple(zones)
+        self.start_ns = start_ns
+        self.end_ns = None
+        # Callback opcional on_append(zona, t_ns, tipo), ex.: diário em disco
+        self.on_append = None
+        self._zone = array("H")
+        self._t_ns = array("q")
+        self._kind = array("b")
+        self._active = -1
+        self._active_since = 0
+        self._totals_ns = [0] * len(self.zones)
+
+    @classmethod
+    def from_buffers(cls, zones, start_ns, end_ns, zone, t_ns, kind):
+        # Reconstrói um registro finalizado a partir dos buffers gravados
+        log = cls(zones, start_ns)
+        log._zone, log._t_ns, log._kind = zone, t_ns, kind
+        log._totals_ns = log.replay_totals_ns()
+        log.end_ns = end_ns
+        return log
+
+    def zone_index(self, name):
+        return self.zones.index(name)
+
+    @property
+    def active(self):
+        # Índice da zona atualmente pressionada, ou -1
+        return self._active
+
+    @property
+    def closed(self):
+        return self.end_ns is not None
+
+    def press(self, zone, t_ns):
+        if self.end_ns is not None or zone == self._active:
+            return False
+        # Pressionar uma zona solta a zona ativa no mesmo instante
+        if self._active >= 0:
+            self.release(self._active, t_ns)
+        t_ns = self._append(zone, t_ns, PRESS)
+        self._active = zone
+        self._active_since = t_ns
+        return True
+
+    def release(self, zone, t_ns):
+        if self.end_ns is not None or zone != self._active:
+            return False
+        t_ns = self._append(zone, t_ns, RELEASE)
+        self._totals_ns[zone] += t_ns - self._active_since
+        self._active = -1
+        return True
+
+    def close(self, t_ns):
+        # Finaliza o registro, soltando a zona ativa no instante final
+        if self.end_ns is not None:
+            return
+        if self._active >= 0:
+            self.release(self._active, t_ns)
+        self.end_ns = max(t_ns, self.last_ns())
+
+    def _append(self, zone, t_ns, kind):
+        # Mantém o registro monotônico mesmo com relógios injetados imprecisos
+        last = self.last_ns()
+        if t_ns < last:
+            t_ns = last
+        self._zone.append(zone)
+        self._t_ns.append(t_ns)
+        self._kind.append(kind)
+        if self.on_append is not None:
+            self.on_append(zone, t_ns, kind)
+        return t_ns
+
+    def last_ns(self):
+        return self._t_ns[-1] if self._t_ns else self.start_ns
+
+    def total_ns(self, zone, now_ns=None):
+        total = self._totals_ns[zone]
+        if now_ns is not None and zone == self._active:
+            total += max(now_ns - self._active_since, 0)
+        return total
+
+    def totals_ns(self, now_ns=None):
+        return [self.total_ns(zone, now_ns) for zone in range(len(self.zones))]
+
+    def totals_s(self, now_ns=None):
+        return [total / NS_PER_S for total in self.totals_ns(now_ns)]
+
+    def elapsed_ns(self, now_ns=None):
+        if self.end_ns is not None:
+            return self.end_ns - self.start_ns
+        if now_ns is None:
+            now_ns = self.last_ns()
+        return max(now_ns - self.start_ns, 0)
+
+    def replay_totals_ns(self):
+        # Recalcula os totais percorrendo todo o registro (verificação)
+        totals = [0] * len(self.zones)
+        since = {}
+        for zone, t_ns, kind in zip(self._zone, self._t_ns, self._kind):
+            if kind == PRESS:
+                since[zone] = t_ns
+            else:
+                totals[zone] += t_ns - since.pop(zone)
+        return totals
+
+    def buffers(self):
+        return self._zone, self._t_ns, self._kind
+
+    def arrays(self):
+        # Visões NumPy sem cópia sobre os buffers do registro
+        import numpy as np
+        return (np.frombuffer(self._zone, dtype=np.uint16),
+                np.frombuffer(self._t_ns, dtype=np.int64),
+                np.frombuffer(self._kind, dtype=np.int8))
+
+    def records(self):
+        # (zona, segundos desde o início, tipo) para relatórios e exportação
+        return [(self.zones[event.zone], (event.t_ns - self.start_ns) / NS_PER_S,
+                 "press" if event.kind == PRESS else "release")
+                for event in self]
+
+    def __len__(self):
+        return len(self._t_ns)
+
+    def __getitem__(self, index):
+        return ZoneEvent(self._zone[index], self._t_ns[index], self._kind[index])
+
+    def __iter__(self):
+        for zone, t_ns, kind in zip(self._zone, self._t_ns, self._kind):
+            yield ZoneEvent(zone, t_ns, kind)
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+from collections import deque
+
+from session import STARTED, PRESSED, RELEASED, STOPPED
+
+# Porta padrão do servidor de eventos (apenas 127.0.0.1)
+DEFAULT_PORT = 8765
+# Eventos pendentes por assinante; um assinante mais atrasado que isso é
+# desconectado (pode reconectar e detectar a lacuna pelo número de sequência)
+SUBSCRIBER_QUEUE = 1024
+# Buffer de envio do sistema por conexão: fixo e pequeno, para que um
+# cliente parado seja percebido logo (eventos são de poucas centenas de bytes)
+SEND_BUFFER = 64 * 1024
+PROTOCOL_VERSION = 1
+
+KIND_NAMES = {STARTED: "start", PRESSED: "press", RELEASED: "release", STOPPED: "stop"}
+
+
+class Subscriber:
+    # Fila limitada e tarefa de envio próprias: um cliente lento só atrasa a si mesmo
+    __slots__ = ("writer", "queue", "wakeup", "closed")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+
+class EventServer:
+    # Publica os eventos de marcação como JSON delimitado por linha (NDJSON)
+    # para processos locais, via TCP em 127.0.0.1 e/ou socket Unix. O laço
+    # asyncio roda numa thread própria; publish() apenas agenda o envio e
+    # volta imediatamente, sem esperar por nenhum cliente.
+    def __init__(self, port=DEFAULT_PORT, unix_path=None, queue_size=SUBSCRIBER_QUEUE):
+        self.port = port
+        self.unix_path = unix_path
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.seq = 0
+        self.published = 0
+        self.disconnected_slow = 0
+        self.loop = None
+        self._servers = []
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        self._owns_unix_path = False
+
+    def start(self):
+        # Inicia a thread do servidor e espera os sockets abrirem
+        self._thread = threading.Thread(target=self._run, name="openfield-events", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._open())
+        except OSError as e:
+            # Fecha o que chegou a abrir (ex.: a porta TCP antes do socket Unix)
+            for server in self._servers:
+                server.close()
+            self._error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self._shutdown())
+            self.loop.close()
+
+    async def _open(self):
+        if self.port is not None:
+            server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+            # Porta 0: o sistema escolhe; a escolhida fica em self.port
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if self.unix_path is not None:
+            _remove_stale_socket(self.unix_path)
+            self._servers.append(await asyncio.start_unix_server(self._handle, self.unix_path))
+            self._owns_unix_path = True
+
+    async def _shutdown(self):
+        for server in self._servers:
+            server.close()
+        for subscriber in list(self.subscribers):
+            self._drop(subscriber)
+        # Com as conexões abortadas as tarefas terminam sozinhas; cancelar as
+        # de atendimento faria o asyncio registrar o cancelamento como erro
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=1)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        # Remove apenas o socket criado por este servidor
+        if self._owns_unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+    def close(self):
+        if self.loop is not None and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+    async def _handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        subscriber = Subscriber(writer)
+        self.subscribers.add(subscriber)
+        hello = {"type": "hello", "version": PROTOCOL_VERSION, "seq": self.seq}
+        subscriber.queue.append(json.dumps(hello).encode() + b"\n")
+        sender = asyncio.ensure_future(self._send_loop(subscriber))
+        try:
+            # O cliente não envia comandos; a leitura só detecta a desconexão
+            while await reader.read(4096):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._drop(subscriber)
+            sender.cancel()
+
+    async def _send_loop(self, subscriber):
+        writer = subscriber.writer
+        try:
+            while not subscriber.closed:
+                if not subscriber.queue:
+                    subscriber.wakeup.clear()
+                    await subscriber.wakeup.wait()
+                    continue
+                # Tudo o que acumulou vai numa única escrita
+                chunk = b"".join(subscriber.queue)
+                subscriber.queue.clear()
+                writer.write(chunk)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        subscriber.wakeup.set()
+        self.subscribers.discard(subscriber)
+        subscriber.writer.transport.abort()
+
+    def _fan_out(self, event):
+        # Roda no laço asyncio: serializa uma vez e enfileira para todos
+        self.seq += 1
+        event["seq"] = self.seq
+        line = json.dumps(event).encode() + b"\n"
+        for subscriber in list(self.subscribers):
+            if len(subscriber.queue) >= self.queue_size:
+                self.disconnected_slow += 1
+                self._drop(subscriber)
+                continue
+            subscriber.queue.append(line)
+            subscriber.wakeup.set()
+
+    def publish(self, event):
+        # Chamado de qualquer thread (ex.: a da interface); custo de poucos µs
+        if self.loop is None:
+            return
+        self.published += 1
+        event.setdefault("wall_ns", time.time_ns())
+        try:
+            self.loop.call_soon_threadsafe(self._fan_out, event)
+        except RuntimeError:
+            # Laço já encerrado (aplicativo fechando)
+            pass
+
+    def attach(self, session, arena_name="", source="main"):
+        # Publica as notificações de uma ScoringSession
+        session.subscribe(lambda kind, zone: self.publish(session_event(session, kind, zone, arena_name, source)))
+
+
+def _remove_stale_socket(path):
+    # Um caminho existente só é removido se for um socket abandonado (nenhum
+    # processo aceita conexões nele); qualquer outro arquivo é preservado
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"o caminho do socket já existe e não é um socket: {path}")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"outro processo já atende em {path}")
+
+
+def session_event(session, kind, zone, arena_name="", source="main"):
+    # Evento publicado: instantes no relógio monotônico da sessão (t_ns) e
+    # relativos ao início do teste (t_s)
+    log = session.event_log
+    if kind == STARTED:
+        t_ns = log.start_ns
+    elif kind == STOPPED:
+        t_ns = log.end_ns if log.end_ns is not None else log.last_ns()
+    else:
+        t_ns = log.last_ns()
+    event = {
+        "type": KIND_NAMES[kind],
+        "source": source,
+        "arena": arena_name,
+        "animal_id": session.animal_id,
+        "t_ns": t_ns,
+        "t_s": (t_ns - log.start_ns) / 1e9,
+    }
+    if zone >= 0:
+        event["zone"] = session.zones[zone]
+    if kind == STARTED:
+        event.update(started_at=session.started_at, duration_s=session.duration_s, zones=list(session.zones),
+                     experimenter=session.experimenter, treatment_group=session.treatment_group)
+    elif kind == STOPPED:
+        event["totals_s"] = dict(zip(session.zones, log.totals_s()))
+    return event
+
+
+def start_server(port=DEFAULT_PORT, unix_path=None):
+    # Servidor pronto ou None (com aviso) se o endereço estiver em uso
+    try:
+        return EventServer(port, unix_path).start()
+    except OSError as e:
+        print(f"Servidor de eventos indisponível: {e}", file=sys.stderr)
+        return None
@@ -0,0 +1,253 @@
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+from event_log import NS_PER_S, PRESS
+from metrics import compute_metrics
+
+# Formato escolhido pela extensão do arquivo
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".parquet": "parquet", ".feather": "feather"}
+
+# Sessões lidas e escritas por vez (memória limitada a um bloco)
+CHUNK_SESSIONS = 500
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def format_for_path(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"formato de exportação não suportado: {path}")
+    return fmt
+
+
+def session_columns(rows, logs, zone_sets=None):
+    # Uma linha por sessão: metadados, tempos, porcentagens e métricas. As
+    # métricas são calculadas por conjunto de zonas (sessões de arenas
+    # diferentes podem estar no mesmo bloco); as colunas cobrem as zonas de
+    # todos os conjuntos da exportação (zone_sets) e ficam vazias nas
+    # sessões sem aquela zona, para que todos os blocos tenham as mesmas colunas.
+    if zone_sets is None:
+        zone_sets = list(dict.fromkeys(log.zones for log in logs))
+    zones = list(dict.fromkeys(zone for zone_set in zone_sets for zone in zone_set))
+    # Zonas presentes em todas as sessões mantêm as entradas como inteiros
+    shared = set(zones).intersection(*zone_sets)
+    effective = np.array([row[6] for row in rows], dtype=float)
+    columns = {
+        "session_id": [row[0] for row in rows],
+        "animal_id": [row[1] for row in rows],
+        "started_at": [row[2] for row in rows],
+        "experimenter": [row[3] for row in rows],
+        "treatment_group": [row[4] for row in rows],
+        "arena": [row[10] for row in rows],
+        "duration_s": [row[5] for row in rows],
+        "effective_s": effective,
+        "n_events": [row[9] for row in rows],
+    }
+    n_rows = len(rows)
+    for zone in zones:
+        columns[f"{zone}_time_s"] = np.full(n_rows, np.nan)
+        columns[f"{zone}_pct"] = np.full(n_rows, np.nan)
+        columns[f"{zone}_entries"] = np.zeros(n_rows, dtype=np.int64) if zone in shared else np.full(n_rows, np.nan)
+        columns[f"{zone}_latency_s"] = np.full(n_rows, np.nan)
+        columns[f"{zone}_bout_mean_s"] = np.full(n_rows, np.nan)
+
+    by_zones = {}
+    for index, log in enumerate(logs):
+        by_zones.setdefault(log.zones, []).append(index)
+    for zone_set, indices in by_zones.items():
+        metrics = compute_metrics([logs[index] for index in indices])
+        percent = metrics["totals_s"] / np.maximum(effective[indices], 0.001)[:, None] * 100
+        for z, zone in enumerate(zone_set):
+            columns[f"{zone}_time_s"][indices] = metrics["totals_s"][:, z]
+            columns[f"{zone}_pct"][indices] = percent[:, z]
+            columns[f"{zone}_entries"][indices] = metrics["entries"][:, z]
+            columns[f"{zone}_latency_s"][indices] = metrics["latency_s"][:, z]
+            columns[f"{zone}_bout_mean_s"][indices] = metrics["bout_mean_s"][:, z]
+    return columns
+
+
+def event_columns(rows, logs):
+    # Uma linha por evento, com o tempo relativo ao início do teste; o nome
+    # da zona vem das zonas de cada registro
+    arrays = [log.arrays() for log in logs]
+    counts = np.array([len(log) for log in logs], dtype=np.int64)
+    zone = np.concatenate([np.array(log.zones, dtype=object)[a[0].astype(np.int64)]
+                           for log, a in zip(logs, arrays)]) if logs else np.empty(0, dtype=object)
+    t_ns = np.concatenate([a[1] for a in arrays]) - np.repeat([log.start_ns for log in logs], counts)
+    kind = np.concatenate([a[2] for a in arrays])
+    owner = np.repeat(np.arange(len(rows)), counts)
+    return {
+        "session_id": np.array([row[0] for row in rows], dtype=np.int64)[owner],
+        "animal_id": np.array([row[1] for row in rows], dtype=object)[owner],
+        "arena": np.array([row[10] for row in rows], dtype=object)[owner],
+        "event_index": np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts),
+        "zone": zone,
+        "t_ns": t_ns,
+        "t_s": t_ns / NS_PER_S,
+        "kind": np.where(kind == PRESS, "press", "release").astype(object),
+    }
+
+
+def _aligned(columns, names):
+    # Colunas de um bloco na ordem do cabeçalho já escrito; as ausentes
+    # ficam vazias, e uma coluna nova não caberia no arquivo
+    extra = [name for name in columns if name not in names]
+    if extra:
+        raise ValueError(f"colunas fora do cabeçalho da exportação: {', '.join(extra)}")
+    n_rows = len(next(iter(columns.values())))
+    return {name: columns[name] if name in columns else [None] * n_rows for name in names}
+
+
+def _rows(columns):
+    # Converte colunas em linhas de valores Python (NaN vira vazio)
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+    for row in zip(*values):
+        yield [None if isinstance(value, float) and math.isnan(value) else value for value in row]
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.header = None
+
+    def write(self, columns):
+        if self.header is None:
+            self.header = list(columns)
+            self.writer.writerow(self.header)
+        elif list(columns) != self.header:
+            columns = _aligned(columns, self.header)
+        self.writer.writerows(_rows(columns))
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, columns):
+        keys = list(columns)
+        for row in _rows(columns):
+            self.file.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowSink:
+    # Parquet e Feather (Arrow IPC) escritos bloco a bloco; requer pyarrow
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("exportação em Parquet/Feather requer o pacote pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.path = path
+        self.fmt = fmt
+        self.writer = None
+        self.schema = None
+
+    def write(self, columns):
+        pa = self.pa
+        if self.schema is not None and list(columns) != self.schema.names:
+            columns = _aligned(columns, self.schema.names)
+        data = {name: column.tolist() if isinstance(column, np.ndarray) and column.dtype == object else column
+                for name, column in columns.items()}
+        # Os blocos seguintes seguem o esquema do primeiro
+        batch = pa.RecordBatch.from_pydict(data, schema=self.schema)
+        if self.writer is None:
+            self.schema = batch.schema
+            if self.fmt == "parquet":
+                import pyarrow.parquet
+                self.writer = pyarrow.parquet.ParquetWriter(self.path, batch.schema)
+            else:
+                import pyarrow.ipc
+                self.writer = pyarrow.ipc.new_file(self.path, batch.schema)
+        if self.fmt == "parquet":
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write(batch)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path, fmt):
+    if fmt == "csv":
+        return CsvSink(path)
+    if fmt == "jsonl":
+        return JsonLinesSink(path)
+    return ArrowSink(path, fmt)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_sessions(store, path, per_event=False, session_ids=None, filters=None,
+                    chunk_size=CHUNK_SESSIONS, progress=None, is_cancelled=None):
+    # Exporta as sessões escolhidas (ids explícitos ou filtros do banco) em
+    # blocos; progress(feitas, total) é chamado após cada bloco. Devolve o
+    # número de linhas escritas e os ids pedidos que não existem mais no
+    # banco (excluídos depois de escolhidos), que são ignorados.
+    fmt = format_for_path(path)
+    filters = filters or {}
+    if session_ids is not None:
+        total = len(session_ids)
+        ids = iter(session_ids)
+    else:
+        total = store.count(**filters)
+        ids = store.iter_ids(**filters)
+    # Colunas de zona fixadas antes do primeiro bloco (arenas diferentes na seleção)
+    zone_sets = None
+    if not per_event:
+        zone_sets = store.zone_sets(session_ids) if session_ids is not None else store.zone_sets(**filters)
+
+    sink = open_sink(path, fmt)
+    done = rows_written = 0
+    missing = []
+    try:
+        for chunk in _chunks(ids, chunk_size):
+            if is_cancelled is not None and is_cancelled():
+                raise ExportCancelled()
+            rows, logs = [], []
+            for session_id in chunk:
+                row = store.get(session_id)
+                try:
+                    log = store.load_log(session_id) if row is not None else None
+                except KeyError:
+                    log = None
+                if log is None:
+                    missing.append(session_id)
+                    continue
+                rows.append(row)
+                logs.append(log)
+            columns = event_columns(rows, logs) if per_event else session_columns(rows, logs, zone_sets)
+            if len(columns["session_id"]):
+                sink.write(columns)
+            rows_written += len(columns["session_id"])
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+    except BaseException:
+        sink.close()
+        os.remove(path)
+        raise
+    sink.close()
+    return rows_written, missing
@@ -0,0 +1,54 @@
+import time
+from array import array
+
+NS_PER_MS = 1_000_000
+
+
+class InputTimestamper:
+    # Converte o timestamp dos eventos de entrada (ms, relógio do sistema de
+    # janelas) para o relógio monotônico da sessão, de modo que o tempo de
+    # fila de eventos do Qt não entra nas durações. A diferença entre os dois
+    # relógios é medida no primeiro evento do teste e fica fixa até reset():
+    # todos os eventos do teste usam o mesmo deslocamento, e os intervalos
+    # entre eles não mudam. Por isso o atraso registrado é relativo ao do
+    # primeiro evento, e o atraso fixo entre a tecla e o aplicativo não aparece.
+    def __init__(self, clock=time.perf_counter_ns, capacity=4096):
+        self.clock = clock
+        self.offset_ns = None
+        self._latencies = array("q", [0] * capacity)
+        self._count = 0
+
+    def to_clock(self, event_ms, now_ns=None):
+        if now_ns is None:
+            now_ns = self.clock()
+        if not event_ms:
+            # Plataformas sem timestamp de evento: usa o instante atual
+            return now_ns
+        if self.offset_ns is None:
+            self.offset_ns = now_ns - event_ms * NS_PER_MS
+        # Um evento entregue mais rápido que o primeiro cairia no futuro: fica no instante atual
+        return min(event_ms * NS_PER_MS + self.offset_ns, now_ns)
+
+    def record_latency(self, event_ns, recorded_ns=None):
+        # Atraso entre o evento de entrada e sua gravação no registro, relativo
+        # ao do primeiro evento do teste (a variação, não a latência absoluta)
+        if recorded_ns is None:
+            recorded_ns = self.clock()
+        self._latencies[self._count % len(self._latencies)] = recorded_ns - event_ns
+        self._count += 1
+
+    def reset(self):
+        # Novo teste: a diferença entre os relógios é medida de novo
+        self.offset_ns = None
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, len(self._latencies))
+
+    def percentiles_ms(self, *quantiles):
+        # Percentis (em ms) das latências mais recentes do buffer circular
+        n = len(self)
+        if n == 0:
+            return [None] * len(quantiles)
+        values = sorted(self._latencies[:n])
+        return [values[min(int(q / 100 * n), n - 1)] / NS_PER_MS for q in quantiles]
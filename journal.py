@@ -0,0 +1,188 @@
+import json
+import os
+import struct
+import threading
+import time
+
+from event_log import EventLog, NS_PER_S, PRESS
+from store import DEFAULT_DB_PATH
+
+# Diário de escrita antecipada (write-ahead) de cada teste em andamento
+DEFAULT_JOURNAL_DIR = os.environ.get(
+    "OPENFIELD_JOURNAL", os.path.join(os.path.dirname(DEFAULT_DB_PATH), "journal"))
+
+MAGIC = b"OFJ1"
+HEADER_LENGTH = struct.Struct("<I")
+# Registro fixo: zona, timestamp (ns), tipo (0 soltura, 1 pressão, 2 fim,
+# 3 batimento)
+RECORD = struct.Struct("<Hqb")
+END = 2
+HEARTBEAT = 3
+
+# Política de sincronização: fsync a cada 250 ms ou a cada 64 eventos
+SYNC_INTERVAL_S = 0.25
+SYNC_EVENTS = 64
+# Batimento: instante (relógio da sessão) até o qual o teste certamente
+# estava em andamento; numa queda, perde-se no máximo este intervalo
+HEARTBEAT_INTERVAL_S = 1.0
+
+_counter = 0
+
+
+class JournalWriter:
+    # Os eventos entram num buffer em memória (custo mínimo no caminho de
+    # entrada); uma thread própria grava e faz fsync em lotes.
+    def __init__(self, path, meta, sync_interval_s=SYNC_INTERVAL_S, sync_events=SYNC_EVENTS,
+                 clock=None, heartbeat_interval_s=HEARTBEAT_INTERVAL_S):
+        self.path = path
+        self.sync_interval_s = sync_interval_s
+        self.sync_events = sync_events
+        # Sem relógio (clock=None) não há batimentos
+        self.clock = clock
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._heartbeat_at = time.monotonic()
+        self.sync_count = 0
+        self.sync_ns = 0
+        self.finished = False
+        header = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self._sync()
+        _sync_directory(os.path.dirname(path))
+        self._pending = bytearray()
+        self._pending_events = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="journal-sync", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def create(cls, session, directory=DEFAULT_JOURNAL_DIR, arena="", **kwargs):
+        global _counter
+        os.makedirs(directory, exist_ok=True)
+        _counter += 1
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{_counter}.journal"
+        log = session.event_log
+        meta = {
+            "animal_id": session.animal_id,
+            "experimenter": session.experimenter,
+            "treatment_group": session.treatment_group,
+            "started_at": session.started_at,
+            "duration_s": session.duration_s,
+            "zones": list(log.zones),
+            "start_ns": log.start_ns,
+            "arena": arena,
+        }
+        kwargs.setdefault("clock", session.clock)
+        journal = cls(os.path.join(directory, name), meta, **kwargs)
+        # Eventos já existentes (sessão restaurada) entram primeiro no diário
+        for event in log:
+            journal.append(event.zone, event.t_ns, event.kind)
+        log.on_append = journal.append
+        return journal
+
+    def append(self, zone, t_ns, kind):
+        with self._cond:
+            self._pending += RECORD.pack(zone, t_ns, kind)
+            self._pending_events += 1
+            if self._pending_events >= self.sync_events:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending_events < self.sync_events:
+                    self._cond.wait(self.sync_interval_s)
+                data = bytes(self._pending)
+                self._pending.clear()
+                self._pending_events = 0
+                closed = self._closed
+                # Batimento depois dos eventos já recebidos (mesmo relógio)
+                now = time.monotonic()
+                if (not closed and self.clock is not None
+                        and now - self._heartbeat_at >= self.heartbeat_interval_s):
+                    data += RECORD.pack(0, self.clock(), HEARTBEAT)
+                    self._heartbeat_at = now
+            if data:
+                self._file.write(data)
+                self._sync()
+            if closed:
+                return
+
+    def _sync(self):
+        t0 = time.perf_counter_ns()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.sync_ns += time.perf_counter_ns() - t0
+        self.sync_count += 1
+
+    def finish(self, end_ns):
+        # Marca o teste como concluído; o diário só é removido após a gravação no banco
+        self.append(0, end_ns, END)
+        self.finished = True
+        self.close()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._file.close()
+
+    def discard(self):
+        self.close()
+        os.remove(self.path)
+
+
+def _sync_directory(directory):
+    # Garante que a nova entrada de diretório também sobreviva a uma queda de energia
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def find_journals(directory=DEFAULT_JOURNAL_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".journal"))
+
+
+def read_journal(path):
+    # Devolve (metadados, registro de eventos, concluído?). Um último
+    # registro incompleto (escrita interrompida) é descartado.
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"arquivo de diário inválido: {path}")
+    offset = len(MAGIC)
+    (header_length,) = HEADER_LENGTH.unpack_from(data, offset)
+    offset += HEADER_LENGTH.size
+    meta = json.loads(data[offset:offset + header_length].decode("utf-8"))
+    body = data[offset + header_length:]
+    body = body[:len(body) - len(body) % RECORD.size]
+
+    log = EventLog(meta["zones"], meta["start_ns"])
+    end_ns = None
+    heartbeat_ns = None
+    for zone, t_ns, kind in RECORD.iter_unpack(body):
+        if kind == END:
+            end_ns = t_ns
+        elif kind == HEARTBEAT:
+            heartbeat_ns = t_ns
+        elif kind == PRESS:
+            log.press(zone, t_ns)
+        else:
+            log.release(zone, t_ns)
+    finished = end_ns is not None
+    if not finished:
+        # Teste interrompido: vai até o último batimento (uma pressão sem
+        # soltura gravada conta até ali), sem passar da duração programada
+        end_ns = max(heartbeat_ns or 0, log.last_ns())
+        end_ns = min(end_ns, max(meta["start_ns"] + meta["duration_s"] * NS_PER_S, log.last_ns()))
+    log.close(end_ns)
+    return meta, log, finished
@@ -0,0 +1,124 @@
+import numpy as np
+
+from event_log import NS_PER_S, PRESS
+
+# Limites (s) dos histogramas de duração de episódios
+DEFAULT_BOUT_EDGES_S = (0.0, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, np.inf)
+
+
+def session_intervals(log, now_ns=None):
+    # (zona, início, fim) de cada permanência, em ns relativos ao início do
+    # teste. O registro alterna pressão/soltura; uma pressão ainda aberta é
+    # fechada em now_ns (ou no último evento).
+    zone, t_ns, kind = log.arrays()
+    press = kind == PRESS
+    starts = t_ns[press] - log.start_ns
+    ends = t_ns[~press] - log.start_ns
+    if len(ends) < len(starts):
+        end_ns = log.end_ns if log.end_ns is not None else (now_ns if now_ns is not None else log.last_ns())
+        ends = np.append(ends, max(end_ns - log.start_ns, starts[-1]))
+    return zone[press].astype(np.int64), starts, ends
+
+
+def batch_intervals(logs, now_ns=None):
+    # Concatena as permanências de várias sessões com o índice da sessão
+    zones = logs[0].zones
+    parts = []
+    for log in logs:
+        if log.zones != zones:
+            raise ValueError("todas as sessões devem usar as mesmas zonas")
+        parts.append(session_intervals(log, now_ns))
+    counts = np.array([len(part[0]) for part in parts], dtype=np.int64)
+    session = np.repeat(np.arange(len(logs), dtype=np.int64), counts)
+    zone = np.concatenate([part[0] for part in parts]) if parts else np.empty(0, np.int64)
+    start = np.concatenate([part[1] for part in parts]) if parts else np.empty(0, np.int64)
+    end = np.concatenate([part[2] for part in parts]) if parts else np.empty(0, np.int64)
+    duration = np.array([log.elapsed_ns(now_ns) for log in logs], dtype=np.int64)
+    return session, zone, start, end, duration
+
+
+def compute_metrics(logs, bin_s=60, bout_edges_s=DEFAULT_BOUT_EDGES_S, now_ns=None):
+    # Métricas comportamentais de uma ou mais sessões, todas calculadas com
+    # aritmética de intervalos vetorizada; cada resultado tem a sessão como
+    # primeiro eixo.
+    if not logs:
+        raise ValueError("nenhuma sessão para calcular as métricas")
+    n_sessions = len(logs)
+    zones = logs[0].zones
+    n_zones = len(zones)
+    session, zone, start, end, duration = batch_intervals(logs, now_ns)
+    length = end - start
+    group = session * n_zones + zone
+    n_groups = n_sessions * n_zones
+
+    # Totais e número de entradas por zona
+    totals = np.bincount(group, weights=length, minlength=n_groups) / NS_PER_S
+    entries = np.bincount(group, minlength=n_groups)
+
+    # Latência até a primeira entrada em cada zona
+    latency = np.full(n_groups, np.inf)
+    np.minimum.at(latency, group, start / NS_PER_S)
+    latency[np.isinf(latency)] = np.nan
+
+    # Ocupação por intervalo de tempo: cada permanência é dividida nas
+    # fronteiras dos intervalos e os pedaços acumulados por (sessão, zona, intervalo)
+    bin_ns = int(bin_s * NS_PER_S)
+    n_bins = int(-(-duration.max() // bin_ns)) if n_sessions and duration.max() > 0 else 0
+    first_bin = start // bin_ns
+    last_bin = np.maximum((end - 1) // bin_ns, first_bin)
+    pieces = last_bin - first_bin + 1
+    piece_interval = np.repeat(np.arange(len(start)), pieces)
+    piece_offset = np.arange(len(piece_interval)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    piece_bin = first_bin[piece_interval] + piece_offset
+    piece_start = np.maximum(start[piece_interval], piece_bin * bin_ns)
+    piece_end = np.minimum(end[piece_interval], (piece_bin + 1) * bin_ns)
+    piece_bin = np.minimum(piece_bin, max(n_bins - 1, 0))
+    binned = np.bincount(group[piece_interval] * max(n_bins, 1) + piece_bin,
+                         weights=piece_end - piece_start, minlength=n_groups * max(n_bins, 1))
+    binned = binned.reshape(n_sessions, n_zones, max(n_bins, 1))[:, :, :n_bins] / NS_PER_S
+
+    # Matriz de transições entre permanências consecutivas da mesma sessão
+    same_session = session[1:] == session[:-1]
+    transition_key = (session[1:] * n_zones + zone[:-1]) * n_zones + zone[1:]
+    transitions = np.bincount(transition_key[same_session], minlength=n_groups * n_zones)
+
+    # Estatísticas dos episódios (bouts) por zona
+    length_s = length / NS_PER_S
+    order = np.lexsort((length_s, group))
+    sorted_lengths = length_s[order]
+    first = np.cumsum(entries) - entries
+    has_bouts = entries > 0
+    median = np.full(n_groups, np.nan)
+    lower = first[has_bouts] + (entries[has_bouts] - 1) // 2
+    upper = first[has_bouts] + entries[has_bouts] // 2
+    median[has_bouts] = (sorted_lengths[lower] + sorted_lengths[upper]) / 2
+    maximum = np.full(n_groups, np.nan)
+    maximum[has_bouts] = sorted_lengths[first[has_bouts] + entries[has_bouts] - 1]
+    mean = np.divide(totals, entries, out=np.full(n_groups, np.nan), where=has_bouts)
+    edges = np.asarray(bout_edges_s, dtype=float)
+    hist_bin = np.clip(np.searchsorted(edges, length_s, side="right") - 1, 0, len(edges) - 2)
+    bout_hist = np.bincount(group * (len(edges) - 1) + hist_bin, minlength=n_groups * (len(edges) - 1))
+
+    shape = (n_sessions, n_zones)
+    return {
+        "zones": zones,
+        "bin_s": bin_s,
+        "bout_edges_s": edges,
+        "duration_s": duration / NS_PER_S,
+        "totals_s": totals.reshape(shape),
+        "entries": entries.reshape(shape),
+        "latency_s": latency.reshape(shape),
+        "binned_s": binned,
+        "transitions": transitions.reshape(n_sessions, n_zones, n_zones),
+        "bout_mean_s": mean.reshape(shape),
+        "bout_median_s": median.reshape(shape),
+        "bout_max_s": maximum.reshape(shape),
+        "bout_hist": bout_hist.reshape(n_sessions, n_zones, len(edges) - 1),
+    }
+
+
+def session_metrics(log, bin_s=60, bout_edges_s=DEFAULT_BOUT_EDGES_S, now_ns=None):
+    # Métricas de uma única sessão (sem o eixo de sessões)
+    metrics = compute_metrics([log], bin_s, bout_edges_s, now_ns)
+    return {key: value[0] if isinstance(value, np.ndarray) and key != "bout_edges_s" else value
+            for key, value in metrics.items()}
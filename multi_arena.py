@@ -0,0 +1,353 @@
+import sqlite3
+
+from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+                               QLabel, QLineEdit, QPushButton, QGroupBox, QMessageBox, QScrollArea)
+from PySide6.QtCore import QTimer, Qt, QSettings
+from PySide6.QtGui import QKeySequence
+
+from arena import builtin_arenas, find_arena, open_field_arena
+from arenas import ArenaGroup
+from event_log import NS_PER_S
+from input_timing import InputTimestamper
+from session import PRESSED, RELEASED, STOPPED
+from store import SessionStore
+
+# Teclas padrão por arena para a arena padrão de 3 áreas (uma tecla por
+# zona, na ordem das zonas)
+DEFAULT_ARENA_KEYS = ("123", "QWE", "ASD", "ZXC", "456", "RTY", "FGH", "VBN",
+                      "789", "UIO", "JKL", "M,.", "0-=", "P[]", ";'\\", "/*+")
+
+COLUMNS = 4
+
+
+def default_keys(definition, arena):
+    # Teclas iniciais da arena de índice arena: as de DEFAULT_ARENA_KEYS com
+    # 3 áreas; com outras definições, só a primeira arena usa as da definição
+    if len(definition.zones) == 3 and arena < len(DEFAULT_ARENA_KEYS):
+        return DEFAULT_ARENA_KEYS[arena]
+    if arena == 0 and all(len(definition.keys[zone]) == 1 for zone in definition.zones):
+        return "".join(definition.keys[zone] for zone in definition.zones)
+    return ""
+
+
+class ArenaPanel(QGroupBox):
+    def __init__(self, arena, definition):
+        super().__init__(f"Arena {arena + 1}")
+        self.definition = definition
+        layout = QGridLayout(self)
+
+        layout.addWidget(QLabel("ID do Animal:"), 0, 0)
+        self.animal_id_entry = QLineEdit()
+        layout.addWidget(self.animal_id_entry, 0, 1, 1, 2)
+
+        layout.addWidget(QLabel("Grupo:"), 1, 0)
+        self.group_entry = QLineEdit()
+        layout.addWidget(self.group_entry, 1, 1, 1, 2)
+
+        layout.addWidget(QLabel("Duração (s):"), 2, 0)
+        self.duration_entry = QLineEdit("300")
+        layout.addWidget(self.duration_entry, 2, 1, 1, 2)
+
+        layout.addWidget(QLabel("Teclas:"), 3, 0)
+        self.keys_entry = QLineEdit()
+        self.keys_entry.setMaxLength(len(definition.zones))
+        self.keys_entry.setToolTip("Uma tecla por área: " +
+                                   ", ".join(definition.labels[zone] for zone in definition.zones))
+        layout.addWidget(self.keys_entry, 3, 1, 1, 2)
+
+        self.timer_label = QLabel("00:00")
+        self.timer_label.setAlignment(Qt.AlignCenter)
+        self.timer_label.setStyleSheet("font-size: 18px; font-weight: bold;")
+        layout.addWidget(self.timer_label, 4, 0, 1, 3)
+
+        self.zone_buttons = {}
+        buttons_layout = QGridLayout()
+        for index, zone in enumerate(definition.zones):
+            button = QPushButton(definition.labels[zone])
+            button.setFocusPolicy(Qt.NoFocus)
+            button.setEnabled(False)
+            buttons_layout.addWidget(button, *divmod(index, definition.columns))
+            self.zone_buttons[zone] = button
+            self.highlight(zone, False)
+        layout.addLayout(buttons_layout, 5, 0, 1, 3)
+
+        self.totals_label = QLabel()
+        self.totals_label.setWordWrap(True)
+        layout.addWidget(self.totals_label, 6, 0, 1, 3)
+
+    def highlight(self, zone, is_pressed):
+        background, color = ("darkgray", "white") if is_pressed else self.definition.colors[zone]
+        self.zone_buttons[zone].setStyleSheet(f"background-color: {background}; color: {color}; font-weight: bold;")
+
+    def config_widgets(self):
+        return (self.animal_id_entry, self.group_entry, self.duration_entry, self.keys_entry)
+
+
+class MultiArenaWindow(QMainWindow):
+    # Marcação simultânea de várias arenas: um relógio, um timer de prazo e
+    # um único timer de atualização da interface para todas as arenas
+    def __init__(self, n_arenas, store=None, event_server=None, arena_path=None):
+        super().__init__()
+        self.setWindowTitle(f"Teste de Campo Aberto - {n_arenas} Arenas")
+        self.setGeometry(100, 100, 1400, 800)
+
+        # Definição de arena (zonas, rótulos, cores e teclas), a mesma em todas
+        # as arenas: a de --arena ou a escolhida por último na janela principal
+        self.settings = QSettings("OpenField", "OpenFieldApp")
+        self.definition = find_arena(arena_path or self.settings.value("arena", ""), builtin_arenas())
+        self.group = ArenaGroup(n_arenas, self.definition.zones, arena_name=self.definition.name)
+        self.input_timestamper = InputTimestamper(self.group.clock)
+        # Teclas em uso por arena (texto do campo aceito por último)
+        self.bound_keys = {}
+        if store is None:
+            try:
+                store = SessionStore()
+            except sqlite3.Error:
+                store = None
+        self.store = store
+
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.setTimerType(Qt.PreciseTimer)
+        self.deadline_timer.timeout.connect(self.on_deadline)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(200)
+        self.refresh_timer.setTimerType(Qt.CoarseTimer)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.init_ui()
+        for arena, session in enumerate(self.group.sessions):
+            session.subscribe(lambda kind, zone, arena=arena: self.on_session_event(arena, kind, zone))
+            if event_server is not None:
+                event_server.attach(session, self.definition.name, source=f"arena{arena + 1}")
+        self.update_key_map()
+
+    def init_ui(self):
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Experimentador:"))
+        self.experimenter_entry = QLineEdit()
+        controls_layout.addWidget(self.experimenter_entry)
+
+        self.start_button = QPushButton("Iniciar Todas")
+        self.start_button.setMinimumHeight(40)
+        self.start_button.setStyleSheet("background-color: green; color: white; font-weight: bold;")
+        self.start_button.clicked.connect(self.start_all)
+        controls_layout.addWidget(self.start_button)
+
+        self.stop_button = QPushButton("Parar Todas")
+        self.stop_button.setMinimumHeight(40)
+        self.stop_button.setStyleSheet("background-color: red; color: white; font-weight: bold;")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_all)
+        controls_layout.addWidget(self.stop_button)
+        main_layout.addLayout(controls_layout)
+
+        arenas_widget = QWidget()
+        arenas_layout = QGridLayout(arenas_widget)
+        self.panels = []
+        for arena in range(len(self.group)):
+            panel = ArenaPanel(arena, self.definition)
+            keys = self.settings.value(self.keys_setting(arena), default_keys(self.definition, arena))
+            panel.keys_entry.setText(keys)
+            panel.keys_entry.editingFinished.connect(self.update_key_map)
+            for zone, button in panel.zone_buttons.items():
+                button.pressed.connect(lambda arena=arena, zone=zone: self.group.sessions[arena].press(zone))
+                button.released.connect(lambda arena=arena, zone=zone: self.group.sessions[arena].release(zone))
+            arenas_layout.addWidget(panel, arena // COLUMNS, arena % COLUMNS)
+            self.panels.append(panel)
+            self.update_panel(arena)
+
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(arenas_widget)
+        main_layout.addWidget(scroll)
+
+    def update_key_map(self):
+        for arena, panel in enumerate(self.panels):
+            keys = panel.keys_entry.text()
+            bindings = {}
+            for zone, char in zip(self.definition.zones, keys):
+                sequence = QKeySequence(char)
+                bindings[zone] = sequence[0].key() if not sequence.isEmpty() else None
+            try:
+                self.group.bind_keys(arena, bindings)
+            except ValueError as e:
+                # Conflito: volta às teclas anteriores da arena
+                panel.keys_entry.setText(self.bound_keys.get(arena, ""))
+                QMessageBox.warning(self, "Teclas de Marcação", f"Arena {arena + 1}: {e}.")
+                continue
+            self.bound_keys[arena] = keys
+            self.settings.setValue(self.keys_setting(arena), keys)
+
+    def keys_setting(self, arena):
+        # Teclas gravadas por definição: a arena padrão mantém a chave antiga
+        if self.definition.name == open_field_arena().name:
+            return f"arena_keys/{arena}"
+        return f"arena_keys/{self.definition.name}/{arena}"
+
+    def start_all(self):
+        assignments = {}
+        for arena, panel in enumerate(self.panels):
+            animal_id = panel.animal_id_entry.text().strip()
+            if not animal_id:
+                continue
+            try:
+                duration = int(panel.duration_entry.text())
+                if duration <= 0:
+                    raise ValueError
+            except ValueError:
+                QMessageBox.warning(self, "Erro", f"Arena {arena + 1}: insira uma duração de teste válida "
+                                                  "(número inteiro positivo).")
+                return
+            assignments[arena] = (animal_id, duration, self.experimenter_entry.text(), panel.group_entry.text())
+        if not assignments:
+            QMessageBox.warning(self, "Erro", "Insira o ID do Animal em pelo menos uma arena.")
+            return
+        # Sessões anteriores que não puderam ser gravadas: tenta de novo antes
+        # que um novo teste na mesma arena as substitua
+        unsaved = [arena for arena in self.group.pending() if arena in assignments]
+        if unsaved and self.store is not None and self.save_pending() is None:
+            arenas = ", ".join(str(arena + 1) for arena in unsaved)
+            answer = QMessageBox.question(self, "Sessões Não Gravadas",
+                                          f"Os testes anteriores das arenas {arenas} não foram gravados. "
+                                          "Descartá-los e iniciar os novos testes?",
+                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                return
+
+        self.update_key_map()
+        self.input_timestamper.reset()
+        for arena in self.group.start(assignments):
+            panel = self.panels[arena]
+            for widget in panel.config_widgets():
+                widget.setEnabled(False)
+            for button in panel.zone_buttons.values():
+                button.setEnabled(True)
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.experimenter_entry.setEnabled(False)
+        self.setFocus()
+        self.schedule_deadline()
+        self.refresh_timer.start()
+        self.refresh()
+
+    def stop_all(self):
+        self.group.stop_all()
+
+    def schedule_deadline(self):
+        deadline_ns = self.group.next_deadline_ns()
+        if deadline_ns is not None:
+            remaining_ns = max(deadline_ns - self.group.clock(), 0)
+            self.deadline_timer.start(-(-remaining_ns // 1_000_000))
+
+    def on_deadline(self):
+        self.group.tick()
+        if self.group.running:
+            self.schedule_deadline()
+
+    def on_session_event(self, arena, kind, zone):
+        panel = self.panels[arena]
+        if kind == PRESSED:
+            panel.highlight(self.definition.zones[zone], True)
+        elif kind == RELEASED:
+            panel.highlight(self.definition.zones[zone], False)
+            self.update_panel(arena)
+        elif kind == STOPPED:
+            for widget in panel.config_widgets():
+                widget.setEnabled(True)
+            for button in panel.zone_buttons.values():
+                button.setEnabled(False)
+            self.update_panel(arena)
+            if not self.group.running:
+                self.on_all_stopped()
+
+    def on_all_stopped(self):
+        self.deadline_timer.stop()
+        self.refresh_timer.stop()
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.experimenter_entry.setEnabled(True)
+
+        # Todas as sessões são gravadas juntas, numa única transação
+        if self.store is None:
+            return
+        ids = self.save_pending()
+        if ids is not None:
+            QMessageBox.information(self, "Testes Finalizados", f"{len(ids)} sessões gravadas.")
+
+    def save_pending(self):
+        # Ids gravados, ou None se a gravação falhar: nesse caso as sessões
+        # continuam pendentes (o grupo só as marca depois da transação)
+        try:
+            return self.group.commit(self.store)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Erro ao Gravar Sessões",
+                                 f"Não foi possível gravar os testes no banco de sessões: {e}")
+            return None
+
+    def refresh(self):
+        # Um único timer atualiza todas as arenas com a mesma leitura do relógio
+        now_ns = self.group.clock()
+        for arena, session in enumerate(self.group.sessions):
+            if session.running:
+                self.update_panel(arena, now_ns)
+
+    def update_panel(self, arena, now_ns=None):
+        session = self.group.sessions[arena]
+        panel = self.panels[arena]
+        mins, secs = divmod(session.remaining_ns(now_ns) // NS_PER_S, 60)
+        text = f"{mins:02d}:{secs:02d}"
+        if text != panel.timer_label.text():
+            panel.timer_label.setText(text)
+        totals = session.totals_s(now_ns)
+        text = " | ".join(f"{self.definition.labels[zone]} {total:.1f} s"
+                          for zone, total in zip(self.definition.zones, totals))
+        if text != panel.totals_label.text():
+            panel.totals_label.setText(text)
+
+    def keyPressEvent(self, event):
+        if event.key() not in self.group.key_map:
+            super().keyPressEvent(event)
+            return
+        if not event.isAutoRepeat():
+            self.group.press_key(event.key(), self.input_timestamper.to_clock(event.timestamp()))
+        event.accept()
+
+    def keyReleaseEvent(self, event):
+        if event.key() not in self.group.key_map:
+            super().keyReleaseEvent(event)
+            return
+        if not event.isAutoRepeat():
+            self.group.release_key(event.key(), self.input_timestamper.to_clock(event.timestamp()))
+        event.accept()
+
+    def closeEvent(self, event):
+        # Testes em andamento são encerrados e gravados antes de fechar; se a
+        # gravação falhar, a janela só fecha com a confirmação do usuário
+        if self.group.running:
+            answer = QMessageBox.question(self, "Testes em Andamento",
+                                          "Há testes em andamento. Encerrá-los agora e gravar as sessões?",
+                                          QMessageBox.Yes | QMessageBox.Cancel, QMessageBox.Cancel)
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+            # on_all_stopped grava as sessões
+            self.stop_all()
+        elif self.store is not None and self.group.pending():
+            self.save_pending()
+        if self.store is not None and self.group.pending():
+            answer = QMessageBox.question(self, "Sessões Não Gravadas",
+                                          f"{len(self.group.pending())} sessões não foram gravadas e serão "
+                                          "perdidas. Fechar mesmo assim?",
+                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+        self.deadline_timer.stop()
+        self.refresh_timer.stop()
+        super().closeEvent(event)
@@ -1,51 +1,233 @@
 import sys
 import time
+
+# Marcas de tempo da inicialização (usadas por --profile-startup)
+STARTUP_MARKS = [("início", time.perf_counter_ns())]
+
+# Modos de linha de comando (python openfield.py batch|reliability ...): sem
+# Qt, nem mesmo a importação
+HEADLESS_COMMANDS = ("batch", "reliability")
+if __name__ == "__main__" and sys.argv[1:2] and sys.argv[1] in HEADLESS_COMMANDS:
+    sys.exit(__import__(sys.argv[1]).main(sys.argv[2:]))
+
+import argparse
 import os
+import sqlite3
+import threading
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QGridLayout, QLabel, QLineEdit, 
                                QPushButton, QTextEdit, QGroupBox, QMessageBox, 
-                               QFileDialog, QFrame, QSizePolicy)
-from PySide6.QtCore import QTimer, Qt, QThread, Signal
-from PySide6.QtGui import QFont, QPalette, QColor
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
+                               QFileDialog, QFrame, QSizePolicy, QDockWidget,
+                               QCheckBox, QKeySequenceEdit, QProgressDialog, QComboBox)
+from PySide6.QtCore import QTimer, Qt, QThread, Signal, QSettings
+from PySide6.QtGui import QFont, QPalette, QColor, QKeySequence
+STARTUP_MARKS.append(("importação do PySide6", time.perf_counter_ns()))
+from arena import ArenaDefinition, arena_for_zones, builtin_arenas, find_arena, zone_time_label
+from cohort_view import CohortView
+from event_log import NS_PER_S
+from input_timing import InputTimestamper
+from journal import JournalWriter, find_journals, read_journal
+from session import ScoringSession, STARTED, PRESSED, RELEASED, STOPPED
+from session_browser import SessionBrowser
+from store import SessionStore
+STARTUP_MARKS.append(("importação dos módulos do aplicativo", time.perf_counter_ns()))
+
+# Limite de tempo até a janela ficar interativa
+STARTUP_BUDGET_MS = 1500
+
+class ExportWorker(QThread):
+    # Exporta sessões do banco fora da thread da interface
+    progress = Signal(int, int)
+    succeeded = Signal(str, int, object)
+    cancelled = Signal()
+    failed = Signal(str)
+    
+    def __init__(self, db_path, path, per_event, session_ids, filters, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.path = path
+        self.per_event = per_event
+        self.session_ids = session_ids
+        self.filters = filters
+        self._cancelled = False
+        
+    def cancel(self):
+        self._cancelled = True
+        
+    def run(self):
+        from exporters import export_sessions, ExportCancelled
+        # Conexão própria: conexões SQLite não são compartilhadas entre threads
+        store = SessionStore(self.db_path)
+        try:
+            rows, missing = export_sessions(store, self.path, self.per_event, self.session_ids, self.filters,
+                                            progress=self.progress.emit, is_cancelled=lambda: self._cancelled)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(self.path, rows, missing)
+        finally:
+            store.close()
+
+class CohortWorker(QThread):
+    # Carrega os agregados da coorte e inclui as sessões ainda não agregadas
+    progress = Signal(int, int)
+    loaded = Signal(object)
+    failed = Signal(str)
+    
+    def __init__(self, db_path, arenas, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.arenas = arenas
+        self._cancelled = False
+        
+    def cancel(self):
+        self._cancelled = True
+        
+    def run(self):
+        from cohort import CohortAggregates, catch_up
+        store = SessionStore(self.db_path)
+        try:
+            aggregates = CohortAggregates.load(store)
+            catch_up(aggregates, store, self.arenas, self.progress.emit, lambda: self._cancelled)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.loaded.emit(aggregates)
+        finally:
+            store.close()
+
+class AutoScoreWorker(QThread):
+    # Marcação automática de vídeos num pool de processos, fora da thread da interface
+    progress = Signal(int, int)
+    scored = Signal(int)
+    failed = Signal(str, str)
+    
+    def __init__(self, db_path, paths, duration_s, experimenter, treatment_group, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.paths = paths
+        self.duration_s = duration_s
+        self.experimenter = experimenter
+        self.treatment_group = treatment_group
+        
+    def run(self):
+        from tracking import score_videos, geometry_for
+        # Uma geometria por diretório: arena.json ao lado dos vídeos, se existir
+        by_geometry = {}
+        for path in self.paths:
+            by_geometry.setdefault(os.path.dirname(path), []).append(path)
+        store = SessionStore(self.db_path)
+        done = 0
+        try:
+            for directory, paths in by_geometry.items():
+                try:
+                    geometry = geometry_for(directory)
+                except (OSError, ValueError) as e:
+                    for path in paths:
+                        self.failed.emit(path, str(e))
+                    done += len(paths)
+                    self.progress.emit(done, len(self.paths))
+                    continue
+                for path, result, error in score_videos(paths, geometry, self.duration_s):
+                    done += 1
+                    if error is not None:
+                        self.failed.emit(path, str(error))
+                    else:
+                        animal_id = os.path.splitext(os.path.basename(path))[0]
+                        session_id = store.save(animal_id, time.strftime("%Y-%m-%d %H:%M:%S"), self.duration_s,
+                                                result["log"], experimenter=self.experimenter,
+                                                treatment_group=self.treatment_group, arena=geometry.arena.name)
+                        self.scored.emit(session_id)
+                    self.progress.emit(done, len(self.paths))
+        finally:
+            store.close()
 
 class OpenFieldApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, arena_path=None, diagnostics=False, event_server=None):
         super().__init__()
         self.setWindowTitle("Teste de Campo Aberto - Marcação de Áreas")
         self.setGeometry(100, 100, 1400, 700)
         
-        # Variáveis de controle do teste
-        self.test_running = False
-        self.start_time = None
-        self.remaining_time = 0
-        self.test_duration = 300  # Duração padrão em segundos
-        self.animal_id = ""
-        
-        # Variáveis para armazenar o tempo acumulado em cada área
-        self.corner_time = 0.0
-        self.lateral_time = 0.0
-        self.center_time = 0.0
-        
-        # Variáveis para controlar se um botão de área está atualmente pressionado
-        self.corner_button_pressed = False
-        self.lateral_button_pressed = False
-        self.center_button_pressed = False
+        # Arena (zonas, cores e teclas): a escolhida por último ou a de --arena
+        self.settings = QSettings("OpenField", "OpenFieldApp")
+        self.arenas = builtin_arenas()
+        self.arena = self.load_arena(arena_path or self.settings.value("arena", ""))
         
-        # Variáveis para registrar o tempo de início da pressão do botão
-        self.corner_press_time = None
-        self.lateral_press_time = None
-        self.center_press_time = None
+        # Motor de marcação (sem Qt); a janela apenas observa suas notificações
+        # e o servidor de eventos (--events), se ativo, as publica
+        self.event_server = event_server
+        self.session = ScoringSession(self.arena.zones)
+        self.session.subscribe(self.on_session_event)
+        if event_server is not None:
+            event_server.attach(self.session, self.arena.name)
+        self.journal = None
         
         self.test_data = {}  # Para armazenar os resultados do teste atual
         
-        # Timer para atualizar a interface
-        self.timer = QTimer()
+        # Timer de prazo: disparo único e preciso no fim programado do teste
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.setTimerType(Qt.PreciseTimer)
+        self.deadline_timer.timeout.connect(self.on_deadline)
+        
+        # Contagem regressiva: redesenhada apenas quando o segundo exibido muda
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.CoarseTimer)
         self.timer.timeout.connect(self.update_timer)
         
+        # Tempos ao vivo: ativo apenas enquanto alguma área está pressionada
+        self.zone_label_timer = QTimer(self)
+        self.zone_label_timer.setInterval(100)
+        self.zone_label_timer.setTimerType(Qt.CoarseTimer)
+        self.zone_label_timer.timeout.connect(self.update_live_zone_label)
+        
+        # Gráfico ao vivo (opcional), limitado a 2 Hz
+        self.live_chart_timer = QTimer(self)
+        self.live_chart_timer.setInterval(500)
+        self.live_chart_timer.setTimerType(Qt.CoarseTimer)
+        self.live_chart_timer.timeout.connect(self.update_live_chart)
+        
+        # Gráfico da revisão de sessões: mudanças de posição agrupadas, no
+        # mesmo limite de 2 Hz do gráfico ao vivo
+        self.replay_chart_timer = QTimer(self)
+        self.replay_chart_timer.setSingleShot(True)
+        self.replay_chart_timer.setInterval(500)
+        self.replay_chart_timer.setTimerType(Qt.CoarseTimer)
+        self.replay_chart_timer.timeout.connect(self.update_replay_chart)
+        
+        # Teclas de marcação salvas entre execuções, por arena
+        self.load_key_bindings()
+        self.input_timestamper = InputTimestamper()
+        self.timer_due_ns = None
+        self.deadline_due_ns = None
+        
+        # Diagnóstico de desempenho (--diagnostics): sem ele nada é medido
+        self.diagnostics = None
+        if diagnostics:
+            from diagnostics import Diagnostics
+            self.diagnostics = Diagnostics()
+            self.diagnostics.instrument(self, ("on_button_press", "on_button_release", "generate_report",
+                                               "show_pie_chart"))
+            self.diagnostics_timer = QTimer(self)
+            self.diagnostics_timer.setInterval(1000)
+            self.diagnostics_timer.setTimerType(Qt.CoarseTimer)
+            self.diagnostics_timer.timeout.connect(self.update_diagnostics)
+        
+        # Banco local de sessões; sem ele o aplicativo continua funcionando
+        try:
+            self.store = SessionStore()
+        except sqlite3.Error as e:
+            self.store = None
+            print(f"Banco de sessões indisponível: {e}", file=sys.stderr)
+        
+        # Agregados por grupo de tratamento, carregados em segundo plano
+        self.cohort = None
+        self.cohort_worker = None
+        self.cohort_update_pending = False
+        
         self.init_ui()
         
     def init_ui(self):
@@ -79,6 +261,33 @@ class OpenFieldApp(QMainWindow):
         self.duration_entry.setMinimumWidth(200)
         config_layout.addWidget(self.duration_entry, 1, 1)
         
+        # Experimentador e grupo de tratamento (indexados no banco de sessões)
+        config_layout.addWidget(QLabel("Experimentador:"), 2, 0)
+        self.experimenter_entry = QLineEdit()
+        self.experimenter_entry.setMinimumWidth(200)
+        config_layout.addWidget(self.experimenter_entry, 2, 1)
+        
+        config_layout.addWidget(QLabel("Grupo de Tratamento:"), 3, 0)
+        self.group_entry = QLineEdit()
+        self.group_entry.setMinimumWidth(200)
+        config_layout.addWidget(self.group_entry, 3, 1)
+        
+        # Arena: definições distribuídas ou carregadas de um arquivo JSON
+        config_layout.addWidget(QLabel("Arena:"), 4, 0)
+        arena_layout = QHBoxLayout()
+        self.arena_combo = QComboBox()
+        self.arena_combo.setFocusPolicy(Qt.NoFocus)
+        for arena in self.arenas:
+            self.arena_combo.addItem(f"{arena.name} ({len(arena.zones)} áreas)")
+        self.arena_combo.setCurrentIndex(self.arenas.index(self.arena))
+        self.arena_combo.activated.connect(lambda index: self.set_arena(self.arenas[index]))
+        arena_layout.addWidget(self.arena_combo, 1)
+        self.arena_file_button = QPushButton("Carregar...")
+        self.arena_file_button.setFocusPolicy(Qt.NoFocus)
+        self.arena_file_button.clicked.connect(self.choose_arena_file)
+        arena_layout.addWidget(self.arena_file_button)
+        config_layout.addLayout(arena_layout, 4, 1)
+        
         left_layout.addWidget(config_group)
         
         # Frame de Controle do Teste
@@ -109,52 +318,41 @@ class OpenFieldApp(QMainWindow):
         button_layout.addWidget(self.stop_button)
         
         control_layout.addLayout(button_layout)
+        
+        # Marcação automática de vídeos gravados (rastreamento do animal)
+        auto_button = QPushButton("Marcação Automática de Vídeos...")
+        auto_button.setFocusPolicy(Qt.NoFocus)
+        auto_button.clicked.connect(self.auto_score_videos)
+        control_layout.addWidget(auto_button)
+        self.auto_score_worker = None
         left_layout.addWidget(control_group)
         
         # Frame de Marcação de Áreas
         area_group = QGroupBox("Marcação de Áreas (Pressione e Segure)")
         area_layout = QVBoxLayout(area_group)
         
-        # Botões das áreas
-        buttons_layout = QGridLayout()
-        
-        self.corner_btn = QPushButton("Canto")
-        self.corner_btn.setMinimumHeight(80)
-        self.corner_btn.setStyleSheet("background-color: red; color: white; font-weight: bold;")
-        self.corner_btn.setEnabled(False)
-        self.corner_btn.pressed.connect(lambda: self.on_button_press("corner"))
-        self.corner_btn.released.connect(lambda: self.on_button_release("corner"))
-        buttons_layout.addWidget(self.corner_btn, 0, 0)
-        
-        self.lateral_btn = QPushButton("Lateral")
-        self.lateral_btn.setMinimumHeight(80)
-        self.lateral_btn.setStyleSheet("background-color: skyblue; color: black; font-weight: bold;")
-        self.lateral_btn.setEnabled(False)
-        self.lateral_btn.pressed.connect(lambda: self.on_button_press("lateral"))
-        self.lateral_btn.released.connect(lambda: self.on_button_release("lateral"))
-        buttons_layout.addWidget(self.lateral_btn, 0, 1)
-        
-        self.center_btn = QPushButton("Centro")
-        self.center_btn.setMinimumHeight(80)
-        self.center_btn.setStyleSheet("background-color: forestgreen; color: white; font-weight: bold;")
-        self.center_btn.setEnabled(False)
-        self.center_btn.pressed.connect(lambda: self.on_button_press("center"))
-        self.center_btn.released.connect(lambda: self.on_button_release("center"))
-        buttons_layout.addWidget(self.center_btn, 1, 0, 1, 2)
-        
-        area_layout.addLayout(buttons_layout)
-        
-        # Labels para exibir os tempos acumulados
-        self.corner_time_label = QLabel("Tempo no Canto: 0.00 s")
-        self.lateral_time_label = QLabel("Tempo na Lateral: 0.00 s")
-        self.center_time_label = QLabel("Tempo no Centro: 0.00 s")
-        
-        area_layout.addWidget(self.corner_time_label)
-        area_layout.addWidget(self.lateral_time_label)
-        area_layout.addWidget(self.center_time_label)
+        # Botões e tempos das áreas, gerados a partir da definição da arena
+        self.zone_buttons_layout = QGridLayout()
+        area_layout.addLayout(self.zone_buttons_layout)
+        self.zone_labels_layout = QVBoxLayout()
+        area_layout.addLayout(self.zone_labels_layout)
+        self.zone_buttons = {}
+        self.zone_time_labels = {}
+        
+        # Latência entre o evento de teclado e sua gravação no registro
+        self.input_latency_label = QLabel()
+        area_layout.addWidget(self.input_latency_label)
+        self.update_input_latency_label()
         
         left_layout.addWidget(area_group)
         
+        # Teclas de marcação (segure a tecla enquanto o animal estiver na área)
+        keys_group = QGroupBox("Teclas de Marcação")
+        self.keys_layout = QGridLayout(keys_group)
+        self.key_edits = {}
+        left_layout.addWidget(keys_group)
+        self.build_zone_widgets()
+        
         # Coluna da direita - Relatório e Gráfico
         right_frame = QFrame()
         right_frame.setFrameStyle(QFrame.Box)
@@ -191,12 +389,60 @@ class OpenFieldApp(QMainWindow):
         self.chart_layout = QVBoxLayout(self.chart_group)
         right_layout.addWidget(self.chart_group)
         
+        # Gráfico criado no primeiro uso (matplotlib é carregado sob demanda)
+        self.pie_chart = None
+        self.chart_zones = None
+        self.charts_thread = None
+        self.charts_load_ns = None
+        
+        self.no_chart_label = QLabel("Nenhum tempo registrado para exibir o gráfico.")
+        self.no_chart_label.setAlignment(Qt.AlignCenter)
+        self.no_chart_label.setStyleSheet("color: gray;")
+        self.chart_layout.addWidget(self.no_chart_label)
+        
+        self.live_chart_check = QCheckBox("Atualizar gráfico durante o teste (2 Hz)")
+        self.live_chart_check.toggled.connect(self.on_live_chart_toggled)
+        self.chart_layout.addWidget(self.live_chart_check)
+        self.clear_chart()
+        
         # Configurar proporções das colunas
         main_layout.addWidget(left_frame, 1)
         main_layout.addWidget(right_frame, 1)
         
+        # Painel de sessões registradas (carregado sob demanda, página a página)
+        self.session_browser = SessionBrowser(self.store)
+        self.session_browser.session_activated.connect(self.show_stored_session)
+        self.session_browser.export_requested.connect(self.export_sessions)
+        self.session_browser.replay_requested.connect(self.replay_session)
+        self.export_worker = None
+        sessions_dock = self.sessions_dock = QDockWidget("Sessões Registradas", self)
+        sessions_dock.setWidget(self.session_browser)
+        self.addDockWidget(Qt.BottomDockWidgetArea, sessions_dock)
+        
+        # Revisão de sessões gravadas, criada no primeiro uso
+        self.replay_panel = None
+        self.replay_dock = None
+        self.replay_zone = -1
+        
+        # Comparação com a coorte (médias por grupo), na mesma área das sessões
+        self.cohort_view = CohortView(self.cohort, self.arena)
+        cohort_dock = QDockWidget("Coorte", self)
+        cohort_dock.setWidget(self.cohort_view)
+        self.addDockWidget(Qt.BottomDockWidgetArea, cohort_dock)
+        self.tabifyDockWidget(sessions_dock, cohort_dock)
+        sessions_dock.raise_()
+        
+        if self.diagnostics is not None:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(self.diagnostics)
+            self.diagnostics_dock = QDockWidget("Diagnóstico de Desempenho", self)
+            self.diagnostics_dock.setWidget(self.diagnostics_panel)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.diagnostics_dock)
+            self.diagnostics_timer.start()
+            self.update_diagnostics()
+        
     def start_test(self):
-        if self.test_running:
+        if self.session.running:
             return
             
         animal_id = self.animal_id_entry.text().strip()
@@ -208,280 +454,585 @@ class OpenFieldApp(QMainWindow):
             duration = int(self.duration_entry.text())
             if duration <= 0:
                 raise ValueError
-            self.test_duration = duration
         except ValueError:
             QMessageBox.warning(self, "Erro", "Por favor, insira uma duração de teste válida (número inteiro positivo).")
             return
             
-        self.animal_id = animal_id
-        self.test_running = True
-        self.start_time = time.time()
-        self.remaining_time = duration
-        
-        # Resetar todos os tempos e estados dos botões
-        self.corner_time = 0.0
-        self.lateral_time = 0.0
-        self.center_time = 0.0
-        self.corner_button_pressed = False
-        self.lateral_button_pressed = False
-        self.center_button_pressed = False
-        self.corner_press_time = None
-        self.lateral_press_time = None
-        self.center_press_time = None
+        # Novo registro de eventos; zera todos os tempos e estados das áreas
+        self.session.start(animal_id, duration, experimenter=self.experimenter_entry.text(),
+                           treatment_group=self.group_entry.text())
+        
+    def on_test_started(self):
+        self.stop_replay()
         self.test_data = {}
+        self.input_timestamper.reset()
+        self.update_input_latency_label()
+        if self.diagnostics is not None:
+            self.diagnostics.reset_session()
+        self.start_journal()
+        
+        # Foco na janela para que as teclas de marcação cheguem a keyPressEvent
+        self.set_config_enabled(False)
+        self.setFocus()
         
         self.update_area_time_labels()
         
         # Atualizar estado dos botões
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
-        self.corner_btn.setEnabled(True)
-        self.lateral_btn.setEnabled(True)
-        self.center_btn.setEnabled(True)
+        for button in self.zone_buttons.values():
+            button.setEnabled(True)
         
         # Limpar gráfico anterior
         self.clear_chart()
         
-        # Iniciar timer
-        self.timer.start(200)  # Atualiza a cada 200ms
+        # Iniciar timers
+        remaining_ns = self.session.remaining_ns(self.session.clock())
+        self.start_deadline_timer(remaining_ns)
+        self.timer_due_ns = None
+        self.update_timer()
+        if self.live_chart_check.isChecked():
+            self.live_chart_timer.start()
         
     def stop_test(self, manual_stop=True):
-        if not self.test_running:
+        if not self.session.stop():
             return
             
-        self.test_running = False
+        if manual_stop:
+            QMessageBox.information(self, "Teste Finalizado", f"Teste para {self.session.animal_id} finalizado!")
+            
+    def on_session_event(self, kind, zone):
+        if kind == PRESSED:
+            self.highlight_button(self.session.zones[zone], True)
+            self.zone_label_timer.start()
+        elif kind == RELEASED:
+            self.zone_label_timer.stop()
+            self.highlight_button(self.session.zones[zone], False)
+            self.update_area_time_labels()
+        elif kind == STARTED:
+            self.on_test_started()
+        elif kind == STOPPED:
+            self.on_test_stopped()
+            
+    def on_test_stopped(self):
+        self.deadline_timer.stop()
         self.timer.stop()
+        self.zone_label_timer.stop()
+        self.live_chart_timer.stop()
+        self.show_remaining_time(self.session.remaining_ns())
         
         # Atualizar estado dos botões
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
-        self.corner_btn.setEnabled(False)
-        self.lateral_btn.setEnabled(False)
-        self.center_btn.setEnabled(False)
-        
-        # Garantir que qualquer tempo ativo seja contabilizado
-        if self.corner_button_pressed:
-            self.on_button_release("corner")
-        if self.lateral_button_pressed:
-            self.on_button_release("lateral")
-        if self.center_button_pressed:
-            self.on_button_release("center")
-            
+        for button in self.zone_buttons.values():
+            button.setEnabled(False)
+        self.set_config_enabled(True)
+        
         self.update_area_time_labels()
+        self.update_input_latency_label()
+        if self.journal is not None:
+            self.journal.finish(self.session.event_log.end_ns)
         self.generate_report()
+        self.save_session()
+        self.dump_diagnostics()
         
-        if manual_stop:
-            QMessageBox.information(self, "Teste Finalizado", f"Teste para {self.animal_id} finalizado!")
+    def save_session(self):
+        # Todo teste concluído é gravado automaticamente no banco de sessões
+        if self.store is None:
+            return
+        try:
+            session_id = self.store.save_session(self.session, self.arena.name)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Erro ao Gravar Sessão",
+                                 f"Não foi possível gravar o teste no banco de sessões: {e}")
+            return
+        # Gravado no banco: o diário deixa de ser necessário
+        if self.journal is not None:
+            self.journal.discard()
+            self.journal = None
+        self.session_browser.refresh()
+        self.update_cohort(session_id)
+        
+    def update_cohort(self, session_id):
+        # Sessão recém-gravada: só os agregados do seu grupo são atualizados.
+        # Se houver sessões anteriores ainda não agregadas (gravadas por outros
+        # modos), a atualização completa roda em segundo plano. Se outro
+        # processo tiver gravado os agregados nesse meio-tempo, save() relê e
+        # combina (ver CohortAggregates.save).
+        from cohort import session_values
+        values = session_values(self.test_data)
+        group = self.session.treatment_group
+        if (self.cohort is None or self.cohort_worker is not None
+                or session_id != self.cohort.last_session_id + 1):
+            self.start_cohort_update()
+        else:
+            self.cohort.add(session_id, self.arena.name, group, values)
+            try:
+                self.cohort.save(self.store)
+            except sqlite3.Error as e:
+                print(f"Agregados da coorte não gravados: {e}", file=sys.stderr)
+        self.cohort_view.set_last_test(self.session.animal_id, group, values)
+        
+    def start_cohort_update(self):
+        if self.store is None:
+            return
+        if self.cohort_worker is not None:
+            self.cohort_update_pending = True
+            return
+        self.cohort_update_pending = False
+        self.cohort_worker = CohortWorker(self.store.path, self.arenas, self)
+        self.cohort_worker.progress.connect(self.on_cohort_progress)
+        self.cohort_worker.loaded.connect(self.on_cohort_loaded)
+        self.cohort_worker.failed.connect(lambda message: print(f"Agregados da coorte indisponíveis: {message}",
+                                                                file=sys.stderr))
+        self.cohort_worker.finished.connect(self.on_cohort_finished)
+        self.cohort_worker.start()
+        
+    def on_cohort_progress(self, done, total):
+        self.cohort_view.comparison_label.setText(f"Atualizando agregados da coorte: {done}/{total} sessões...")
+        
+    def on_cohort_loaded(self, aggregates):
+        self.cohort = aggregates
+        self.cohort_view.set_aggregates(aggregates)
+        
+    def on_cohort_finished(self):
+        self.cohort_worker.deleteLater()
+        self.cohort_worker = None
+        if self.cohort_update_pending:
+            self.start_cohort_update()
+        
+    def start_journal(self):
+        # Cada evento do teste também vai para um diário em disco (fsync em lotes)
+        try:
+            self.journal = JournalWriter.create(self.session, arena=self.arena.name)
+        except OSError as e:
+            self.journal = None
+            print(f"Diário de sessão indisponível: {e}", file=sys.stderr)
             
-    def update_timer(self):
-        if self.test_running:
-            elapsed_total_time = time.time() - self.start_time
-            self.remaining_time = self.test_duration - elapsed_total_time
-            
-            # Atualizar tempos em tempo real
-            if self.corner_button_pressed and self.corner_press_time:
-                current_press_duration = time.time() - self.corner_press_time
-                self.corner_time_label.setText(f"Tempo no Canto: {self.corner_time + current_press_duration:.2f} s")
-            if self.lateral_button_pressed and self.lateral_press_time:
-                current_press_duration = time.time() - self.lateral_press_time
-                self.lateral_time_label.setText(f"Tempo na Lateral: {self.lateral_time + current_press_duration:.2f} s")
-            if self.center_button_pressed and self.center_press_time:
-                current_press_duration = time.time() - self.center_press_time
-                self.center_time_label.setText(f"Tempo no Centro: {self.center_time + current_press_duration:.2f} s")
-                
-            if self.remaining_time <= 0:
-                self.remaining_time = 0
-                self.timer_label.setText("Tempo Restante: 00:00")
-                self.stop_test(manual_stop=False)
-                return
+    def recover_journals(self):
+        # Testes interrompidos (queda do aplicativo ou de energia) deixam o diário em disco
+        if self.store is None:
+            return
+        for path in find_journals():
+            if self.journal is not None and path == self.journal.path:
+                continue
+            try:
+                meta, log, finished = read_journal(path)
+            except (OSError, ValueError) as e:
+                print(f"Diário ilegível ({path}): {e}", file=sys.stderr)
+                continue
                 
-            mins = int(self.remaining_time // 60)
-            secs = int(self.remaining_time % 60)
-            self.timer_label.setText(f"Tempo Restante: {mins:02d}:{secs:02d}")
+            elapsed = log.elapsed_ns() / NS_PER_S
+            box = QMessageBox(self)
+            box.setIcon(QMessageBox.Question)
+            box.setWindowTitle("Sessão Não Finalizada")
+            box.setText(f"Foi encontrado um teste {'concluído mas não gravado' if finished else 'interrompido'}:\n\n"
+                        f"ID do Animal: {meta['animal_id']}\n"
+                        f"Data/Hora: {meta['started_at']}\n"
+                        f"Tempo registrado: {elapsed:.2f} de {meta['duration_s']} segundos\n"
+                        f"Eventos: {len(log)}")
+            restore_button = None
+            if not finished and not self.session.running and elapsed < meta["duration_s"]:
+                restore_button = box.addButton("Restaurar e Continuar", QMessageBox.AcceptRole)
+            finalize_button = box.addButton("Finalizar e Gravar", QMessageBox.AcceptRole)
+            box.addButton("Mais Tarde", QMessageBox.RejectRole)
+            box.exec()
             
-    def on_button_press(self, button_name):
-        if not self.test_running:
+            clicked = box.clickedButton()
+            if clicked is restore_button and restore_button is not None:
+                self.restore_session(path, meta, log)
+            elif clicked is finalize_button:
+                try:
+                    self.store.save(meta["animal_id"], meta["started_at"], meta["duration_s"], log,
+                                    experimenter=meta["experimenter"], treatment_group=meta["treatment_group"],
+                                    arena=meta.get("arena", ""))
+                except sqlite3.Error as e:
+                    QMessageBox.critical(self, "Erro ao Gravar Sessão",
+                                         f"Não foi possível gravar o teste no banco de sessões: {e}")
+                    continue
+                os.remove(path)
+                self.session_browser.refresh()
+                
+    def restore_session(self, path, meta, log):
+        # Retoma o teste de onde o diário parou; um novo diário substitui o antigo
+        arena = self.arena_for(meta["zones"], meta.get("arena", ""))
+        if arena not in self.arenas:
+            self.arenas.append(arena)
+            self.arena_combo.addItem(f"{arena.name} ({len(arena.zones)} áreas)")
+        self.set_arena(arena)
+        self.animal_id_entry.setText(meta["animal_id"])
+        self.duration_entry.setText(str(meta["duration_s"]))
+        self.experimenter_entry.setText(meta["experimenter"])
+        self.group_entry.setText(meta["treatment_group"])
+        self.session.resume(meta, log)
+        os.remove(path)
+        
+    def show_stored_session(self, session_id):
+        row = self.store.get(session_id)
+        if row is None:
+            return
+        self.show_report(row[1], row[2], row[5], self.store.load_log(session_id),
+                         experimenter=row[3], treatment_group=row[4], arena_name=row[10])
+        
+    def replay_session(self, session_id):
+        # Revisão da marcação gravada: a posição da reprodução (ou da busca)
+        # redesenha destaques, tempos, contagem regressiva e gráfico
+        if self.session.running:
+            QMessageBox.information(self, "Aviso", "Finalize o teste atual antes de revisar uma sessão.")
             return
+        row = self.store.get(session_id)
+        if row is None:
+            return
+        log = self.store.load_log(session_id)
+        arena = self.arena_for(log.zones, row[10])
+        if arena is not self.arena:
+            if arena not in self.arenas:
+                self.arenas.append(arena)
+                self.arena_combo.addItem(f"{arena.name} ({len(arena.zones)} áreas)")
+            self.set_arena(arena)
+        if self.replay_panel is None:
+            from replay_view import ReplayPanel
+            self.replay_panel = ReplayPanel()
+            self.replay_panel.position_changed.connect(self.on_replay_position)
+            self.replay_panel.closed.connect(self.on_replay_closed)
+            self.replay_dock = QDockWidget("Revisão da Sessão", self)
+            self.replay_dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+            self.replay_dock.setWidget(self.replay_panel)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.replay_dock)
+            self.tabifyDockWidget(self.sessions_dock, self.replay_dock)
+        self.show_report(row[1], row[2], row[5], log, experimenter=row[3], treatment_group=row[4],
+                         arena_name=row[10])
+        self.clear_chart()
+        self.replay_zone = -1
+        self.replay_dock.show()
+        self.replay_dock.raise_()
+        self.replay_panel.load(log, [arena.colors[zone][0] for zone in arena.zones], row[5],
+                               f"Revisão: {row[1]} ({row[2]})")
+        
+    def on_replay_position(self, t_ns):
+        cursor = self.replay_panel.cursor
+        zone = cursor.active_at(t_ns)
+        if zone != self.replay_zone:
+            if self.replay_zone >= 0:
+                self.highlight_button(self.arena.zones[self.replay_zone], False)
+            if zone >= 0:
+                self.highlight_button(self.arena.zones[zone], True)
+            self.replay_zone = zone
+        self.show_area_times(cursor.totals_ns_at(t_ns) / NS_PER_S)
+        self.show_remaining_time(max(self.replay_panel.duration_s * NS_PER_S - t_ns, 0))
+        if not self.replay_chart_timer.isActive():
+            self.replay_chart_timer.start()
             
-        # Parar outros botões ativos
-        if button_name != "corner" and self.corner_button_pressed:
-            self.on_button_release("corner")
-        if button_name != "lateral" and self.lateral_button_pressed:
-            self.on_button_release("lateral")
-        if button_name != "center" and self.center_button_pressed:
-            self.on_button_release("center")
-            
-        # Iniciar contagem do botão pressionado
-        current_time = time.time()
-        if button_name == "corner" and not self.corner_button_pressed:
-            self.corner_button_pressed = True
-            self.corner_press_time = current_time
-            self.highlight_button(self.corner_btn, True)
-        elif button_name == "lateral" and not self.lateral_button_pressed:
-            self.lateral_button_pressed = True
-            self.lateral_press_time = current_time
-            self.highlight_button(self.lateral_btn, True)
-        elif button_name == "center" and not self.center_button_pressed:
-            self.center_button_pressed = True
-            self.center_press_time = current_time
-            self.highlight_button(self.center_btn, True)
+    def update_replay_chart(self):
+        panel = self.replay_panel
+        if panel is not None and panel.active:
+            self.show_pie_chart((panel.cursor.totals_ns_at(panel.position_ns) / NS_PER_S).tolist())
+            
+    def stop_replay(self):
+        if self.replay_panel is not None:
+            self.replay_panel.close_replay()
+            
+    def on_replay_closed(self):
+        # Volta a exibir o estado do teste atual
+        self.replay_chart_timer.stop()
+        self.replay_zone = -1
+        for zone in self.arena.zones:
+            self.highlight_button(zone, False)
+        self.update_area_time_labels()
+        self.show_remaining_time(self.session.remaining_ns())
+        self.replay_dock.hide()
+        
+    def start_deadline_timer(self, remaining_ns):
+        delay_ms = -(-remaining_ns // 1_000_000)
+        self.deadline_due_ns = self.session.clock() + delay_ms * 1_000_000
+        self.deadline_timer.start(delay_ms)
+        
+    def on_deadline(self):
+        if self.diagnostics is not None:
+            self.record_timer_lateness("deadline_lateness", self.deadline_due_ns)
+        remaining_ns = self.session.tick()
+        # O timer pode disparar alguns instantes antes do prazo; reagendar
+        if self.session.running:
+            self.start_deadline_timer(remaining_ns)
+            
+    def update_timer(self):
+        if self.session.running:
+            now_ns = self.session.clock()
+            if self.diagnostics is not None and self.timer_due_ns is not None:
+                self.record_timer_lateness("timer_jitter", self.timer_due_ns, now_ns)
+            remaining_ns = self.session.remaining_ns(now_ns)
+            self.show_remaining_time(remaining_ns)
+            
+            # Próximo redesenho quando o segundo exibido mudar
+            delay_ms = remaining_ns % NS_PER_S // 1_000_000 + 1
+            self.timer_due_ns = now_ns + delay_ms * 1_000_000
+            self.timer.start(delay_ms)
+            
+    def show_remaining_time(self, remaining_ns):
+        remaining_secs = remaining_ns // NS_PER_S
+        mins, secs = divmod(remaining_secs, 60)
+        text = f"Tempo Restante: {mins:02d}:{secs:02d}"
+        if text != self.timer_label.text():
+            self.timer_label.setText(text)
+            
+    def update_live_zone_label(self):
+        log = self.session.event_log
+        if log is not None and log.active >= 0:
+            zone = log.zones[log.active]
+            total = log.total_ns(log.active, self.session.clock()) / NS_PER_S
+            self.zone_time_labels[zone].setText(f"{zone_time_label(zone, self.arena.labels[zone])}: {total:.2f} s")
+            
+    def on_button_press(self, button_name):
+        self.session.press(button_name)
             
     def on_button_release(self, button_name):
-        if not self.test_running:
+        self.session.release(button_name)
+        
+    def keyPressEvent(self, event):
+        zone = self.key_zones.get(event.key())
+        if zone is None:
+            super().keyPressEvent(event)
             return
+        # Repetição automática do teclado não é um novo evento de marcação
+        if not event.isAutoRepeat():
+            t_ns = self.input_timestamper.to_clock(event.timestamp())
+            if self.session.press(zone, t_ns):
+                self.record_input_latency(t_ns)
+        event.accept()
+        
+    def keyReleaseEvent(self, event):
+        zone = self.key_zones.get(event.key())
+        if zone is None:
+            super().keyReleaseEvent(event)
+            return
+        if not event.isAutoRepeat():
+            t_ns = self.input_timestamper.to_clock(event.timestamp())
+            if self.session.release(zone, t_ns):
+                self.record_input_latency(t_ns)
+                self.update_input_latency_label()
+        event.accept()
+        
+    def load_arena(self, path_or_name):
+        return find_arena(path_or_name, self.arenas)
+        
+    def choose_arena_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Carregar Definição de Arena", "",
+                                              "Definições de Arena (*.json);;Todos os Arquivos (*)")
+        if not path:
+            return
+        try:
+            arena = ArenaDefinition.from_file(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Erro", f"Não foi possível carregar a definição de arena: {e}")
+            return
+        self.arenas = [a for a in self.arenas if a.name != arena.name] + [arena]
+        self.arena_combo.clear()
+        for known in self.arenas:
+            self.arena_combo.addItem(f"{known.name} ({len(known.zones)} áreas)")
+        self.set_arena(arena)
+        self.settings.setValue("arena", path)
+        
+    def set_arena(self, arena):
+        # Troca a arena entre testes: nova sessão, botões, tempos, teclas e gráfico
+        if self.session.running:
+            return
+        self.stop_replay()
+        self.arena = arena
+        self.settings.setValue("arena", arena.name)
+        self.arena_combo.setCurrentIndex(self.arenas.index(arena))
+        self.session = ScoringSession(arena.zones)
+        self.session.subscribe(self.on_session_event)
+        if self.event_server is not None:
+            self.event_server.attach(self.session, arena.name)
+        self.load_key_bindings()
+        self.build_zone_widgets()
+        self.clear_chart()
+        self.cohort_view.set_arena(arena)
+        
+    def build_zone_widgets(self):
+        for layout in (self.zone_buttons_layout, self.zone_labels_layout, self.keys_layout):
+            while layout.count():
+                widget = layout.takeAt(0).widget()
+                if widget is not None:
+                    widget.deleteLater()
+        arena = self.arena
+        columns = arena.columns
+        rows = -(-len(arena.zones) // columns)
+        self.zone_buttons = {}
+        self.zone_time_labels = {}
+        self.key_edits = {}
+        for index, zone in enumerate(arena.zones):
+            row, column = divmod(index, columns)
+            button = QPushButton(arena.labels[zone])
+            button.setMinimumHeight(80 if rows <= 2 else 40)
+            button.setFocusPolicy(Qt.NoFocus)
+            button.setEnabled(False)
+            button.pressed.connect(lambda zone=zone: self.on_button_press(zone))
+            button.released.connect(lambda zone=zone: self.on_button_release(zone))
+            # A última linha incompleta ocupa toda a largura
+            span = columns - column if index == len(arena.zones) - 1 else 1
+            self.zone_buttons_layout.addWidget(button, row, column, 1, span)
+            self.zone_buttons[zone] = button
+            self.highlight_button(zone, False)
             
-        current_time = time.time()
-        
-        if button_name == "corner" and self.corner_button_pressed:
-            elapsed = current_time - self.corner_press_time
-            self.corner_time += elapsed
-            self.corner_button_pressed = False
-            self.corner_press_time = None
-            self.highlight_button(self.corner_btn, False)
-        elif button_name == "lateral" and self.lateral_button_pressed:
-            elapsed = current_time - self.lateral_press_time
-            self.lateral_time += elapsed
-            self.lateral_button_pressed = False
-            self.lateral_press_time = None
-            self.highlight_button(self.lateral_btn, False)
-        elif button_name == "center" and self.center_button_pressed:
-            elapsed = current_time - self.center_press_time
-            self.center_time += elapsed
-            self.center_button_pressed = False
-            self.center_press_time = None
-            self.highlight_button(self.center_btn, False)
+            time_label = QLabel(f"{zone_time_label(zone, arena.labels[zone])}: 0.00 s")
+            self.zone_labels_layout.addWidget(time_label)
+            self.zone_time_labels[zone] = time_label
             
-        self.update_area_time_labels()
-        
-    def highlight_button(self, button, is_pressed):
-        if button == self.corner_btn:
-            if is_pressed:
-                button.setStyleSheet("background-color: darkgray; color: white; font-weight: bold;")
-            else:
-                button.setStyleSheet("background-color: red; color: white; font-weight: bold;")
-        elif button == self.lateral_btn:
-            if is_pressed:
-                button.setStyleSheet("background-color: darkgray; color: white; font-weight: bold;")
-            else:
-                button.setStyleSheet("background-color: skyblue; color: black; font-weight: bold;")
-        elif button == self.center_btn:
-            if is_pressed:
-                button.setStyleSheet("background-color: darkgray; color: white; font-weight: bold;")
-            else:
-                button.setStyleSheet("background-color: forestgreen; color: white; font-weight: bold;")
+            self.keys_layout.addWidget(QLabel(f"{arena.labels[zone]}:"), index // 2, index % 2 * 2)
+            key_edit = QKeySequenceEdit(QKeySequence(self.key_bindings[zone]))
+            key_edit.setMaximumSequenceLength(1)
+            key_edit.editingFinished.connect(lambda zone=zone: self.on_key_binding_changed(zone))
+            self.keys_layout.addWidget(key_edit, index // 2, index % 2 * 2 + 1)
+            self.key_edits[zone] = key_edit
+            
+    def load_key_bindings(self):
+        arena = self.arena
+        self.key_bindings = {zone: self.settings.value(f"keys/{arena.name}/{zone}", arena.keys[zone])
+                             for zone in arena.zones}
+        self.update_key_zones()
+        
+    def update_key_zones(self):
+        # Código de tecla Qt -> zona
+        self.key_zones = {}
+        for zone, key in self.key_bindings.items():
+            sequence = QKeySequence(key)
+            if not sequence.isEmpty():
+                self.key_zones[sequence[0].key()] = zone
+                
+    def on_key_binding_changed(self, zone):
+        key = self.key_edits[zone].keySequence().toString()
+        self.key_bindings[zone] = key
+        self.settings.setValue(f"keys/{self.arena.name}/{zone}", key)
+        self.update_key_zones()
+        
+    def set_config_enabled(self, enabled):
+        for widget in (self.animal_id_entry, self.duration_entry, self.experimenter_entry,
+                       self.group_entry, self.arena_combo, self.arena_file_button, *self.key_edits.values()):
+            widget.setEnabled(enabled)
+            
+    def record_input_latency(self, t_ns):
+        recorded_ns = self.input_timestamper.clock()
+        self.input_timestamper.record_latency(t_ns, recorded_ns)
+        if self.diagnostics is not None:
+            self.diagnostics.record("input_latency", recorded_ns - t_ns, recorded_ns)
+            
+    def update_input_latency_label(self):
+        p50, p99 = self.input_timestamper.percentiles_ms(50, 99)
+        if p50 is None:
+            self.input_latency_label.setText("Atraso relativo entrada → registro: sem eventos de teclado")
+        else:
+            self.input_latency_label.setText(
+                f"Atraso relativo entrada → registro: p50 {p50:.2f} ms, p99 {p99:.2f} ms "
+                f"({len(self.input_timestamper)} eventos)")
+            
+    def highlight_button(self, zone, is_pressed):
+        if is_pressed:
+            background, color = "darkgray", "white"
+        else:
+            background, color = self.arena.colors[zone]
+        self.zone_buttons[zone].setStyleSheet(f"background-color: {background}; color: {color}; font-weight: bold;")
                 
-    def update_area_time_labels(self):
-        self.corner_time_label.setText(f"Tempo no Canto: {self.corner_time:.2f} s")
-        self.lateral_time_label.setText(f"Tempo na Lateral: {self.lateral_time:.2f} s")
-        self.center_time_label.setText(f"Tempo no Centro: {self.center_time:.2f} s")
+    def update_area_time_labels(self, now_ns=None):
+        # Tempos derivados do registro; now_ns inclui a pressão em andamento
+        self.show_area_times(self.session.totals_s(now_ns))
+        
+    def show_area_times(self, totals):
+        for zone, total in zip(self.arena.zones, totals):
+            self.zone_time_labels[zone].setText(f"{zone_time_label(zone, self.arena.labels[zone])}: {total:.2f} s")
         
     def generate_report(self):
-        if not self.start_time:
+        if self.session.event_log is None:
             QMessageBox.information(self, "Aviso", "Inicie um teste primeiro para gerar o relatório.")
             return
             
-        total_duration = self.test_duration
-        
-        # Calcular duração efetiva
-        if self.test_running:
-            effective_duration = time.time() - self.start_time
-        else:
-            effective_duration = total_duration - self.remaining_time
-            
-        if effective_duration <= 0:
-            effective_duration = 0.001
-            
-        # Calcular porcentagens
-        corner_percent = (self.corner_time / effective_duration) * 100
-        lateral_percent = (self.lateral_time / effective_duration) * 100
-        center_percent = (self.center_time / effective_duration) * 100
-        
-        # Formatear relatório
-        report = f"--- Relatório do Teste Open Field ---\n\n"
-        report += f"ID do Animal: {self.animal_id}\n"
-        report += f"Data/Hora: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        report += f"Duração Programada do Teste: {total_duration} segundos\n"
-        report += f"Duração Efetiva do Teste: {effective_duration:.2f} segundos\n\n"
-        report += f"Tempo Acumulado nas Áreas:\n"
-        report += f"  Canto: {self.corner_time:.2f} segundos ({corner_percent:.2f}%)\n"
-        report += f"  Lateral: {self.lateral_time:.2f} segundos ({lateral_percent:.2f}%)\n"
-        report += f"  Centro: {self.center_time:.2f} segundos ({center_percent:.2f}%)\n\n"
-        
+        session = self.session
+        self.show_report(session.animal_id, session.started_at, session.duration_s, session.event_log,
+                         session.now_ns(), session.experimenter, session.treatment_group)
+        
+    def show_report(self, animal_id, started_at, total_duration, event_log, now_ns=None,
+                    experimenter="", treatment_group="", arena_name=""):
+        from report import build_report
+        # Rótulos e cores da arena do registro (pode ser uma sessão gravada com outra arena)
+        arena = self.arena_for(event_log.zones, arena_name)
+        report, self.test_data, totals = build_report(animal_id, started_at, total_duration, event_log, arena,
+                                                      now_ns, experimenter, treatment_group)
         self.report_text.setPlainText(report)
         
-        # Armazenar dados
-        self.test_data = {
-            "ID do Animal": self.animal_id,
-            "Data/Hora": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "Duração Programada (s)": total_duration,
-            "Duração Efetiva (s)": effective_duration,
-            "Tempo no Canto (s)": self.corner_time,
-            "Porcentagem no Canto (%)": corner_percent,
-            "Tempo na Lateral (s)": self.lateral_time,
-            "Porcentagem na Lateral (%)": lateral_percent,
-            "Tempo no Centro (s)": self.center_time,
-            "Porcentagem no Centro (%)": center_percent,
-        }
-        
         # Gerar gráfico
-        self.show_pie_chart(self.corner_time, self.lateral_time, self.center_time)
+        self.show_pie_chart(totals, arena)
+        
+    def arena_for(self, zones, name=""):
+        if tuple(zones) == self.arena.zones and (not name or name == self.arena.name):
+            return self.arena
+        return arena_for_zones(zones, self.arenas, name)
+        
+    def preload_charts(self):
+        # Carrega matplotlib em segundo plano depois que a janela já está visível
+        if self.charts_thread is None and "charts" not in sys.modules:
+            self.charts_thread = threading.Thread(target=self._import_charts, daemon=True)
+            self.charts_thread.start()
+            
+    def _import_charts(self):
+        t0 = time.perf_counter_ns()
+        import charts
+        self.charts_load_ns = time.perf_counter_ns() - t0
+        
+    def ensure_chart(self, arena=None):
+        # Gráfico criado uma única vez e atualizado no lugar; recriado apenas
+        # quando as zonas mudam (outra arena)
+        arena = arena or self.arena
+        if self.pie_chart is not None and self.chart_zones != arena.zones:
+            for widget in (self.pie_chart.canvas, self.pie_chart.toolbar):
+                self.chart_layout.removeWidget(widget)
+                widget.deleteLater()
+            self.pie_chart = None
+        if self.pie_chart is None:
+            from charts import ZonePieChart
+            self.pie_chart = ZonePieChart([arena.labels[zone] for zone in arena.zones],
+                                          [arena.colors[zone][0] for zone in arena.zones], self)
+            self.chart_zones = arena.zones
+            self.pie_chart.set_live(self.live_chart_check.isChecked())
+            self.chart_layout.insertWidget(0, self.pie_chart.canvas)
+            self.chart_layout.insertWidget(1, self.pie_chart.toolbar)
+            if self.diagnostics is not None:
+                # Desenho completo (pintura do Qt) e atualização por blitting
+                canvas = self.pie_chart.canvas
+                canvas.draw = self.diagnostics.timed("chart_draw", canvas.draw)
+                self.pie_chart._blit = self.diagnostics.timed("chart_blit", self.pie_chart._blit)
+        return self.pie_chart
         
     def clear_chart(self):
-        # Limpar widgets do gráfico
-        for i in reversed(range(self.chart_layout.count())):
-            child = self.chart_layout.itemAt(i).widget()
-            if child:
-                child.setParent(None)
+        # Esconder o gráfico sem destruí-lo
+        self.no_chart_label.setVisible(False)
+        if self.pie_chart is None:
+            return
+        self.pie_chart.reset()
+        self.pie_chart.canvas.setVisible(False)
+        self.pie_chart.toolbar.setVisible(False)
                 
-    def show_pie_chart(self, corner_time, lateral_time, center_time):
-        self.clear_chart()
+    def show_pie_chart(self, sizes, arena=None):
+        has_data = any(size > 0 for size in sizes)
         
-        labels = ['Canto', 'Lateral', 'Centro']
-        sizes = [corner_time, lateral_time, center_time]
-        colors = ['red', 'skyblue', 'forestgreen']
-        
-        # Filtrar áreas com tempo zero
-        filtered_labels = []
-        filtered_sizes = []
-        filtered_colors = []
-        for i, size in enumerate(sizes):
-            if size > 0:
-                filtered_sizes.append(size)
-                filtered_labels.append(labels[i])
-                filtered_colors.append(colors[i])
-                
-        if not filtered_sizes:
-            label = QLabel("Nenhum tempo registrado para exibir o gráfico.")
-            label.setAlignment(Qt.AlignCenter)
-            label.setStyleSheet("color: gray;")
-            self.chart_layout.addWidget(label)
+        self.no_chart_label.setVisible(not has_data)
+        if not has_data and self.pie_chart is None:
             return
+        pie_chart = self.ensure_chart(arena)
+        pie_chart.canvas.setVisible(has_data)
+        pie_chart.toolbar.setVisible(has_data)
+        if has_data:
+            pie_chart.update(sizes)
             
-        # Criar figura matplotlib
-        fig = Figure(figsize=(5, 4), dpi=100)
-        ax = fig.add_subplot(111)
-        
-        wedges, texts, autotexts = ax.pie(filtered_sizes, labels=filtered_labels, 
-                                         colors=filtered_colors, autopct='%1.1f%%', 
-                                         startangle=90, pctdistance=0.85)
-        
-        # Ajustar texto
-        for autotext in autotexts:
-            autotext.set_color('black')
-            autotext.set_fontsize(10)
-        for text in texts:
-            text.set_fontsize(10)
+    def on_live_chart_toggled(self, checked):
+        if self.pie_chart is not None:
+            self.pie_chart.set_live(checked)
+        if checked and self.session.running:
+            self.live_chart_timer.start()
+        else:
+            self.live_chart_timer.stop()
             
-        ax.axis('equal')
-        ax.set_title("Distribuição de Tempo por Área")
-        
-        # Adicionar canvas ao layout
-        canvas = FigureCanvas(fig)
-        self.chart_layout.addWidget(canvas)
-        
-        # Adicionar toolbar
-        toolbar = NavigationToolbar(canvas, self)
-        self.chart_layout.addWidget(toolbar)
+    def update_live_chart(self):
+        self.show_pie_chart(self.session.totals_s(self.session.now_ns()))
         
     def export_report(self):
         if not self.test_data:
@@ -501,17 +1052,240 @@ class OpenFieldApp(QMainWindow):
         try:
             with open(filepath, 'w', encoding='utf-8') as file:
                 file.write(self.report_text.toPlainText())
+                # Registro completo de eventos (tempo relativo ao início, em segundos)
+                file.write("Registro de Eventos (zona, tempo (s), tipo):\n")
+                for zone, t_s, kind in self.test_data["Eventos"]:
+                    file.write(f"  {zone}\t{t_s:.9f}\t{kind}\n")
             QMessageBox.information(self, "Exportação Concluída", 
                                   f"Relatório exportado com sucesso para:\n{filepath}")
         except Exception as e:
             QMessageBox.critical(self, "Erro na Exportação", 
                                f"Ocorreu um erro ao exportar o relatório: {e}")
+            
+    def export_sessions(self, session_ids, filters, per_event):
+        if self.export_worker is not None:
+            QMessageBox.information(self, "Exportação em Andamento", "Aguarde o fim da exportação atual.")
+            return
+            
+        filepath, _ = QFileDialog.getSaveFileName(
+            self,
+            "Exportar Sessões",
+            "",
+            "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet);;Feather (*.feather)"
+        )
+        
+        if not filepath:
+            return
+            
+        self.export_progress = QProgressDialog("Exportando sessões...", "Cancelar", 0, 0, self)
+        self.export_progress.setWindowTitle("Exportação")
+        self.export_progress.setMinimumDuration(500)
+        
+        self.export_worker = ExportWorker(self.store.path, filepath, per_event, session_ids, filters, self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.succeeded.connect(self.on_export_succeeded)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_progress.canceled.connect(self.export_worker.cancel)
+        self.export_worker.start()
+        
+    def on_export_progress(self, done, total):
+        self.export_progress.setMaximum(total)
+        self.export_progress.setValue(done)
+        
+    def on_export_succeeded(self, filepath, rows, missing):
+        self.export_progress.reset()
+        message = f"{rows} linhas exportadas com sucesso para:\n{filepath}"
+        if missing:
+            # Sessões excluídas depois de selecionadas
+            shown = ", ".join(str(session_id) for session_id in missing[:10])
+            more = f" e mais {len(missing) - 10}" if len(missing) > 10 else ""
+            message += (f"\n\n{len(missing)} sessões selecionadas não existem mais no banco e foram "
+                        f"ignoradas (ids {shown}{more}).")
+        QMessageBox.information(self, "Exportação Concluída", message)
+        
+    def on_export_cancelled(self):
+        self.export_progress.reset()
+        QMessageBox.information(self, "Exportação Cancelada",
+                                "A exportação foi cancelada; nenhum arquivo foi gravado.")
+        
+    def on_export_failed(self, message):
+        self.export_progress.reset()
+        QMessageBox.critical(self, "Erro na Exportação", f"A exportação não foi concluída: {message}")
+        
+    def on_export_finished(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        
+    def auto_score_videos(self):
+        if self.store is None:
+            QMessageBox.warning(self, "Erro", "Banco de sessões indisponível.")
+            return
+        if self.auto_score_worker is not None:
+            QMessageBox.information(self, "Marcação em Andamento", "Aguarde o fim da marcação automática atual.")
+            return
+        try:
+            duration = int(self.duration_entry.text())
+            if duration <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Erro", "Insira uma duração de teste válida (número inteiro positivo).")
+            return
+            
+        paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Vídeos para Marcação Automática",
+            "",
+            "Vídeos (*.mp4 *.avi *.mov *.mkv *.mpg);;Todos os arquivos (*)"
+        )
+        if not paths:
+            return
+            
+        self.auto_score_errors = []
+        self.auto_score_ids = []
+        self.auto_score_progress = QProgressDialog("Rastreando o animal nos vídeos...", None, 0, len(paths), self)
+        self.auto_score_progress.setWindowTitle("Marcação Automática")
+        self.auto_score_progress.setMinimumDuration(0)
+        
+        self.auto_score_worker = AutoScoreWorker(self.store.path, paths, duration, self.experimenter_entry.text(),
+                                                 self.group_entry.text(), self)
+        self.auto_score_worker.progress.connect(self.on_auto_score_progress)
+        self.auto_score_worker.scored.connect(self.auto_score_ids.append)
+        self.auto_score_worker.failed.connect(lambda path, message: self.auto_score_errors.append(
+            f"{os.path.basename(path)}: {message}"))
+        self.auto_score_worker.finished.connect(self.on_auto_score_finished)
+        self.auto_score_worker.start()
+        
+    def on_auto_score_progress(self, done, total):
+        self.auto_score_progress.setMaximum(total)
+        self.auto_score_progress.setValue(done)
+        
+    def on_auto_score_finished(self):
+        self.auto_score_progress.reset()
+        self.auto_score_worker.deleteLater()
+        self.auto_score_worker = None
+        self.session_browser.refresh()
+        self.start_cohort_update()
+        # O relatório do último vídeo é exibido como o de um teste manual
+        if self.auto_score_ids:
+            self.show_stored_session(self.auto_score_ids[-1])
+        message = f"{len(self.auto_score_ids)} vídeos marcados e gravados no banco de sessões."
+        if self.auto_score_errors:
+            message += "\n\nFalhas:\n" + "\n".join(self.auto_score_errors)
+            QMessageBox.warning(self, "Marcação Automática", message)
+        else:
+            QMessageBox.information(self, "Marcação Automática", message)
+        
+    def record_timer_lateness(self, name, due_ns, now_ns=None):
+        # Diferença (absoluta) entre o disparo do timer e o instante agendado
+        if due_ns is None:
+            return
+        now_ns = self.session.clock() if now_ns is None else now_ns
+        self.diagnostics.record(name, abs(now_ns - due_ns), now_ns)
+        
+    def update_diagnostics(self):
+        self.diagnostics.sample_memory()
+        if self.diagnostics_dock.isVisible():
+            self.diagnostics_panel.refresh()
+            
+    def dump_diagnostics(self):
+        # Medições do teste gravadas em JSON ao fim de cada teste
+        if self.diagnostics is None:
+            return
+        from diagnostics import session_dump_path
+        session = self.session
+        meta = {"animal_id": session.animal_id, "started_at": session.started_at,
+                "duration_s": session.duration_s, "arena": self.arena.name,
+                "events": len(session.event_log), "live_chart": self.live_chart_check.isChecked()}
+        try:
+            self.diagnostics.dump(session_dump_path(session.animal_id), meta)
+        except OSError as e:
+            print(f"Diagnóstico não gravado: {e}", file=sys.stderr)
+        self.update_diagnostics()
+        
+    def closeEvent(self, event):
+        # Interromper uma exportação em andamento antes de fechar
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        if self.auto_score_worker is not None:
+            self.auto_score_worker.wait()
+        if self.cohort_worker is not None:
+            self.cohort_worker.cancel()
+            self.cohort_worker.wait()
+        # Um teste em andamento fica no diário para ser restaurado depois
+        if self.journal is not None:
+            self.journal.close()
+        super().closeEvent(event)
+
+
+def print_startup_profile(marks, budget_ms):
+    # Tempos parciais entre marcas consecutivas e total até a janela ficar interativa
+    print("--- Perfil de Inicialização ---")
+    for (_, previous), (name, t_ns) in zip(marks, marks[1:]):
+        print(f"  {name}: {(t_ns - previous) / 1e6:.1f} ms")
+    total_ms = (marks[-1][1] - marks[0][1]) / 1e6
+    status = "dentro do" if total_ms <= budget_ms else "ACIMA do"
+    print(f"Tempo até interativo: {total_ms:.1f} ms ({status} limite de {budget_ms} ms)")
+    return total_ms <= budget_ms
+
 
 def main():
-    app = QApplication(sys.argv)
-    window = OpenFieldApp()
+    parser = argparse.ArgumentParser(description="Teste de Campo Aberto - Marcação de Áreas")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="mostra os tempos de inicialização e encerra")
+    parser.add_argument("--arenas", type=int, default=0, metavar="N",
+                        help="modo multiarena: marca N arenas simultâneas na mesma janela")
+    parser.add_argument("--arena", default=None, metavar="ARQUIVO",
+                        help="definição de arena (JSON) a usar no lugar da última escolhida")
+    parser.add_argument("--video", nargs="?", const="", default=None, metavar="ARQUIVO",
+                        help="modo vídeo: marca um teste gravado, no tempo da mídia")
+    parser.add_argument("--events", nargs="?", type=int, const=-1, default=None, metavar="PORTA",
+                        help="publica os eventos de marcação em NDJSON em 127.0.0.1 (porta padrão 8765)")
+    parser.add_argument("--events-socket", default=None, metavar="CAMINHO",
+                        help="publica os eventos também num socket Unix")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="mede tempos da interface e memória (painel e JSON ao fim de cada teste)")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication([sys.argv[0]] + qt_args)
+    STARTUP_MARKS.append(("criação do QApplication", time.perf_counter_ns()))
+    event_server = None
+    if args.events is not None or args.events_socket:
+        from event_server import DEFAULT_PORT, start_server
+        event_server = start_server(DEFAULT_PORT if args.events == -1 else args.events, args.events_socket)
+    if args.arenas > 0:
+        from multi_arena import MultiArenaWindow
+        window = MultiArenaWindow(args.arenas, event_server=event_server, arena_path=args.arena)
+    elif args.video is not None:
+        from video_scoring import VideoScoringWindow
+        window = VideoScoringWindow(args.video or None, event_server=event_server, arena_path=args.arena)
+    else:
+        window = OpenFieldApp(args.arena, args.diagnostics, event_server)
+    STARTUP_MARKS.append(("construção da janela", time.perf_counter_ns()))
     window.show()
-    sys.exit(app.exec())
+    STARTUP_MARKS.append(("exibição da janela", time.perf_counter_ns()))
+    
+    # Primeira volta do laço de eventos: janela pronta para interação
+    def on_interactive():
+        STARTUP_MARKS.append(("primeiro ciclo de eventos", time.perf_counter_ns()))
+        if isinstance(window, OpenFieldApp):
+            window.preload_charts()
+            if not args.profile_startup:
+                window.recover_journals()
+                window.start_cohort_update()
+        if args.profile_startup:
+            within_budget = print_startup_profile(STARTUP_MARKS, STARTUP_BUDGET_MS)
+            if getattr(window, "charts_thread", None) is not None:
+                window.charts_thread.join()
+                print(f"  (matplotlib carregado em segundo plano: {window.charts_load_ns / 1e6:.1f} ms)")
+            app.exit(0 if within_budget else 1)
+    QTimer.singleShot(0, on_interactive)
+    code = app.exec()
+    if event_server is not None:
+        event_server.close()
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,302 @@
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from arena import arena_for_zones, builtin_arenas
+from event_log import NS_PER_S
+from metrics import session_intervals
+from store import DEFAULT_DB_PATH, PAGE_SIZE, SessionStore
+
+# Resolução da grade comum em que os registros são comparados
+DEFAULT_BIN_S = 0.1
+# Divergências mais curtas que isso não são listadas (diferença de reação)
+DEFAULT_MIN_DISAGREEMENT_S = 1.0
+
+
+def occupancy_grid(log, bin_ns, n_bins):
+    # Zona ocupada no centro de cada intervalo da grade; len(zones) = fora
+    # de todas as áreas (nenhuma tecla pressionada)
+    zone, start, end = session_intervals(log)
+    centers = np.arange(n_bins, dtype=np.int64) * bin_ns + bin_ns // 2
+    index = np.searchsorted(start, centers, side="right") - 1
+    inside = index >= 0
+    inside[inside] = centers[inside] < end[index[inside]]
+    grid = np.full(n_bins, len(log.zones), dtype=np.int64)
+    grid[inside] = zone[index[inside]]
+    return grid
+
+
+def clipped_totals_s(log, duration_ns):
+    # Tempo por zona dentro do trecho comparado (exato, sem a grade)
+    zone, start, end = session_intervals(log)
+    length = np.minimum(end, duration_ns) - np.minimum(start, duration_ns)
+    return np.bincount(zone, weights=length, minlength=len(log.zones)) / NS_PER_S
+
+
+def cohen_kappa(a, b, n_categories):
+    # Kappa de Cohen de dois avaliadores a partir da matriz de confusão
+    n = len(a)
+    if n == 0:
+        return np.nan
+    confusion = np.bincount(a * n_categories + b, minlength=n_categories * n_categories)
+    confusion = confusion.reshape(n_categories, n_categories)
+    observed = np.trace(confusion) / n
+    expected = confusion.sum(axis=1) @ confusion.sum(axis=0) / (n * n)
+    if expected == 1:
+        return 1.0 if observed == 1 else np.nan
+    return (observed - expected) / (1 - expected)
+
+
+def category_counts(grids, n_categories):
+    # Quantos avaliadores marcaram cada categoria em cada intervalo (intervalos x categorias)
+    n_bins = grids.shape[1]
+    return np.bincount((np.arange(n_bins) * n_categories + grids).ravel(),
+                       minlength=n_bins * n_categories).reshape(n_bins, n_categories)
+
+
+def fleiss_kappa(counts):
+    # Kappa de Fleiss a partir das contagens por intervalo e categoria
+    n_bins = len(counts)
+    n_raters = counts.sum(axis=1).max() if n_bins else 0
+    if n_bins == 0 or n_raters < 2:
+        return np.nan
+    observed = ((counts * (counts - 1)).sum(axis=1) / (n_raters * (n_raters - 1))).mean()
+    proportions = counts.sum(axis=0) / (n_bins * n_raters)
+    expected = proportions @ proportions
+    if expected == 1:
+        return 1.0 if observed == 1 else np.nan
+    return (observed - expected) / (1 - expected)
+
+
+def runs(mask):
+    # (início, fim) de cada sequência de True, em índices da grade
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges.reshape(-1, 2)
+
+
+def compare(logs, bin_s=DEFAULT_BIN_S, min_disagreement_s=DEFAULT_MIN_DISAGREEMENT_S):
+    # Concordância entre dois ou mais registros do mesmo teste. Os registros
+    # são alinhados pelo início e comparados no trecho comum, numa grade de
+    # bin_s segundos.
+    if len(logs) < 2:
+        raise ValueError("a comparação requer ao menos dois registros")
+    zones = logs[0].zones
+    if any(log.zones != zones for log in logs):
+        raise ValueError("todos os registros devem usar as mesmas zonas")
+    n_categories = len(zones) + 1
+    bin_ns = int(bin_s * NS_PER_S)
+    duration_ns = min(log.elapsed_ns() for log in logs)
+    n_bins = duration_ns // bin_ns
+    grids = np.stack([occupancy_grid(log, bin_ns, n_bins) for log in logs])
+
+    agree = (grids == grids[0]).all(axis=0)
+    # Concordância específica por área: intervalos em que todos marcaram a
+    # área, entre os intervalos em que ao menos um a marcou
+    counts = category_counts(grids, n_categories)
+    marked_all = (counts == len(logs)).sum(axis=0)
+    marked_any = (counts > 0).sum(axis=0)
+    zone_agreement = np.divide(marked_all, marked_any, out=np.full(n_categories, np.nan), where=marked_any > 0)
+
+    pairwise = np.full((len(logs), len(logs)), 1.0)
+    for i in range(len(logs)):
+        for j in range(i + 1, len(logs)):
+            pairwise[i, j] = pairwise[j, i] = cohen_kappa(grids[i], grids[j], n_categories)
+
+    disagreements = runs(~agree)
+    disagreements = disagreements[(disagreements[:, 1] - disagreements[:, 0]) * bin_s >= min_disagreement_s]
+    return {
+        "zones": zones,
+        "raters": len(logs),
+        "bin_s": bin_s,
+        "duration_s": duration_ns / NS_PER_S,
+        "agree": agree,
+        "agreement": agree.mean() if n_bins else np.nan,
+        "zone_agreement": zone_agreement[:-1],
+        "cohen_kappa": pairwise,
+        "fleiss_kappa": fleiss_kappa(counts),
+        "totals_s": np.array([clipped_totals_s(log, duration_ns) for log in logs]),
+        "disagreements_s": disagreements * bin_s,
+        "min_disagreement_s": min_disagreement_s,
+    }
+
+
+def duration_icc(totals):
+    # ICC(2,1) (efeitos aleatórios de dois fatores, concordância absoluta,
+    # medida única) dos tempos por zona; totals: (testes, avaliadores, zonas)
+    totals = np.asarray(totals, dtype=float)
+    n, k = totals.shape[:2]
+    if n < 2 or k < 2:
+        return np.full(totals.shape[2:], np.nan)
+    grand = totals.mean(axis=(0, 1))
+    ss_rows = k * ((totals.mean(axis=1) - grand) ** 2).sum(axis=0)
+    ss_raters = n * ((totals.mean(axis=0) - grand) ** 2).sum(axis=0)
+    ss_error = ((totals - grand) ** 2).sum(axis=(0, 1)) - ss_rows - ss_raters
+    ms_rows = ss_rows / (n - 1)
+    ms_raters = ss_raters / (k - 1)
+    ms_error = ss_error / ((n - 1) * (k - 1))
+    denominator = ms_rows + (k - 1) * ms_error + k * (ms_raters - ms_error) / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, (ms_rows - ms_error) / denominator, np.nan)
+
+
+def compare_many(groups, bin_s=DEFAULT_BIN_S, min_disagreement_s=DEFAULT_MIN_DISAGREEMENT_S):
+    # Todos os testes com mais de um avaliador numa chamada: resultado de
+    # cada teste e, para cada conjunto de zonas (arena), o ICC dos tempos
+    # por zona entre os seus testes (com o número de avaliadores comum a
+    # esses testes, na ordem recebida): {zonas: ICC}
+    results = [compare(logs, bin_s, min_disagreement_s) for logs in groups]
+    by_zones = {}
+    for result in results:
+        by_zones.setdefault(result["zones"], []).append(result)
+    icc = {}
+    for zones, comparable in by_zones.items():
+        raters = min(result["raters"] for result in comparable)
+        icc[zones] = duration_icc([result["totals_s"][:raters] for result in comparable])
+    return results, icc
+
+
+def double_scored_groups(store, by_animal=False, **filters):
+    # Sessões do mesmo animal (e do mesmo dia, salvo by_animal) marcadas por
+    # mais de um experimentador; devolve {(animal, dia): [linhas]}. Cada
+    # experimentador conta como um avaliador: das suas sessões repetidas no
+    # grupo, vale a mais recente (maior id).
+    groups = {}
+    before_id = None
+    while True:
+        page = store.query(before_id=before_id, **filters)
+        for row in page:
+            key = (row[1], "" if by_animal else row[2][:10])
+            # Páginas vêm do id maior para o menor: a primeira vista é a mais recente
+            groups.setdefault(key, {}).setdefault(row[3], row)
+        if len(page) < PAGE_SIZE:
+            break
+        before_id = page[-1][0]
+    return {key: sorted(by_rater.values()) for key, by_rater in sorted(groups.items()) if len(by_rater) > 1}
+
+
+def format_reliability(result, labels, rater_names=None):
+    # Resumo em texto de compare() no estilo do relatório do teste
+    names = rater_names or [f"Avaliador {i + 1}" for i in range(result["raters"])]
+    text = f"Concordância entre Avaliadores ({', '.join(names)}):\n"
+    text += f"  Trecho comparado: {result['duration_s']:.2f} segundos (grade de {result['bin_s']:g} s)\n"
+    text += f"  Concordância por intervalo: {result['agreement'] * 100:.2f}%\n"
+    text += f"  Kappa de Fleiss: {result['fleiss_kappa']:.3f}\n"
+    if result["raters"] == 2:
+        text += f"  Kappa de Cohen: {result['cohen_kappa'][0, 1]:.3f}\n"
+    text += "  Concordância por Área / Tempo (s) por avaliador:\n"
+    for index, label in enumerate(labels):
+        agreement = result["zone_agreement"][index]
+        totals = " / ".join(f"{total:.2f}" for total in result["totals_s"][:, index])
+        text += f"    {label}: {'-' if agreement != agreement else f'{agreement * 100:.1f}%'}  ({totals})\n"
+    text += f"  Divergências (≥ {result['min_disagreement_s']:g} s): {len(result['disagreements_s'])}\n"
+    for start, end in result["disagreements_s"]:
+        text += f"    {start:8.1f} – {end:8.1f} s\n"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="openfield.py reliability",
+        description="Concordância entre avaliadores de sessões marcadas em duplicidade")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="banco de sessões")
+    parser.add_argument("--ids", type=int, nargs="+",
+                        help="compara apenas estas sessões entre si (um único teste)")
+    parser.add_argument("--animal", dest="animal_id")
+    parser.add_argument("--group", dest="treatment_group")
+    parser.add_argument("--from", dest="date_from", metavar="AAAA-MM-DD")
+    parser.add_argument("--to", dest="date_to", metavar="AAAA-MM-DD")
+    parser.add_argument("--by-animal", action="store_true",
+                        help="agrupa por animal, sem exigir a mesma data")
+    parser.add_argument("--bin", type=float, default=DEFAULT_BIN_S, help="resolução da grade (s)")
+    parser.add_argument("--min-disagreement", type=float, default=DEFAULT_MIN_DISAGREEMENT_S,
+                        help="duração mínima de uma divergência listada (s)")
+    parser.add_argument("--csv", help="grava uma linha por teste neste arquivo")
+    parser.add_argument("--verbose", action="store_true", help="mostra o resumo de cada teste")
+    args = parser.parse_args(argv)
+
+    store = SessionStore(args.db)
+    try:
+        t0 = time.perf_counter()
+        if args.ids:
+            rows = [store.get(session_id) for session_id in args.ids]
+            if None in rows:
+                print("Sessão não encontrada.", file=sys.stderr)
+                return 1
+            groups = {(rows[0][1], rows[0][2][:10]): rows}
+        else:
+            filters = {key: getattr(args, key) for key in ("animal_id", "treatment_group", "date_from", "date_to")
+                       if getattr(args, key)}
+            groups = double_scored_groups(store, args.by_animal, **filters)
+        # Registros de arenas diferentes não são comparáveis: o grupo é ignorado
+        logs = []
+        for key, rows in list(groups.items()):
+            group_logs = store.load_logs([row[0] for row in rows])
+            if len({log.zones for log in group_logs}) > 1:
+                print(f"Ignorado: {key[0]} {key[1]} (sessões {', '.join(str(row[0]) for row in rows)}) "
+                      f"usa áreas diferentes entre as sessões.", file=sys.stderr)
+                del groups[key]
+                continue
+            logs.append(group_logs)
+        if not groups:
+            print("Nenhuma sessão marcada por mais de um experimentador.", file=sys.stderr)
+            return 1
+        loaded = time.perf_counter()
+        results, icc = compare_many(logs, args.bin, args.min_disagreement)
+        elapsed = time.perf_counter() - loaded
+    finally:
+        store.close()
+
+    arenas = builtin_arenas()
+    # Nome de cada arena: o gravado com as sessões ou o da definição conhecida
+    arena_names = {}
+    for rows, result in zip(groups.values(), results):
+        arena_names.setdefault(result["zones"], rows[0][10] or arena_for_zones(result["zones"], arenas).name)
+    if args.verbose:
+        for (animal, day), rows, result in zip(groups.keys(), groups.values(), results):
+            arena = arena_for_zones(result["zones"], arenas, rows[0][10])
+            print(f"--- {animal} {day} (sessões {', '.join(str(row[0]) for row in rows)}) ---")
+            print(format_reliability(result, [arena.labels[zone] for zone in arena.zones],
+                                     [row[3] or str(row[0]) for row in rows]))
+    agreement = np.array([result["agreement"] for result in results])
+    kappa = np.array([result["fleiss_kappa"] for result in results])
+    print(f"{len(results)} testes marcados em duplicidade "
+          f"(carregados em {loaded - t0:.2f} s, comparados em {elapsed:.2f} s)")
+    print(f"  concordância por intervalo: mediana {np.nanmedian(agreement) * 100:.1f}%, "
+          f"mínima {np.nanmin(agreement) * 100:.1f}%")
+    print(f"  kappa de Fleiss: mediana {np.nanmedian(kappa):.3f}, mínimo {np.nanmin(kappa):.3f}")
+    # Um ICC por arena: tempos de áreas diferentes não se combinam
+    for zones, values in icc.items():
+        count = sum(result["zones"] == zones for result in results)
+        if count < 2:
+            continue
+        name = f" ({arena_names[zones]}, {count} testes)" if len(icc) > 1 else ""
+        print(f"  ICC(2,1) dos tempos por área{name}: " +
+              ", ".join(f"{zone} {value:.3f}" for zone, value in zip(zones, values)))
+
+    if args.csv:
+        # Colunas de concordância das áreas de todas as arenas, vazias nos
+        # testes sem aquela área
+        zones = list(dict.fromkeys(zone for zone_set in icc for zone in zone_set))
+        with open(args.csv, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["animal_id", "date", "arena", "session_ids", "experimenters", "compared_s",
+                             "agreement", "fleiss_kappa", "cohen_kappa", "disagreements", "disagreement_s"]
+                            + [f"agreement_{zone}" for zone in zones])
+            for (animal, day), rows, result in zip(groups.keys(), groups.values(), results):
+                spans = result["disagreements_s"]
+                zone_agreement = dict(zip(result["zones"], result["zone_agreement"]))
+                writer.writerow([animal, day, rows[0][10] or arena_names[result["zones"]],
+                                 " ".join(str(row[0]) for row in rows),
+                                 " ".join(row[3] for row in rows), result["duration_s"], result["agreement"],
+                                 result["fleiss_kappa"],
+                                 result["cohen_kappa"][0, 1] if result["raters"] == 2 else "",
+                                 len(spans), float((spans[:, 1] - spans[:, 0]).sum())]
+                                + [zone_agreement.get(zone, "") for zone in zones])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import numpy as np
+
+from metrics import session_intervals
+
+# Velocidades oferecidas na revisão de sessões
+SPEEDS = (1, 2, 5, 10, 20, 50)
+
+
+class ReplayCursor:
+    # Estado de uma sessão gravada em qualquer instante (ns desde o início
+    # do teste): área ocupada e tempos acumulados por área. As permanências
+    # de cada área ficam em arrays ordenados com a soma acumulada das
+    # durações, então cada consulta é uma busca binária por área, qualquer
+    # que seja o tamanho do registro ou o instante pedido (busca livre).
+    def __init__(self, log):
+        self.zones = log.zones
+        self.duration_ns = log.elapsed_ns()
+        self.zone, self.starts, self.ends = session_intervals(log)
+        self._by_zone = []
+        for zone in range(len(self.zones)):
+            mask = self.zone == zone
+            starts, ends = self.starts[mask], self.ends[mask]
+            self._by_zone.append((starts, ends, np.concatenate(([0], np.cumsum(ends - starts)))))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def active_at(self, t_ns):
+        # Índice da área ocupada em t_ns, ou -1
+        i = int(np.searchsorted(self.starts, t_ns, side="right")) - 1
+        if i >= 0 and t_ns < self.ends[i]:
+            return int(self.zone[i])
+        return -1
+
+    def totals_ns_at(self, t_ns):
+        # Tempos acumulados até t_ns (escalar ou array): forma (..., n_zonas)
+        t_ns = np.asarray(t_ns, dtype=np.int64)
+        totals = np.zeros(t_ns.shape + (len(self.zones),), dtype=np.int64)
+        for zone, (starts, ends, cumulative) in enumerate(self._by_zone):
+            if not len(starts):
+                continue
+            # Permanências já encerradas, mais a que estiver em andamento em t_ns
+            done = np.searchsorted(ends, t_ns, side="right")
+            current = np.minimum(done, len(starts) - 1)
+            partial = np.where((done < len(starts)) & (starts[current] < t_ns), t_ns - starts[current], 0)
+            totals[..., zone] = cumulative[done] + partial
+        return totals
+
+    def occupancy(self, width, t0_ns=0, t1_ns=None):
+        # Faixa da linha do tempo reduzida a width colunas entre t0_ns e
+        # t1_ns: fração de cada coluna passada em cada área, (width, n_zonas).
+        # Custa width buscas por área, independente do número de eventos.
+        t1_ns = self.duration_ns if t1_ns is None else t1_ns
+        edges = np.linspace(t0_ns, t1_ns, width + 1).round().astype(np.int64)
+        spans = np.maximum(np.diff(edges), 1)
+        return np.diff(self.totals_ns_at(edges), axis=0) / spans[:, None]
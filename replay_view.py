@@ -0,0 +1,214 @@
+import numpy as np
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox
+from PySide6.QtCore import Qt, Signal, QTimer
+from PySide6.QtGui import QColor, QImage, QPainter, QPen
+
+from event_log import NS_PER_S
+from replay import SPEEDS, ReplayCursor
+from video import MediaClock
+
+# Atualização da revisão enquanto toca (~30 quadros/s)
+FRAME_INTERVAL_MS = 33
+# Janela mostrada na faixa de detalhe, centrada na posição atual
+DETAIL_WINDOW_S = 120
+# Cor dos trechos sem área marcada
+EMPTY_COLOR = QColor("white")
+
+
+class TimelineStrip(QWidget):
+    # Faixa de ocupação das áreas entre t0 e t1: uma coluna por pixel,
+    # com a cor de cada área ponderada pelo tempo passado nela. A imagem é
+    # calculada apenas quando o intervalo ou a largura mudam; mover a
+    # posição só redesenha a linha vertical.
+    scrubbed = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(24)
+        self.cursor = None
+        self.colors = None
+        self.t0_ns = 0
+        self.t1_ns = 1
+        self.position_ns = 0
+        self._image = None
+        self._image_key = None
+        self._pixels = None
+
+    def set_cursor(self, cursor, colors):
+        # colors: cor (nome ou #rrggbb) de cada área, na ordem do registro
+        self.cursor = cursor
+        self.colors = np.array([QColor(color).getRgb()[:3] for color in colors], dtype=np.float64)
+        self._image_key = None
+        self.set_range(0, cursor.duration_ns)
+
+    def set_range(self, t0_ns, t1_ns):
+        self.t0_ns, self.t1_ns = t0_ns, max(t1_ns, t0_ns + 1)
+        self.update()
+
+    def set_position(self, t_ns):
+        self.position_ns = t_ns
+        self.update()
+
+    def image(self):
+        width = max(self.width(), 1)
+        key = (width, self.t0_ns, self.t1_ns)
+        if key != self._image_key:
+            fractions = self.cursor.occupancy(width, self.t0_ns, self.t1_ns)
+            empty = 1 - fractions.sum(axis=1, keepdims=True)
+            rgb = fractions @ self.colors + empty * EMPTY_COLOR.getRgb()[:3]
+            self._pixels = np.ascontiguousarray(rgb.round().clip(0, 255).astype(np.uint8))
+            self._image = QImage(self._pixels.data, width, 1, 3 * width, QImage.Format_RGB888)
+            self._image_key = key
+        return self._image
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.cursor is not None:
+            painter.drawImage(self.rect(), self.image())
+            x = round((self.position_ns - self.t0_ns) / (self.t1_ns - self.t0_ns) * self.width())
+            if 0 <= x <= self.width():
+                painter.setPen(QPen(Qt.red, 2))
+                painter.drawLine(x, 0, x, self.height())
+        painter.setPen(Qt.gray)
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+
+    def t_at(self, x):
+        fraction = min(max(x / max(self.width(), 1), 0.0), 1.0)
+        return int(self.t0_ns + fraction * (self.t1_ns - self.t0_ns))
+
+    def mousePressEvent(self, event):
+        if self.cursor is not None and event.button() == Qt.LeftButton:
+            self.scrubbed.emit(self.t_at(event.position().x()))
+
+    def mouseMoveEvent(self, event):
+        if self.cursor is not None and event.buttons() & Qt.LeftButton:
+            self.scrubbed.emit(self.t_at(event.position().x()))
+
+
+class ReplayPanel(QWidget):
+    # Revisão de uma sessão gravada a 1–50×: o relógio de mídia (o mesmo
+    # da marcação de vídeo) dá a posição, e a janela reproduz nela os
+    # destaques das áreas, a contagem regressiva e o gráfico
+    position_changed = Signal(object)
+    closed = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cursor = None
+        self.duration_s = 0
+        self.position_ns = 0
+        self.clock = MediaClock()
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_INTERVAL_MS)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame)
+        layout = QVBoxLayout(self)
+
+        self.title_label = QLabel()
+        layout.addWidget(self.title_label)
+
+        # Sessão inteira e detalhe em torno da posição; clique ou arraste para buscar
+        self.overview = TimelineStrip()
+        self.overview.scrubbed.connect(self.seek)
+        layout.addWidget(self.overview)
+        self.detail = TimelineStrip()
+        self.detail.scrubbed.connect(self.seek)
+        layout.addWidget(self.detail)
+
+        controls_layout = QHBoxLayout()
+        self.play_button = QPushButton("Reproduzir")
+        self.play_button.setFocusPolicy(Qt.NoFocus)
+        self.play_button.clicked.connect(self.toggle_play)
+        controls_layout.addWidget(self.play_button)
+        controls_layout.addWidget(QLabel("Velocidade:"))
+        self.speed_combo = QComboBox()
+        self.speed_combo.setFocusPolicy(Qt.NoFocus)
+        for speed in SPEEDS:
+            self.speed_combo.addItem(f"{speed}×", speed)
+        self.speed_combo.currentIndexChanged.connect(lambda _: self.clock.set_rate(self.speed_combo.currentData()))
+        controls_layout.addWidget(self.speed_combo)
+        self.time_label = QLabel()
+        controls_layout.addWidget(self.time_label, 1)
+        close_button = QPushButton("Fechar Revisão")
+        close_button.setFocusPolicy(Qt.NoFocus)
+        close_button.clicked.connect(self.close_replay)
+        controls_layout.addWidget(close_button)
+        layout.addLayout(controls_layout)
+
+    def load(self, log, colors, duration_s, title=""):
+        # colors: cor de cada área do registro; a revisão começa pausada no início
+        self.pause()
+        self.cursor = ReplayCursor(log)
+        self.duration_s = duration_s
+        self.title_label.setText(f"{title} — {len(self.cursor)} permanências")
+        self.overview.set_cursor(self.cursor, colors)
+        self.detail.set_cursor(self.cursor, colors)
+        self.seek(0)
+
+    @property
+    def active(self):
+        return self.cursor is not None
+
+    def toggle_play(self):
+        if self.clock.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def play(self):
+        if self.cursor is None:
+            return
+        # No fim, recomeça do início
+        if self.position_ns >= self.cursor.duration_ns:
+            self.seek(0)
+        self.clock.set_rate(self.speed_combo.currentData())
+        self.clock.play()
+        self.timer.start()
+        self.play_button.setText("Pausar")
+
+    def pause(self):
+        self.clock.pause()
+        self.timer.stop()
+        self.play_button.setText("Reproduzir")
+
+    def seek(self, t_ns):
+        if self.cursor is None:
+            return
+        t_ns = min(max(t_ns, 0), self.cursor.duration_ns)
+        self.clock.seek(t_ns)
+        self.set_position(t_ns)
+
+    def on_frame(self):
+        t_ns = self.clock.now_ns()
+        if t_ns >= self.cursor.duration_ns:
+            t_ns = self.cursor.duration_ns
+            self.pause()
+            self.clock.seek(t_ns)
+        self.set_position(t_ns)
+
+    def set_position(self, t_ns):
+        self.position_ns = t_ns
+        self.overview.set_position(t_ns)
+        half_ns = min(DETAIL_WINDOW_S * NS_PER_S, self.cursor.duration_ns) // 2
+        start_ns = min(max(t_ns - half_ns, 0), self.cursor.duration_ns - 2 * half_ns)
+        self.detail.set_range(start_ns, start_ns + 2 * half_ns)
+        self.detail.set_position(t_ns)
+        text = f"{_clock_text(t_ns)} / {_clock_text(self.cursor.duration_ns)}"
+        if text != self.time_label.text():
+            self.time_label.setText(text)
+        self.position_changed.emit(t_ns)
+
+    def close_replay(self):
+        self.pause()
+        if self.cursor is not None:
+            self.cursor = None
+            self.closed.emit()
+
+
+def _clock_text(t_ns):
+    # hh:mm:ss.d
+    tenths = t_ns // (NS_PER_S // 10)
+    seconds, tenth = divmod(tenths, 10)
+    minutes, second = divmod(seconds, 60)
+    hours, minute = divmod(minutes, 60)
+    return f"{hours:02d}:{minute:02d}:{second:02d}.{tenth}"
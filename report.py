@@ -0,0 +1,115 @@
+from arena import zone_time_label
+from event_log import NS_PER_S
+from metrics import session_metrics
+
+# Linhas da tabela de ocupação no texto do relatório: em testes longos os
+# minutos são somados em intervalos maiores (test_data mantém cada minuto)
+REPORT_MAX_ROWS = 60
+
+
+def build_report(animal_id, started_at, total_duration, event_log, arena, now_ns=None,
+                 experimenter="", treatment_group=""):
+    # Relatório de um teste, sem dependência de Qt (usado pela janela e pelo
+    # modo em lote). Devolve (texto, dados do teste, tempos por zona em s).
+    labels = [arena.labels[zone] for zone in arena.zones]
+
+    # Calcular duração efetiva e tempos a partir do registro de eventos
+    effective_duration = event_log.elapsed_ns(now_ns) / NS_PER_S
+    totals = event_log.totals_s(now_ns)
+
+    if effective_duration <= 0:
+        effective_duration = 0.001
+
+    # Calcular porcentagens
+    percents = [(total / effective_duration) * 100 for total in totals]
+
+    # Formatear relatório
+    report = f"--- Relatório do Teste Open Field ---\n\n"
+    report += f"ID do Animal: {animal_id}\n"
+    if experimenter:
+        report += f"Experimentador: {experimenter}\n"
+    if treatment_group:
+        report += f"Grupo de Tratamento: {treatment_group}\n"
+    report += f"Data/Hora: {started_at}\n"
+    report += f"Arena: {arena.name}\n"
+    report += f"Duração Programada do Teste: {total_duration} segundos\n"
+    report += f"Duração Efetiva do Teste: {effective_duration:.2f} segundos\n\n"
+    report += f"Tempo Acumulado nas Áreas:\n"
+    for label, total, percent in zip(labels, totals, percents):
+        report += f"  {label}: {total:.2f} segundos ({percent:.2f}%)\n"
+    report += f"  Eventos registrados: {len(event_log)}\n\n"
+
+    # Métricas comportamentais derivadas das permanências registradas
+    metrics = session_metrics(event_log, now_ns=now_ns)
+    report += format_metrics(metrics, labels)
+
+    # Armazenar dados
+    zones = arena.zones
+    test_data = {
+        "ID do Animal": animal_id,
+        "Experimentador": experimenter,
+        "Grupo de Tratamento": treatment_group,
+        "Data/Hora": started_at,
+        "Arena": arena.name,
+        "Duração Programada (s)": total_duration,
+        "Duração Efetiva (s)": effective_duration,
+    }
+    for zone, label, total, percent in zip(zones, labels, totals, percents):
+        time_label = zone_time_label(zone, label)
+        test_data[f"{time_label} (s)"] = total
+        test_data[f"{time_label.replace('Tempo', 'Porcentagem', 1)} (%)"] = percent
+    if "center" in zones:
+        test_data["Latência até o Centro (s)"] = float(metrics["latency_s"][zones.index("center")])
+    test_data.update({
+        "Entradas por Área": dict(zip(zones, metrics["entries"].tolist())),
+        "Latência até a Primeira Entrada (s)": dict(zip(zones, metrics["latency_s"].tolist())),
+        "Ocupação por Minuto (s)": dict(zip(zones, metrics["binned_s"].tolist())),
+        "Transições (de -> para)": metrics["transitions"].tolist(),
+        "Duração Média dos Episódios (s)": dict(zip(zones, metrics["bout_mean_s"].tolist())),
+        "Duração Mediana dos Episódios (s)": dict(zip(zones, metrics["bout_median_s"].tolist())),
+        "Duração Máxima dos Episódios (s)": dict(zip(zones, metrics["bout_max_s"].tolist())),
+        "Histograma de Episódios": dict(zip(zones, metrics["bout_hist"].tolist())),
+        "Eventos": event_log.records(),
+    })
+    return report, test_data, totals
+
+
+def format_metrics(metrics, names):
+    text = "Entradas por Área:\n"
+    text += "".join(f"  {name}: {count}\n" for name, count in zip(names, metrics["entries"]))
+
+    text += "Latência até a Primeira Entrada (segundos):\n"
+    for name, latency in zip(names, metrics["latency_s"]):
+        # NaN: nunca entrou na área
+        text += f"  {name}: {'não entrou' if latency != latency else f'{latency:.2f}'}\n"
+    text += "\n"
+
+    text += "Duração dos Episódios (média / mediana / máxima, segundos):\n"
+    for name, mean, median, maximum in zip(names, metrics["bout_mean_s"], metrics["bout_median_s"],
+                                           metrics["bout_max_s"]):
+        if mean != mean:
+            text += f"  {name}: -\n"
+        else:
+            text += f"  {name}: {mean:.2f} / {median:.2f} / {maximum:.2f}\n"
+
+    binned = metrics["binned_s"]
+    n_minutes = binned.shape[1]
+    step = max(-(-n_minutes // REPORT_MAX_ROWS), 1)
+    if step == 1:
+        text += f"\nOcupação por Minuto (segundos):\n"
+        text += "  Minuto" + "".join(f"{name:>10}" for name in names) + "\n"
+        for minute, row in enumerate(binned.T, start=1):
+            text += f"  {minute:6d}" + "".join(f"{value:10.2f}" for value in row) + "\n"
+    else:
+        text += f"\nOcupação a Cada {step} Minutos (segundos):\n"
+        text += f"  {'Minutos':>11}" + "".join(f"{name:>10}" for name in names) + "\n"
+        for first in range(0, n_minutes, step):
+            minutes = f"{first + 1}-{min(first + step, n_minutes)}"
+            row = binned[:, first:first + step].sum(axis=1)
+            text += f"  {minutes:>11}" + "".join(f"{value:10.2f}" for value in row) + "\n"
+
+    text += "\nTransições entre Áreas (de → para):\n"
+    text += "  " + " " * 8 + "".join(f"{name:>10}" for name in names) + "\n"
+    for name, row in zip(names, metrics["transitions"]):
+        text += f"  {name:8s}" + "".join(f"{count:10d}" for count in row) + "\n"
+    return text + "\n"
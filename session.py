@@ -0,0 +1,185 @@
+import time
+
+from event_log import EventLog, NS_PER_S, PRESS
+
+# Zonas de marcação, na ordem usada pelo registro de eventos
+ZONES = ("corner", "lateral", "center")
+
+ZONE_NAMES = {
+    "corner": "Canto",
+    "lateral": "Lateral",
+    "center": "Centro",
+}
+
+# Cores de fundo e texto de cada zona na interface
+ZONE_COLORS = {
+    "corner": ("red", "white"),
+    "lateral": ("skyblue", "black"),
+    "center": ("forestgreen", "white"),
+}
+
+# Notificações enviadas aos observadores: listener(kind, zone)
+STARTED = "started"
+PRESSED = "pressed"
+RELEASED = "released"
+STOPPED = "stopped"
+
+
+class ScoringSession:
+    # Motor de marcação sem dependência de Qt. Todo o estado do teste vive
+    # aqui; a interface apenas observa as notificações e desenha o resultado.
+    def __init__(self, zones=ZONES, clock=time.perf_counter_ns):
+        self.zones = tuple(zones)
+        self.clock = clock
+        self.animal_id = ""
+        self.experimenter = ""
+        self.treatment_group = ""
+        self.started_at = ""
+        self.duration_s = 0
+        self.running = False
+        self.event_log = None
+        self.deadline_ns = None
+        self._zone_ids = {name: index for index, name in enumerate(self.zones)}
+        self._listeners = []
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, kind, zone=-1):
+        for listener in self._listeners:
+            listener(kind, zone)
+
+    def start(self, animal_id, duration_s, t_ns=None, experimenter="", treatment_group=""):
+        if self.running:
+            return False
+        animal_id = animal_id.strip()
+        if not animal_id:
+            raise ValueError("ID do animal vazio")
+        if duration_s <= 0:
+            raise ValueError("duração deve ser positiva")
+        self.animal_id = animal_id
+        self.experimenter = experimenter.strip()
+        self.treatment_group = treatment_group.strip()
+        # Data/hora de parede apenas para identificação; as medidas usam o relógio monotônico
+        self.started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.duration_s = duration_s
+        self.event_log = EventLog(self.zones, self.clock() if t_ns is None else t_ns)
+        self.deadline_ns = self.event_log.start_ns + duration_s * NS_PER_S
+        self.running = True
+        self._notify(STARTED)
+        return True
+
+    def resume(self, meta, log, t_ns=None):
+        # Retoma um teste interrompido a partir do seu registro. O intervalo
+        # entre o fim do registro (último sinal de vida do diário, ou o último
+        # evento) e agora não conta como tempo de teste.
+        if self.running:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        delta = t_ns - (log.end_ns if log.end_ns is not None else log.last_ns())
+        resumed = EventLog(self.zones, log.start_ns + delta)
+        for event in log:
+            if event.kind == PRESS:
+                resumed.press(event.zone, event.t_ns + delta)
+            else:
+                resumed.release(event.zone, event.t_ns + delta)
+        self.animal_id = meta["animal_id"]
+        self.experimenter = meta.get("experimenter", "")
+        self.treatment_group = meta.get("treatment_group", "")
+        self.started_at = meta["started_at"]
+        self.duration_s = meta["duration_s"]
+        self.event_log = resumed
+        self.deadline_ns = resumed.start_ns + self.duration_s * NS_PER_S
+        self.running = True
+        self._notify(STARTED)
+        return True
+
+    def press(self, zone_name, t_ns=None):
+        if not self.running:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        # Eventos após o prazo encerram o teste exatamente no prazo
+        if t_ns >= self.deadline_ns:
+            self.stop(self.deadline_ns)
+            return False
+        log = self.event_log
+        zone = self._zone_ids[zone_name]
+        previous = log.active
+        if not log.press(zone, t_ns):
+            return False
+        if previous >= 0:
+            self._notify(RELEASED, previous)
+        self._notify(PRESSED, zone)
+        return True
+
+    def release(self, zone_name, t_ns=None):
+        if not self.running:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        if t_ns >= self.deadline_ns:
+            self.stop(self.deadline_ns)
+            return False
+        zone = self._zone_ids[zone_name]
+        if not self.event_log.release(zone, t_ns):
+            return False
+        self._notify(RELEASED, zone)
+        return True
+
+    def tick(self, now_ns=None):
+        # Encerra o teste no prazo programado (nunca depois dele); devolve o
+        # tempo restante em ns
+        if not self.running:
+            return 0
+        if now_ns is None:
+            now_ns = self.clock()
+        if now_ns >= self.deadline_ns:
+            self.stop(self.deadline_ns)
+            return 0
+        return self.deadline_ns - now_ns
+
+    def stop(self, t_ns=None):
+        if not self.running:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        log = self.event_log
+        active = log.active
+        # A última soltura é limitada ao prazo do teste
+        log.close(min(t_ns, self.deadline_ns))
+        self.running = False
+        if active >= 0:
+            self._notify(RELEASED, active)
+        self._notify(STOPPED)
+        return True
+
+    def now_ns(self):
+        # Instante de referência: relógio (limitado ao prazo) em execução,
+        # fim do registro depois
+        return min(self.clock(), self.deadline_ns) if self.running else None
+
+    def elapsed_s(self, now_ns=None):
+        if self.event_log is None:
+            return 0.0
+        return self.event_log.elapsed_ns(now_ns) / NS_PER_S
+
+    def remaining_ns(self, now_ns=None):
+        if self.event_log is None:
+            return 0
+        return max(self.duration_s * NS_PER_S - self.event_log.elapsed_ns(now_ns), 0)
+
+    def remaining_s(self, now_ns=None):
+        return self.remaining_ns(now_ns) / NS_PER_S
+
+    def totals_s(self, now_ns=None):
+        if self.event_log is None:
+            return [0.0] * len(self.zones)
+        return self.event_log.totals_s(now_ns)
+
+    @property
+    def active_zone(self):
+        if self.event_log is None or self.event_log.active < 0:
+            return None
+        return self.zones[self.event_log.active]
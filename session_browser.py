@@ -0,0 +1,145 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                               QPushButton, QTableView, QAbstractItemView, QHeaderView, QCheckBox)
+from PySide6.QtCore import Qt, Signal, QAbstractTableModel, QModelIndex
+
+from store import PAGE_SIZE
+
+
+class SessionTableModel(QAbstractTableModel):
+    # Modelo paginado: cada página é buscada no banco apenas quando a
+    # tabela rola até o fim dos dados já carregados (canFetchMore/fetchMore)
+    HEADERS = ("ID", "Animal", "Data/Hora", "Experimentador", "Grupo", "Duração (s)", "Eventos")
+    COLUMNS = (0, 1, 2, 3, 4, 6, 9)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.filters = {}
+        self.rows = []
+        self.exhausted = store is None
+
+    def set_filters(self, filters):
+        self.beginResetModel()
+        self.filters = filters
+        self.rows = []
+        self.exhausted = self.store is None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][self.COLUMNS[index.column()]]
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        before_id = self.rows[-1][0] if self.rows else None
+        page = self.store.query(before_id=before_id, **self.filters)
+        if len(page) < PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def session_id(self, row):
+        return self.rows[row][0]
+
+
+class SessionBrowser(QWidget):
+    session_activated = Signal(int)
+    replay_requested = Signal(int)
+    # (ids selecionados ou None para todos os filtrados, filtros, uma linha por evento?)
+    export_requested = Signal(object, dict, bool)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        layout = QVBoxLayout(self)
+
+        # Filtros (prefixo para textos; datas no formato AAAA-MM-DD)
+        filters_layout = QHBoxLayout()
+        self.filter_entries = {}
+        for key, label in (("animal_id", "Animal:"), ("experimenter", "Experimentador:"),
+                           ("treatment_group", "Grupo:"), ("date_from", "De:"), ("date_to", "Até:")):
+            filters_layout.addWidget(QLabel(label))
+            entry = QLineEdit()
+            if key.startswith("date"):
+                entry.setPlaceholderText("AAAA-MM-DD")
+            entry.returnPressed.connect(self.refresh)
+            filters_layout.addWidget(entry)
+            self.filter_entries[key] = entry
+        filter_button = QPushButton("Filtrar")
+        filter_button.clicked.connect(self.refresh)
+        filters_layout.addWidget(filter_button)
+        layout.addLayout(filters_layout)
+
+        status_layout = QHBoxLayout()
+        self.count_label = QLabel()
+        status_layout.addWidget(self.count_label, 1)
+        self.per_event_check = QCheckBox("Uma linha por evento")
+        status_layout.addWidget(self.per_event_check)
+        export_button = QPushButton("Exportar Seleção...")
+        export_button.setToolTip("Exporta as linhas selecionadas ou, sem seleção, todas as sessões filtradas")
+        export_button.clicked.connect(self.request_export)
+        status_layout.addWidget(export_button)
+        replay_button = QPushButton("Revisar Sessão")
+        replay_button.setToolTip("Reproduz a marcação da sessão selecionada (1× a 50×)")
+        replay_button.clicked.connect(self.request_replay)
+        status_layout.addWidget(replay_button)
+        layout.addLayout(status_layout)
+
+        self.model = SessionTableModel(store, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.doubleClicked.connect(lambda index: self.session_activated.emit(self.model.session_id(index.row())))
+        layout.addWidget(self.table)
+
+        self.refresh()
+
+    def selected_ids(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self.model.session_id(row) for row in rows]
+
+    def request_export(self):
+        if self.store is None:
+            return
+        self.export_requested.emit(self.selected_ids() or None, self.filters(), self.per_event_check.isChecked())
+
+    def request_replay(self):
+        session_ids = self.selected_ids()
+        if session_ids:
+            self.replay_requested.emit(session_ids[0])
+
+    def filters(self):
+        return {key: entry.text().strip() for key, entry in self.filter_entries.items() if entry.text().strip()}
+
+    def refresh(self):
+        if self.store is None:
+            self.count_label.setText("Banco de sessões indisponível.")
+            return
+        filters = self.filters()
+        self.model.set_filters(filters)
+        self.count_label.setText(f"{self.store.count(**filters)} sessões")
@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+from array import array
+
+from event_log import EventLog, NS_PER_S
+
+# Banco padrão; pode ser trocado pela variável de ambiente OPENFIELD_DB
+DEFAULT_DB_PATH = os.environ.get(
+    "OPENFIELD_DB", os.path.join(os.path.expanduser("~"), ".openfield", "sessions.sqlite3"))
+
+PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    animal_id TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    experimenter TEXT NOT NULL DEFAULT '',
+    treatment_group TEXT NOT NULL DEFAULT '',
+    duration_s INTEGER NOT NULL,
+    effective_s REAL NOT NULL,
+    zones TEXT NOT NULL,
+    totals_ns TEXT NOT NULL,
+    n_events INTEGER NOT NULL,
+    arena TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS sessions_animal ON sessions (animal_id, id);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_experimenter ON sessions (experimenter, id);
+CREATE INDEX IF NOT EXISTS sessions_group ON sessions (treatment_group, id);
+
+-- Registros de eventos ficam à parte para que as listagens não leiam os blobs
+CREATE TABLE IF NOT EXISTS session_events (
+    session_id INTEGER PRIMARY KEY REFERENCES sessions (id) ON DELETE CASCADE,
+    start_ns INTEGER NOT NULL,
+    end_ns INTEGER NOT NULL,
+    zone BLOB NOT NULL,
+    t_ns BLOB NOT NULL,
+    kind BLOB NOT NULL
+);
+
+-- Agregados por grupo (coorte), atualizados a cada sessão gravada; o
+-- progresso indica a última sessão já incluída
+CREATE TABLE IF NOT EXISTS cohort_stats (
+    arena TEXT NOT NULL,
+    treatment_group TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (arena, treatment_group, metric)
+);
+CREATE TABLE IF NOT EXISTS cohort_progress (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    last_session_id INTEGER NOT NULL
+);
+"""
+
+LIST_COLUMNS = ("id", "animal_id", "started_at", "experimenter", "treatment_group",
+                "duration_s", "effective_s", "zones", "totals_ns", "n_events", "arena")
+
+
+class SessionStore:
+    # Armazenamento local (SQLite) de todos os testes concluídos, com o
+    # registro completo de eventos. Consultas são paginadas por chave (id).
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # Bancos anteriores à coluna arena (sessões antigas ficam com '')
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sessions)")]
+        if "arena" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE sessions ADD COLUMN arena TEXT NOT NULL DEFAULT ''")
+
+    def close(self):
+        self.conn.close()
+
+    def save_session(self, session, arena=""):
+        # arena: nome da definição de arena usada na marcação
+        return self.save(session.animal_id, session.started_at, session.duration_s, session.event_log,
+                         experimenter=session.experimenter, treatment_group=session.treatment_group, arena=arena)
+
+    def save(self, animal_id, started_at, duration_s, log, experimenter="", treatment_group="", arena=""):
+        with self.conn:
+            return self._insert(animal_id, started_at, duration_s, log, experimenter, treatment_group, arena)
+
+    def save_many(self, sessions, arena=""):
+        # Grava vários testes (da mesma arena) numa única transação
+        with self.conn:
+            return [self._insert(s.animal_id, s.started_at, s.duration_s, s.event_log,
+                                 s.experimenter, s.treatment_group, arena) for s in sessions]
+
+    def _insert(self, animal_id, started_at, duration_s, log, experimenter, treatment_group, arena=""):
+        cursor = self.conn.execute(
+            "INSERT INTO sessions (animal_id, started_at, experimenter, treatment_group, duration_s,"
+            " effective_s, zones, totals_ns, n_events, arena) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (animal_id, started_at, experimenter, treatment_group, duration_s,
+             log.elapsed_ns() / NS_PER_S, json.dumps(log.zones), json.dumps(log.totals_ns()), len(log), arena))
+        session_id = cursor.lastrowid
+        zone, t_ns, kind = log.buffers()
+        self.conn.execute(
+            "INSERT INTO session_events (session_id, start_ns, end_ns, zone, t_ns, kind)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, log.start_ns, log.end_ns if log.end_ns is not None else log.last_ns(),
+             zone.tobytes(), t_ns.tobytes(), kind.tobytes()))
+        return session_id
+
+    def _where(self, animal_id=None, experimenter=None, treatment_group=None,
+               date_from=None, date_to=None, before_id=None):
+        # Filtros por prefixo usam intervalos para aproveitar os índices
+        clauses, params = [], []
+        for column, value in (("animal_id", animal_id), ("experimenter", experimenter),
+                              ("treatment_group", treatment_group)):
+            if value:
+                clauses.append(f"{column} >= ? AND {column} < ?")
+                params += [value, value + "\uffff"]
+        if date_from:
+            clauses.append("started_at >= ?")
+            params.append(date_from)
+        if date_to:
+            # Inclui todo o último dia quando só a data é informada
+            clauses.append("started_at < ?")
+            params.append(date_to + "\uffff")
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, limit=PAGE_SIZE, **filters):
+        # Uma página de resultados, do mais recente para o mais antigo;
+        # a próxima página usa before_id=<último id recebido>
+        where, params = self._where(**filters)
+        return self.conn.execute(
+            f"SELECT {', '.join(LIST_COLUMNS)} FROM sessions{where} ORDER BY id DESC LIMIT ?",
+            params + [limit]).fetchall()
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM sessions{where}", params).fetchone()[0]
+
+    def iter_ids(self, **filters):
+        # Todos os ids que atendem aos filtros, lidos em páginas
+        before_id = filters.pop("before_id", None)
+        while True:
+            where, params = self._where(before_id=before_id, **filters)
+            ids = [row[0] for row in self.conn.execute(
+                f"SELECT id FROM sessions{where} ORDER BY id DESC LIMIT ?", params + [PAGE_SIZE])]
+            if not ids:
+                return
+            yield from ids
+            before_id = ids[-1]
+
+    def zone_sets(self, session_ids=None, **filters):
+        # Conjuntos de zonas distintos entre as sessões (ids ou filtros), na
+        # ordem da primeira sessão de cada um
+        if session_ids is not None:
+            sets = {}
+            for start in range(0, len(session_ids), PAGE_SIZE):
+                chunk = list(session_ids[start:start + PAGE_SIZE])
+                for zones, in self.conn.execute(
+                        f"SELECT zones FROM sessions WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                    sets.setdefault(zones, None)
+            return [tuple(json.loads(zones)) for zones in sets]
+        where, params = self._where(**filters)
+        return [tuple(json.loads(zones)) for zones, in self.conn.execute(
+            f"SELECT zones FROM sessions{where} GROUP BY zones ORDER BY MIN(id)", params)]
+
+    def get(self, session_id):
+        return self.conn.execute(
+            f"SELECT {', '.join(LIST_COLUMNS)} FROM sessions WHERE id = ?", (session_id,)).fetchone()
+
+    def load_log(self, session_id):
+        row = self.conn.execute(
+            "SELECT s.zones, e.start_ns, e.end_ns, e.zone, e.t_ns, e.kind FROM sessions s"
+            " JOIN session_events e ON e.session_id = s.id WHERE s.id = ?", (session_id,)).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        zones, start_ns, end_ns, zone, t_ns, kind = row
+        return EventLog.from_buffers(json.loads(zones), start_ns, end_ns,
+                                     _array("H", zone), _array("q", t_ns), _array("b", kind))
+
+    def last_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0]
+
+    def ids_after(self, session_id, limit=PAGE_SIZE):
+        # Próximas sessões (ordem crescente) depois de session_id
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM sessions WHERE id > ? ORDER BY id LIMIT ?", (session_id, limit))]
+
+    def load_cohort(self):
+        # ([(arena, grupo, métrica, estado JSON)], última sessão incluída),
+        # lidos na mesma transação para que agregados e progresso combinem
+        self.conn.execute("BEGIN")
+        try:
+            rows = self.conn.execute("SELECT arena, treatment_group, metric, state FROM cohort_stats").fetchall()
+            progress = self.conn.execute("SELECT last_session_id FROM cohort_progress WHERE id = 0").fetchone()
+        finally:
+            self.conn.commit()
+        return rows, progress[0] if progress else 0
+
+    def save_cohort(self, rows, last_session_id, expected_session_id):
+        # Grava apenas os agregados alterados, junto com o progresso, se o
+        # progresso no banco ainda for expected_session_id. Se outro processo
+        # gravou antes, nada é gravado e a função devolve False. A conferência
+        # e a gravação ficam na mesma transação (BEGIN IMMEDIATE bloqueia
+        # outros escritores entre as duas).
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            progress = self.conn.execute("SELECT last_session_id FROM cohort_progress WHERE id = 0").fetchone()
+            if (progress[0] if progress else 0) != expected_session_id:
+                self.conn.rollback()
+                return False
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cohort_stats (arena, treatment_group, metric, state) VALUES (?, ?, ?, ?)",
+                rows)
+            self.conn.execute("INSERT OR REPLACE INTO cohort_progress (id, last_session_id) VALUES (0, ?)",
+                              (last_session_id,))
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return True
+
+    def load_logs(self, session_ids):
+        # Registros de várias sessões, na ordem pedida (para métricas em lote)
+        return [self.load_log(session_id) for session_id in session_ids]
+
+
+def _array(typecode, data):
+    buffer = array(typecode)
+    buffer.frombytes(data)
+    return buffer
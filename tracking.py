@@ -0,0 +1,221 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from arena import ARENA_DIR, ArenaDefinition, open_field_arena
+from event_log import EventLog, NS_PER_S
+from session import ZONES
+from video import open_video
+
+# Diferença mínima de intensidade (0-255) entre o quadro e o fundo
+DEFAULT_THRESHOLD = 30
+# Área mínima (pixels) para considerar o animal detectado no quadro
+DEFAULT_MIN_AREA = 20
+# Permanências mais curtas que isso (quadros) são tratadas como ruído de borda
+DEFAULT_MIN_BOUT_FRAMES = 3
+# Arquivo de geometria procurado no diretório dos vídeos
+ARENA_FILE = "arena.json"
+# Quadros processados por vez (memória limitada a um bloco)
+CHUNK_FRAMES = 64
+# Quadros amostrados para estimar o fundo (mediana)
+BACKGROUND_SAMPLES = 25
+
+
+class ArenaGeometry:
+    # Posição da arena no vídeo (pixels x0, y0, x1, y1; None = quadro
+    # inteiro) e a definição de zonas aplicada a ela
+    def __init__(self, bounds=None, arena=None):
+        self.bounds = tuple(bounds) if bounds is not None else None
+        self.arena = arena or open_field_arena()
+        self.zones = self.arena.zones
+
+    @classmethod
+    def from_file(cls, path):
+        # {"bounds": [...], "arena": "definicao.json"} ou, para a arena
+        # padrão, {"bounds": [...], "border": 0.25}
+        with open(path, encoding="utf-8") as file:
+            spec = json.load(file)
+        if "arena" in spec:
+            # Relativo ao arquivo de geometria ou às definições distribuídas
+            arena_path = os.path.join(os.path.dirname(path), spec["arena"])
+            if not os.path.exists(arena_path):
+                arena_path = os.path.join(ARENA_DIR, spec["arena"])
+            arena = ArenaDefinition.from_file(arena_path)
+        else:
+            border = spec.get("border", 0.25)
+            if not 0 < border < 0.5:
+                raise ValueError("a faixa de borda deve estar entre 0 e 0,5")
+            arena = open_field_arena(border)
+        return cls(spec.get("bounds"), arena)
+
+    def classify(self, x, y, frame_shape):
+        # Índice da zona (ordem de self.zones) de cada posição; NaN vira -1
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = self.bounds if self.bounds is not None else (0, 0, width, height)
+        u = (np.asarray(x, dtype=float) - x0) / (x1 - x0)
+        v = (np.asarray(y, dtype=float) - y0) / (y1 - y0)
+        return self.arena.classify(u, v)
+
+
+def geometry_for(directory):
+    # Geometria da arena de um diretório de vídeos (padrão: quadro inteiro)
+    path = os.path.join(directory, ARENA_FILE)
+    return ArenaGeometry.from_file(path) if os.path.exists(path) else ArenaGeometry()
+
+
+def read_frames(source, indices):
+    # Pilha (n, altura, largura) de quadros em tons de cinza
+    frames = [source.read(index, grayscale=True) for index in indices]
+    frames = [frame for frame in frames if frame is not None]
+    return np.stack(frames) if frames else None
+
+
+def estimate_background(source, samples=BACKGROUND_SAMPLES, stop=None):
+    # Mediana de quadros espalhados pelo vídeo: o animal se move, o fundo não
+    stop = source.frame_count if stop is None else min(stop, source.frame_count)
+    indices = np.unique(np.linspace(0, max(stop - 1, 0), samples).astype(int))
+    frames = read_frames(source, indices)
+    if frames is None:
+        raise ValueError("vídeo sem quadros legíveis")
+    return np.median(frames, axis=0).astype(np.int16)
+
+
+def centroids(frames, background, threshold=DEFAULT_THRESHOLD, min_area=DEFAULT_MIN_AREA):
+    # Subtração de fundo vetorizada sobre o bloco inteiro; o centroide é a
+    # média das coordenadas dos pixels de primeiro plano (NaN sem detecção)
+    mask = np.abs(frames.astype(np.int16) - background) > threshold
+    area = mask.sum(axis=(1, 2))
+    ys = np.arange(mask.shape[1], dtype=float)
+    xs = np.arange(mask.shape[2], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = mask.sum(axis=1) @ xs / area
+        cy = mask.sum(axis=2) @ ys / area
+    missing = area < min_area
+    cx[missing] = np.nan
+    cy[missing] = np.nan
+    return cx, cy
+
+
+def track(source, background, threshold=DEFAULT_THRESHOLD, min_area=DEFAULT_MIN_AREA,
+          chunk=CHUNK_FRAMES, stop=None):
+    # Trajetória (x, y) quadro a quadro; quadros sem detecção repetem a
+    # última posição conhecida (o animal parado some na subtração de fundo)
+    stop = source.frame_count if stop is None else min(stop, source.frame_count)
+    xs, ys = [], []
+    for first in range(0, stop, chunk):
+        frames = read_frames(source, range(first, min(first + chunk, stop)))
+        if frames is None:
+            break
+        cx, cy = centroids(frames, background, threshold, min_area)
+        xs.append(cx)
+        ys.append(cy)
+        if len(frames) < min(chunk, stop - first):
+            break
+    x = np.concatenate(xs) if xs else np.empty(0)
+    y = np.concatenate(ys) if ys else np.empty(0)
+    return fill_gaps(x), fill_gaps(y)
+
+
+def fill_gaps(values):
+    # Preenche NaN com o último valor válido (e o início com o primeiro válido)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return values
+    index = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+    filled[:np.argmax(valid)] = values[np.argmax(valid)]
+    return filled
+
+
+def zones_to_log(zone, fps, zones=ZONES, duration_s=None, min_bout_frames=DEFAULT_MIN_BOUT_FRAMES):
+    # Converte a zona de cada quadro no mesmo registro de eventos da marcação
+    # manual: uma pressão no início de cada permanência, soltura no fim
+    n_frames = len(zone)
+    change = np.flatnonzero(zone[1:] != zone[:-1]) + 1
+    starts = np.concatenate(([0], change)).astype(np.int64)
+    ends = np.append(starts[1:], n_frames)
+    run_zone = zone[starts] if n_frames else np.empty(0, np.int64)
+
+    # Permanências curtas demais (oscilação na fronteira) continuam a anterior
+    keep = (ends - starts >= min_bout_frames) | (np.arange(len(starts)) == 0)
+    starts, run_zone = starts[keep], run_zone[keep]
+    merged = np.concatenate(([True], run_zone[1:] != run_zone[:-1])) if len(run_zone) else np.empty(0, bool)
+    starts, run_zone = starts[merged], run_zone[merged]
+
+    frame_ns = NS_PER_S / fps
+    end_ns = round(n_frames * frame_ns)
+    if duration_s is not None:
+        end_ns = min(end_ns, duration_s * NS_PER_S)
+    log = EventLog(zones, 0)
+    for first, index in zip(starts.tolist(), run_zone.tolist()):
+        t_ns = round(first * frame_ns)
+        if t_ns >= end_ns:
+            break
+        if index >= 0:
+            log.press(index, t_ns)
+        elif log.active >= 0:
+            log.release(log.active, t_ns)
+    log.close(end_ns)
+    return log
+
+
+def score_video(path, geometry=None, duration_s=None, threshold=DEFAULT_THRESHOLD,
+                min_area=DEFAULT_MIN_AREA, min_bout_frames=DEFAULT_MIN_BOUT_FRAMES):
+    # Marcação automática de um vídeo (ou diretório de imagens); devolve o
+    # registro de eventos e estatísticas do processamento
+    t0 = time.perf_counter_ns()
+    geometry = geometry or ArenaGeometry()
+    source = open_video(path)
+    try:
+        stop = source.frame_count
+        if duration_s is not None:
+            stop = min(stop, int(np.ceil(duration_s * source.fps)))
+        background = estimate_background(source, stop=stop)
+        x, y = track(source, background, threshold, min_area, stop=stop)
+    finally:
+        source.close()
+    zone = geometry.classify(x, y, background.shape)
+    log = zones_to_log(zone, source.fps, geometry.zones, duration_s, min_bout_frames)
+    elapsed_s = (time.perf_counter_ns() - t0) / NS_PER_S
+    return {
+        "path": path,
+        "log": log,
+        "fps": source.fps,
+        "frames": len(zone),
+        "zone": zone,
+        "x": x,
+        "y": y,
+        "processing_s": elapsed_s,
+    }
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def score_videos(paths, geometry=None, duration_s=None, workers=None, **kwargs):
+    # Vários arquivos em paralelo, um processo por arquivo; produz
+    # (caminho, resultado, erro) à medida que cada um termina
+    workers = workers or default_workers()
+    if workers == 1:
+        for path in paths:
+            try:
+                yield path, score_video(path, geometry, duration_s, **kwargs), None
+            except Exception as e:
+                yield path, None, e
+        return
+    # spawn: o processo pai pode ter threads (Qt, leitura de vídeo) e um
+    # fork copiaria travas em estado inconsistente
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(paths), 1)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(score_video, path, geometry, duration_s, **kwargs): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -0,0 +1,225 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from event_log import NS_PER_S
+
+# Extensões aceitas como sequência de imagens (um diretório de quadros)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+# Quadros decodificados mantidos em memória e quantos ler à frente
+CACHE_FRAMES = 96
+LOOKAHEAD_FRAMES = 48
+
+
+def _cv2():
+    try:
+        import cv2
+    except ImportError:
+        raise RuntimeError("o modo de vídeo requer o pacote opencv-python (pip install opencv-python)")
+    return cv2
+
+
+class VideoFile:
+    # Leitura quadro a quadro de um arquivo de vídeo; leituras sequenciais
+    # não fazem seek, e quadros pulados são apenas avançados (grab)
+    def __init__(self, path):
+        cv2 = self._cv2 = _cv2()
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"não foi possível abrir o vídeo: {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._next = 0
+
+    def read(self, index, grayscale=False):
+        cv2 = self._cv2
+        if index < self._next or index > self._next + LOOKAHEAD_FRAMES:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._next = index
+        while self._next < index:
+            self.capture.grab()
+            self._next += 1
+        ok, frame = self.capture.read()
+        self._next += 1
+        if not ok:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY if grayscale else cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        self.capture.release()
+
+
+class ImageSequence:
+    # Diretório de imagens tratado como vídeo (ordem alfabética dos nomes)
+    def __init__(self, path, fps=30.0):
+        self._cv2 = _cv2()
+        self.path = path
+        self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise ValueError(f"nenhuma imagem encontrada em: {path}")
+        self.fps = fps
+        self.frame_count = len(self.files)
+
+    def read(self, index, grayscale=False):
+        cv2 = self._cv2
+        if not 0 <= index < self.frame_count:
+            return None
+        frame = cv2.imread(self.files[index], cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR)
+        if frame is None or grayscale:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        pass
+
+
+def open_video(path, fps=30.0):
+    if os.path.isdir(path):
+        return ImageSequence(path, fps)
+    return VideoFile(path)
+
+
+class FramePrefetcher:
+    # Decodifica quadros numa thread própria, à frente da posição de
+    # reprodução, num cache LRU limitado; a interface nunca espera o decodificador
+    def __init__(self, path, capacity=CACHE_FRAMES, lookahead=LOOKAHEAD_FRAMES):
+        self.source = open_video(path)
+        self.fps = self.source.fps
+        self.frame_count = self.source.frame_count
+        self.capacity = capacity
+        self.lookahead = lookahead
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._target = 0
+        self._stride = 1
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def request(self, index, stride=1):
+        # Nova posição de reprodução; stride > 1 quando a velocidade pula quadros
+        with self._cond:
+            self._target = index
+            self._stride = max(int(stride), 1)
+            self._cond.notify()
+
+    def get(self, index):
+        with self._cond:
+            frame = self._cache.get(index)
+            if frame is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._cache.move_to_end(index)
+            return frame
+
+    def wait_for(self, index, timeout=1.0):
+        # Bloqueia até o quadro estar disponível (passo a passo e busca); um
+        # quadro além do fim do vídeo devolve None sem esperar
+        if not 0 <= index < self.frame_count:
+            return None
+        self.request(index)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # frame_count diminui se o vídeo acabar antes do anunciado
+            while index not in self._cache and index < self.frame_count and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._cache.get(index)
+
+    def _next_missing(self):
+        for offset in range(self.lookahead):
+            index = self._target + offset * self._stride
+            if index >= self.frame_count:
+                return None
+            if index not in self._cache:
+                return index
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                index = self._next_missing()
+                while index is None and not self._closed:
+                    self._cond.wait()
+                    index = self._next_missing()
+                if self._closed:
+                    return
+            frame = self.source.read(index)
+            with self._cond:
+                if frame is None:
+                    # Fim real do vídeo antes do número de quadros anunciado
+                    self.frame_count = min(self.frame_count, index)
+                else:
+                    self._cache[index] = frame
+                    while len(self._cache) > self.capacity:
+                        self._cache.popitem(last=False)
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.source.close()
+
+
+class MediaClock:
+    # Relógio em tempo de mídia (ns desde o início do vídeo). Avança com o
+    # relógio monotônico multiplicado pela velocidade, apenas enquanto toca.
+    def __init__(self, wall_clock=time.perf_counter_ns):
+        self.wall_clock = wall_clock
+        self.rate = 1.0
+        self.playing = False
+        self._base_media_ns = 0
+        self._base_wall_ns = wall_clock()
+
+    def now_ns(self):
+        return self.at(self.wall_clock())
+
+    def at(self, wall_ns):
+        # Posição da mídia num instante do relógio monotônico (ex.: o
+        # timestamp de um evento de teclado já convertido para esse relógio)
+        if not self.playing:
+            return self._base_media_ns
+        return self._base_media_ns + max(int((wall_ns - self._base_wall_ns) * self.rate), 0)
+
+    def _rebase(self, media_ns):
+        self._base_media_ns = media_ns
+        self._base_wall_ns = self.wall_clock()
+
+    def play(self):
+        if not self.playing:
+            self._rebase(self._base_media_ns)
+            self.playing = True
+
+    def pause(self):
+        if self.playing:
+            self._rebase(self.now_ns())
+            self.playing = False
+
+    def set_rate(self, rate):
+        self._rebase(self.now_ns())
+        self.rate = rate
+
+    def seek(self, media_ns):
+        self._rebase(max(media_ns, 0))
+
+
+def frame_to_ns(index, fps):
+    # Início do quadro arredondado para cima, para que ns_to_frame (que
+    # arredonda para baixo) devolva o mesmo quadro
+    return math.ceil(index * NS_PER_S / fps)
+
+
+def ns_to_frame(media_ns, fps):
+    return int(media_ns * fps // NS_PER_S)
@@ -0,0 +1,399 @@
+import sqlite3
+
+from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+                               QLabel, QLineEdit, QPushButton, QGroupBox, QMessageBox,
+                               QFileDialog, QComboBox, QSlider, QSizePolicy)
+from PySide6.QtCore import QTimer, Qt, QSettings
+from PySide6.QtGui import QImage, QPixmap, QKeySequence
+
+from arena import builtin_arenas, find_arena
+from event_log import NS_PER_S
+from input_timing import InputTimestamper
+from session import ScoringSession, PRESSED, RELEASED, STOPPED
+from store import SessionStore
+from video import FramePrefetcher, MediaClock, frame_to_ns, ns_to_frame
+
+# Velocidades de reprodução oferecidas
+PLAYBACK_RATES = (0.25, 0.5, 1.0, 2.0, 4.0)
+
+# Intervalo de atualização do quadro exibido (~60 Hz)
+DISPLAY_INTERVAL_MS = 16
+
+
+class VideoScoringWindow(QMainWindow):
+    # Marcação sobre um vídeo gravado: os eventos usam o tempo da mídia (não
+    # o relógio de parede), de modo que velocidade, pausa e avanço quadro a
+    # quadro não alteram as durações medidas
+    def __init__(self, path=None, store=None, event_server=None, arena_path=None):
+        super().__init__()
+        self.setWindowTitle("Teste de Campo Aberto - Marcação por Vídeo")
+        self.setGeometry(100, 100, 1200, 800)
+
+        # Arena (zonas, rótulos, cores e teclas): a de --arena ou a escolhida
+        # por último na janela principal
+        self.settings = QSettings("OpenField", "OpenFieldApp")
+        self.arena = find_arena(arena_path or self.settings.value("arena", ""), builtin_arenas())
+
+        self.media_clock = MediaClock()
+        self.session = ScoringSession(self.arena.zones, clock=self.media_clock.now_ns)
+        self.session.subscribe(self.on_session_event)
+        if event_server is not None:
+            event_server.attach(self.session, self.arena.name, source="video")
+        self.player = None
+        self.frame_index = -1
+
+        self.key_zones = {}
+        arena = self.arena
+        for zone in arena.zones:
+            sequence = QKeySequence(self.settings.value(f"keys/{arena.name}/{zone}", arena.keys[zone]))
+            if not sequence.isEmpty():
+                self.key_zones[sequence[0].key()] = zone
+        self.input_timestamper = InputTimestamper(self.media_clock.wall_clock)
+
+        if store is None:
+            try:
+                store = SessionStore()
+            except sqlite3.Error:
+                store = None
+        self.store = store
+
+        self.display_timer = QTimer(self)
+        self.display_timer.setInterval(DISPLAY_INTERVAL_MS)
+        self.display_timer.setTimerType(Qt.PreciseTimer)
+        self.display_timer.timeout.connect(self.refresh)
+
+        self.init_ui()
+        if path:
+            self.open_video(path)
+
+    def init_ui(self):
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QHBoxLayout(central_widget)
+
+        # Coluna do vídeo
+        video_layout = QVBoxLayout()
+        self.frame_label = QLabel("Nenhum vídeo aberto.")
+        self.frame_label.setAlignment(Qt.AlignCenter)
+        self.frame_label.setMinimumSize(640, 480)
+        self.frame_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.frame_label.setStyleSheet("background-color: black; color: white;")
+        video_layout.addWidget(self.frame_label, 1)
+
+        self.seek_slider = QSlider(Qt.Horizontal)
+        self.seek_slider.setEnabled(False)
+        self.seek_slider.sliderMoved.connect(self.seek_frame)
+        video_layout.addWidget(self.seek_slider)
+
+        transport_layout = QHBoxLayout()
+        open_button = QPushButton("Abrir Vídeo...")
+        open_button.setFocusPolicy(Qt.NoFocus)
+        open_button.clicked.connect(self.choose_video)
+        transport_layout.addWidget(open_button)
+        self.back_button = QPushButton("◀ Quadro")
+        self.play_button = QPushButton("Reproduzir")
+        self.forward_button = QPushButton("Quadro ▶")
+        for button in (self.back_button, self.play_button, self.forward_button):
+            button.setFocusPolicy(Qt.NoFocus)
+            button.setEnabled(False)
+            transport_layout.addWidget(button)
+        self.back_button.clicked.connect(lambda: self.step(-1))
+        self.play_button.clicked.connect(self.toggle_playback)
+        self.forward_button.clicked.connect(lambda: self.step(1))
+        transport_layout.addWidget(QLabel("Velocidade:"))
+        self.rate_combo = QComboBox()
+        self.rate_combo.setFocusPolicy(Qt.NoFocus)
+        for rate in PLAYBACK_RATES:
+            self.rate_combo.addItem(f"{rate:g}×", rate)
+        self.rate_combo.setCurrentIndex(PLAYBACK_RATES.index(1.0))
+        self.rate_combo.currentIndexChanged.connect(
+            lambda index: self.media_clock.set_rate(self.rate_combo.itemData(index)))
+        transport_layout.addWidget(self.rate_combo)
+        self.position_label = QLabel("00:00.000 | quadro 0")
+        transport_layout.addWidget(self.position_label, 1)
+        video_layout.addLayout(transport_layout)
+        main_layout.addLayout(video_layout, 3)
+
+        # Coluna de marcação
+        side_layout = QVBoxLayout()
+        config_group = QGroupBox("Configurações do Teste")
+        config_layout = QGridLayout(config_group)
+        self.animal_id_entry = QLineEdit()
+        self.duration_entry = QLineEdit("300")
+        self.experimenter_entry = QLineEdit()
+        self.group_entry = QLineEdit()
+        for row, (label, entry) in enumerate((("ID do Animal:", self.animal_id_entry),
+                                              ("Duração do Teste (segundos):", self.duration_entry),
+                                              ("Experimentador:", self.experimenter_entry),
+                                              ("Grupo de Tratamento:", self.group_entry))):
+            config_layout.addWidget(QLabel(label), row, 0)
+            config_layout.addWidget(entry, row, 1)
+        side_layout.addWidget(config_group)
+
+        control_layout = QHBoxLayout()
+        self.start_button = QPushButton("Iniciar Marcação")
+        self.start_button.setMinimumHeight(40)
+        self.start_button.setStyleSheet("background-color: green; color: white; font-weight: bold;")
+        self.start_button.setEnabled(False)
+        self.start_button.clicked.connect(self.start_scoring)
+        control_layout.addWidget(self.start_button)
+        self.stop_button = QPushButton("Parar Marcação")
+        self.stop_button.setMinimumHeight(40)
+        self.stop_button.setStyleSheet("background-color: red; color: white; font-weight: bold;")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(lambda: self.session.stop())
+        control_layout.addWidget(self.stop_button)
+        side_layout.addLayout(control_layout)
+
+        self.timer_label = QLabel("Tempo Restante: 00:00")
+        self.timer_label.setAlignment(Qt.AlignCenter)
+        self.timer_label.setStyleSheet("font-size: 20px; font-weight: bold;")
+        side_layout.addWidget(self.timer_label)
+
+        areas_group = QGroupBox("Áreas")
+        areas_layout = QGridLayout(areas_group)
+        self.zone_buttons = {}
+        columns = self.arena.columns
+        rows = -(-len(self.arena.zones) // columns)
+        for index, zone in enumerate(self.arena.zones):
+            button = QPushButton(self.arena.labels[zone])
+            button.setMinimumHeight(60 if rows <= 2 else 30)
+            button.setFocusPolicy(Qt.NoFocus)
+            button.setEnabled(False)
+            button.pressed.connect(lambda zone=zone: self.session.press(zone))
+            button.released.connect(lambda zone=zone: self.session.release(zone))
+            areas_layout.addWidget(button, *divmod(index, columns))
+            self.zone_buttons[zone] = button
+            self.highlight(zone, False)
+        side_layout.addWidget(areas_group)
+
+        self.totals_label = QLabel()
+        self.totals_label.setWordWrap(True)
+        side_layout.addWidget(self.totals_label)
+        side_layout.addStretch(1)
+        main_layout.addLayout(side_layout, 1)
+
+    def choose_video(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Abrir Vídeo", "",
+                                              "Vídeos (*.mp4 *.avi *.mov *.mkv *.mpg);;Todos os arquivos (*)")
+        if path:
+            self.open_video(path)
+
+    def open_video(self, path):
+        if self.session.running:
+            return
+        try:
+            player = FramePrefetcher(path)
+        except (RuntimeError, ValueError, OSError) as e:
+            QMessageBox.critical(self, "Erro ao Abrir Vídeo", str(e))
+            return
+        if self.player is not None:
+            self.player.close()
+        self.player = player
+        self.media_clock.pause()
+        self.media_clock.seek(0)
+        self.frame_index = -1
+        self.seek_slider.setRange(0, max(player.frame_count - 1, 0))
+        self.setWindowTitle(f"Teste de Campo Aberto - Marcação por Vídeo - {path}")
+        self.set_transport_enabled(True)
+        self.start_button.setEnabled(True)
+        self.show_frame(0, wait=True)
+        self.setFocus()
+
+    def set_transport_enabled(self, enabled):
+        # Durante a marcação o tempo da mídia só avança (sem voltar nem saltar)
+        scoring = self.session.running
+        self.play_button.setEnabled(enabled)
+        self.forward_button.setEnabled(enabled)
+        self.back_button.setEnabled(enabled and not scoring)
+        self.seek_slider.setEnabled(enabled and not scoring)
+
+    def toggle_playback(self):
+        if self.media_clock.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def play(self):
+        if self.player is None:
+            return
+        if self.frame_index >= self.player.frame_count - 1:
+            return
+        self.media_clock.play()
+        self.play_button.setText("Pausar")
+        self.display_timer.start()
+
+    def pause(self):
+        self.media_clock.pause()
+        self.play_button.setText("Reproduzir")
+        self.display_timer.stop()
+        self.refresh()
+
+    def step(self, frames):
+        if self.player is None or (frames < 0 and self.session.running):
+            return
+        if self.media_clock.playing:
+            self.pause()
+        index = min(max(self.frame_index + frames, 0), self.player.frame_count - 1)
+        self.media_clock.seek(frame_to_ns(index, self.player.fps))
+        self.show_frame(index, wait=True)
+        self.refresh()
+
+    def seek_frame(self, index):
+        if self.player is None or self.session.running:
+            return
+        self.media_clock.seek(frame_to_ns(index, self.player.fps))
+        self.show_frame(index, wait=not self.media_clock.playing)
+
+    def show_frame(self, index, wait=False):
+        player = self.player
+        if wait:
+            frame = player.wait_for(index)
+        else:
+            # Sem espera: se o quadro ainda não foi decodificado, o anterior continua na tela
+            frame = player.get(index)
+        if frame is None:
+            return
+        self.frame_index = index
+        height, width = frame.shape[:2]
+        image = QImage(frame.data, width, height, frame.strides[0], QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(image).scaled(self.frame_label.size(), Qt.KeepAspectRatio,
+                                                 Qt.SmoothTransformation)
+        self.frame_label.setPixmap(pixmap)
+        if not self.seek_slider.isSliderDown():
+            self.seek_slider.setValue(index)
+
+    def refresh(self):
+        # Um único timer: quadro exibido, prazo do teste e rótulos no tempo da mídia
+        if self.player is None:
+            return
+        media_ns = self.media_clock.now_ns()
+        index = ns_to_frame(media_ns, self.player.fps)
+        if index >= self.player.frame_count:
+            index = self.player.frame_count - 1
+            media_ns = frame_to_ns(index, self.player.fps)
+            self.media_clock.seek(media_ns)
+            self.pause()
+        # Em velocidades altas a leitura antecipada pula os quadros que não serão exibidos
+        stride = max(int(self.media_clock.rate * self.player.fps * DISPLAY_INTERVAL_MS / 1000), 1)
+        self.player.request(index, stride)
+        if index != self.frame_index:
+            self.show_frame(index)
+        if self.session.running:
+            self.session.tick(media_ns)
+        self.update_labels(media_ns)
+
+    def update_labels(self, media_ns):
+        mins, rest = divmod(media_ns / NS_PER_S, 60)
+        self.position_label.setText(f"{int(mins):02d}:{rest:06.3f} | quadro {max(self.frame_index, 0)}")
+        if self.session.event_log is None:
+            return
+        now_ns = min(media_ns, self.session.deadline_ns) if self.session.running else None
+        mins, secs = divmod(self.session.remaining_ns(now_ns) // NS_PER_S, 60)
+        text = f"Tempo Restante: {mins:02d}:{secs:02d}"
+        if text != self.timer_label.text():
+            self.timer_label.setText(text)
+        totals = self.session.totals_s(now_ns)
+        self.totals_label.setText(" | ".join(f"{self.arena.labels[zone]} {total:.2f} s"
+                                             for zone, total in zip(self.arena.zones, totals)))
+
+    def start_scoring(self):
+        try:
+            duration = int(self.duration_entry.text())
+            if duration <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Erro", "Insira uma duração de teste válida (número inteiro positivo).")
+            return
+        animal_id = self.animal_id_entry.text().strip()
+        if not animal_id:
+            QMessageBox.warning(self, "Erro", "Insira o ID do Animal.")
+            return
+        # O teste começa na posição atual do vídeo
+        self.input_timestamper.reset()
+        self.session.start(animal_id, duration, experimenter=self.experimenter_entry.text(),
+                           treatment_group=self.group_entry.text())
+        for widget in (self.animal_id_entry, self.duration_entry, self.experimenter_entry, self.group_entry):
+            widget.setEnabled(False)
+        for button in self.zone_buttons.values():
+            button.setEnabled(True)
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.set_transport_enabled(True)
+        self.setFocus()
+        self.refresh()
+
+    def on_session_event(self, kind, zone):
+        if kind == PRESSED:
+            self.highlight(self.arena.zones[zone], True)
+        elif kind == RELEASED:
+            self.highlight(self.arena.zones[zone], False)
+        elif kind == STOPPED:
+            self.on_scoring_stopped()
+
+    def on_scoring_stopped(self):
+        if self.media_clock.playing:
+            self.pause()
+        for widget in (self.animal_id_entry, self.duration_entry, self.experimenter_entry, self.group_entry):
+            widget.setEnabled(True)
+        for button in self.zone_buttons.values():
+            button.setEnabled(False)
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.set_transport_enabled(self.player is not None)
+        self.update_labels(self.media_clock.now_ns())
+
+        if self.store is None:
+            return
+        try:
+            self.store.save_session(self.session, self.arena.name)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Erro ao Gravar Sessão",
+                                 f"Não foi possível gravar o teste no banco de sessões: {e}")
+            return
+        totals = self.session.totals_s()
+        QMessageBox.information(self, "Marcação Finalizada",
+                                f"Sessão do animal {self.session.animal_id} gravada.\n" +
+                                "\n".join(f"{self.arena.labels[zone]}: {total:.2f} s"
+                                          for zone, total in zip(self.arena.zones, totals)))
+
+    def highlight(self, zone, is_pressed):
+        background, color = ("darkgray", "white") if is_pressed else self.arena.colors[zone]
+        self.zone_buttons[zone].setStyleSheet(f"background-color: {background}; color: {color}; "
+                                              f"font-size: 14px; font-weight: bold;")
+
+    def media_time(self, event):
+        # Timestamp do evento de teclado convertido para o tempo da mídia
+        return self.media_clock.at(self.input_timestamper.to_clock(event.timestamp()))
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Space and not event.isAutoRepeat():
+            self.toggle_playback()
+            return
+        if event.key() in (Qt.Key_Left, Qt.Key_Right):
+            self.step(-1 if event.key() == Qt.Key_Left else 1)
+            return
+        zone = self.key_zones.get(event.key())
+        if zone is None:
+            super().keyPressEvent(event)
+            return
+        if not event.isAutoRepeat():
+            self.session.press(zone, self.media_time(event))
+        event.accept()
+
+    def keyReleaseEvent(self, event):
+        zone = self.key_zones.get(event.key())
+        if zone is None:
+            super().keyReleaseEvent(event)
+            return
+        if not event.isAutoRepeat():
+            self.session.release(zone, self.media_time(event))
+        event.accept()
+
+    def closeEvent(self, event):
+        self.display_timer.stop()
+        if self.session.running:
+            self.session.stop()
+        if self.player is not None:
+            self.player.close()
+        super().closeEvent(event)